@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+
+class AccountCodec:
+    """Dictionary encoding of account IDs into a shared int32 code space.
+
+    Ingest encodes from_account / to_account once; the detector, graph and
+    findings then carry only the integer codes. Labels are decoded back to
+    account ID strings when an API response is built.
+    """
+
+    # Keys in detection / scoring results whose values are account codes
+    ACCOUNT_FIELDS = frozenset([
+        'cycle', 'members', 'accounts', 'member_accounts', 'account', 'account_id',
+        'source', 'source_account', 'recipients', 'target', 'target_account', 'senders'
+    ])
+
+    def __init__(self):
+        self.labels = np.empty(0, dtype=object)
+        self._index = pd.Index(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def encode(self, values):
+        """Encode account IDs to int32 codes, adding unseen IDs to the dictionary"""
+        values = np.asarray(values, dtype=object)
+        if len(self.labels) == 0:
+            codes, uniques = pd.factorize(values)
+            self._set_labels(np.asarray(uniques, dtype=object))
+            return codes.astype(np.int32)
+
+        codes = self._index.get_indexer(values)
+        unseen = codes < 0
+        if unseen.any():
+            new_labels = pd.unique(values[unseen])
+            self._set_labels(np.concatenate([self.labels, np.asarray(new_labels, dtype=object)]))
+            codes[unseen] = self._index.get_indexer(values[unseen])
+        return codes.astype(np.int32)
+
+    def encode_frame(self, df):
+        """Replace from_account / to_account with codes from one shared dictionary"""
+        num_rows = len(df)
+        codes = self.encode(np.concatenate([
+            df['from_account'].to_numpy(dtype=object),
+            df['to_account'].to_numpy(dtype=object)
+        ]))
+        df = df.copy()
+        df['from_account'] = codes[:num_rows]
+        df['to_account'] = codes[num_rows:]
+        return df
+
+    def code(self, label):
+        """Code of a single account ID, or -1 if it was never seen"""
+        return int(self._index.get_indexer([label])[0])
+
+    def decode(self, codes):
+        """Decode a code or a sequence of codes back to account IDs"""
+        if isinstance(codes, (int, np.integer)):
+            return self.labels[codes]
+        return self.labels[np.asarray(codes, dtype=np.int64)].tolist()
+
+    def decode_keys(self, mapping):
+        """Decode a dict keyed by account code (e.g. per-node metrics)"""
+        return dict(zip(self.decode(list(mapping.keys())), mapping.values()))
+
+    def decode_results(self, obj):
+        """Return a copy of detection / scoring output with account codes decoded"""
+        if isinstance(obj, dict):
+            decoded = {}
+            for key, value in obj.items():
+                if key in self.ACCOUNT_FIELDS:
+                    decoded[key] = self.decode(value)
+                elif key == 'edges':
+                    decoded[key] = [
+                        (self.decode(edge[0]), self.decode(edge[1])) + tuple(self.decode_results(edge[2:]))
+                        for edge in value
+                    ]
+                else:
+                    decoded[key] = self.decode_results(value)
+            return decoded
+        if isinstance(obj, (list, tuple)):
+            return [self.decode_results(item) for item in obj]
+        return obj
+
+    def _set_labels(self, labels):
+        self.labels = labels
+        self._index = pd.Index(labels)
@@ -0,0 +1,237 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import networkx as nx
+
+from csr_graph import CSRGraph
+
+
+CENTRALITY_MODES = ('auto', 'exact', 'approximate')
+
+
+class CentralityCache:
+    """Centrality results memoized per graph version.
+
+    The detector and the graph analyzer share one cache, so an O(VE) metric
+    is computed once per graph no matter how many detection runs or
+    dashboard requests ask for it. Moving to a new graph version drops every
+    entry.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def get(self, version, key, compute):
+        """Cached value of key for this graph version, calling compute() only on a miss"""
+        if version != self.version:
+            self.version = version
+            self._entries = {}
+
+        if key in self._entries:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._entries[key] = compute()
+        return self._entries[key]
+
+    def peek(self, version, key):
+        """Cached value of key for this graph version, or None (never computes it)"""
+        return self._entries.get(key) if version == self.version else None
+
+    def clear(self):
+        self.version = None
+        self._entries = {}
+
+
+def _graph_arrays(graph):
+    """(nodes, indptr, indices, in_indptr, in_indices) of a CSRGraph or networkx DiGraph"""
+    if isinstance(graph, CSRGraph):
+        return graph.labels.tolist(), graph.indptr, graph.indices, graph.in_indptr, graph.in_indices
+
+    nodes = list(graph.nodes())
+    matrix = nx.to_scipy_sparse_array(graph, nodelist=nodes, weight=None, format='csr')
+    matrix.sort_indices()
+    transposed = matrix.T.tocsr()
+    return nodes, matrix.indptr, matrix.indices, transposed.indptr, transposed.indices
+
+
+def sample_size(num_nodes, epsilon, delta):
+    """Sources needed so every normalized score is within epsilon with probability 1 - delta.
+
+    Each sampled source contributes a value in [0, 1] to a node's normalized
+    estimate, so Hoeffding's bound with a union bound over all nodes gives
+    k >= ln(2n / delta) / (2 epsilon^2).
+    """
+    return int(math.ceil(math.log(2 * max(num_nodes, 1) / delta) / (2 * epsilon ** 2)))
+
+
+def achieved_epsilon(num_nodes, num_samples, delta):
+    """Error bound guaranteed by num_samples sources (inverse of sample_size)"""
+    return math.sqrt(math.log(2 * max(num_nodes, 1) / delta) / (2 * max(num_samples, 1)))
+
+
+def _gather(indptr, indices, nodes):
+    """Neighbours of every node in nodes, with the position in nodes each came from"""
+    counts = indptr[nodes + 1] - indptr[nodes]
+    origin = np.repeat(np.arange(len(nodes)), counts)
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - indptr[nodes], counts)
+    return indices[positions], origin
+
+
+def _dependencies(num_nodes, indptr, indices, in_indptr, in_indices, sources):
+    """Sum of Brandes dependencies of every node over a batch of BFS sources.
+
+    The BFS runs for all sources of the batch at once on (node, source) pairs
+    flattened to node * batch + column; each level expands and accumulates
+    with whole-array operations over the edges it touches.
+    """
+    batch = len(sources)
+    columns = np.arange(batch)
+    distance = np.full(num_nodes * batch, -1, dtype=np.int32)
+    sigma = np.zeros(num_nodes * batch)
+    delta = np.zeros(num_nodes * batch)
+
+    frontier = np.asarray(sources, dtype=np.int64) * batch + columns
+    distance[frontier] = 0
+    sigma[frontier] = 1.0
+    levels = [frontier]
+
+    # Forward: shortest-path counts level by level
+    while len(frontier):
+        successors, origin = _gather(indptr, indices, frontier // batch)
+        targets = successors.astype(np.int64) * batch + (frontier % batch)[origin]
+        unseen = distance[targets] < 0
+        targets, origin = targets[unseen], origin[unseen]
+
+        frontier, inverse = np.unique(targets, return_inverse=True)
+        sigma[frontier] = np.bincount(inverse, weights=sigma[levels[-1]][origin], minlength=len(frontier))
+        distance[frontier] = len(levels)
+        if len(frontier):
+            levels.append(frontier)
+
+    # Backward: dependency accumulation from the deepest level up
+    for depth in range(len(levels) - 1, 0, -1):
+        level = levels[depth]
+        coefficient = (1.0 + delta[level]) / sigma[level]
+        predecessors, origin = _gather(in_indptr, in_indices, level // batch)
+        targets = predecessors.astype(np.int64) * batch + (level % batch)[origin]
+        on_path = distance[targets] == depth - 1
+        targets, origin = targets[on_path], origin[on_path]
+
+        parents, inverse = np.unique(targets, return_inverse=True)
+        delta[parents] += sigma[parents] * np.bincount(inverse, weights=coefficient[origin], minlength=len(parents))
+
+    delta[levels[0]] = 0.0  # a source gains no dependency from its own paths
+    return delta.reshape(num_nodes, batch).sum(axis=1)
+
+
+# Per-process graph arrays for parallel betweenness workers, set by _init_centrality_worker
+_worker_graph = {}
+
+
+def _init_centrality_worker(num_nodes, indptr, indices, in_indptr, in_indices):
+    _worker_graph.update(num_nodes=num_nodes, indptr=indptr, indices=indices,
+                         in_indptr=in_indptr, in_indices=in_indices)
+
+
+def _run_centrality_task(batches):
+    graph = _worker_graph
+    total = np.zeros(graph['num_nodes'])
+    for sources in batches:
+        total += _dependencies(graph['num_nodes'], graph['indptr'], graph['indices'],
+                               graph['in_indptr'], graph['in_indices'], sources)
+    return total
+
+
+def betweenness_centrality(graph, mode='auto', epsilon=0.02, delta=0.1, max_samples=None,
+                           exact_max_nodes=5000, workers=1, seed=42, batch_entries=2 ** 21):
+    """Normalized betweenness centrality, exact or from sampled BFS sources.
+
+    mode 'exact' runs a BFS from every node; 'approximate' samples k sources
+    (sample_size(n, epsilon, delta), capped by max_samples) and scales the
+    result by n / k, which is the networkx k-sample estimator; 'auto' is exact
+    up to exact_max_nodes nodes or when sampling would not save work. With
+    workers > 1 source batches are spread over a process pool and the partial
+    sums merged. Works on a CSRGraph or a networkx DiGraph.
+
+    Returns (nodes, scores, info): nodes in graph order, an aligned float
+    array, and a dict describing the mode, sample count and error bound used.
+    """
+    if mode not in CENTRALITY_MODES:
+        raise ValueError(f"Unknown centrality mode '{mode}'. Expected one of {CENTRALITY_MODES}")
+
+    nodes, indptr, indices, in_indptr, in_indices = _graph_arrays(graph)
+    num_nodes = len(nodes)
+
+    num_samples = sample_size(num_nodes, epsilon, delta)
+    if max_samples is not None:
+        num_samples = min(num_samples, max_samples)
+    if mode == 'auto':
+        mode = 'exact' if num_nodes <= exact_max_nodes or num_samples >= num_nodes else 'approximate'
+    if mode == 'exact' or num_samples >= num_nodes:
+        sources = np.arange(num_nodes)
+    else:
+        sources = np.sort(np.random.default_rng(seed).choice(num_nodes, num_samples, replace=False))
+
+    # Bound the (node, source) working arrays to about batch_entries entries
+    batch_size = int(min(64, max(1, batch_entries // max(num_nodes, 1))))
+    batches = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+
+    if workers > 1 and len(batches) > 1:
+        tasks = [batches[i::workers * 4] for i in range(min(len(batches), workers * 4))]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_centrality_worker,
+            initargs=(num_nodes, indptr, indices, in_indptr, in_indices)
+        ) as pool:
+            scores = np.sum(list(pool.map(_run_centrality_task, tasks)), axis=0)
+    else:
+        scores = np.zeros(num_nodes)
+        for sources_batch in batches:
+            scores += _dependencies(num_nodes, indptr, indices, in_indptr, in_indices, sources_batch)
+
+    if num_nodes > 2:
+        scores *= num_nodes / max(len(sources), 1) / ((num_nodes - 1) * (num_nodes - 2))
+
+    exact = len(sources) == num_nodes
+    info = {
+        'mode': 'exact' if exact else 'approximate',
+        'samples': int(len(sources)),
+        'epsilon': 0.0 if exact else round(achieved_epsilon(num_nodes, len(sources), delta), 4),
+        'confidence': 1.0 if exact else 1 - delta,
+        'workers': workers if workers > 1 and len(batches) > 1 else 1
+    }
+    return nodes, scores, info
+
+
+def average_clustering(csr, max_samples=2000, seed=42):
+    """Average clustering coefficient of the undirected CSR graph, from at most max_samples nodes.
+
+    Matches nx.average_clustering(graph.to_undirected()) when every node is
+    used; larger graphs average the local coefficient of a uniform node sample.
+    """
+    num_nodes = csr.number_of_nodes()
+    if num_nodes == 0:
+        return 0.0
+
+    adjacency = csr.to_scipy()
+    adjacency = ((adjacency + adjacency.T) > 0).astype(np.float64).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+
+    if num_nodes <= max_samples:
+        sample = np.arange(num_nodes)
+    else:
+        sample = np.sort(np.random.default_rng(seed).choice(num_nodes, max_samples, replace=False))
+
+    # Links among the neighbours of each sampled node: row i of (A_s A) .* A_s counts 2 * triangles(i)
+    rows = adjacency[sample]
+    triangles = np.asarray(rows.dot(adjacency).multiply(rows).sum(axis=1)).ravel() / 2
+    degree = np.diff(rows.indptr)
+    pairs = degree * (degree - 1) / 2
+    local = np.divide(triangles, pairs, out=np.zeros(len(sample)), where=pairs > 0)
+    return float(local.mean())
@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+from scipy import sparse
+from scipy.sparse import csgraph
+
+
+class CSRGraph:
+    """Array-backed directed transaction graph in compressed sparse row form.
+
+    Accounts are integer-encoded 0..n-1 (labels[code] gives the account ID).
+    Out-edges of node u are indices[indptr[u]:indptr[u + 1]], sorted by target,
+    with parallel edge-attribute arrays (amount, transaction_count, first_time,
+    last_time, edge_id into the EdgeTable). A reverse CSR (in_indptr/in_indices)
+    gives predecessors. Memory is a handful of flat numpy arrays instead of
+    networkx's dict-of-dicts.
+    """
+
+    def __init__(self, labels, indptr, indices, amount, transaction_count,
+                 first_time, last_time, edge_id, in_indptr, in_indices):
+        self.labels = labels
+        self.indptr = indptr
+        self.indices = indices
+        self.amount = amount
+        self.transaction_count = transaction_count
+        self.first_time = first_time
+        self.last_time = last_time
+        self.edge_id = edge_id
+        self.in_indptr = in_indptr
+        self.in_indices = in_indices
+        self._label_index = pd.Index(labels)
+        self._added_labels = {}  # Codes of labels added by extend() since _label_index was built
+
+    @classmethod
+    def from_edge_table(cls, edge_table, accounts=None):
+        """Build from an EdgeTable; accounts optionally fixes the label order"""
+        if accounts is None:
+            accounts = pd.unique(np.concatenate([edge_table.src, edge_table.dst]))
+        labels = np.asarray(accounts)
+        label_index = pd.Index(labels)
+        src = label_index.get_indexer(edge_table.src).astype(np.int32)
+        dst = label_index.get_indexer(edge_table.dst).astype(np.int32)
+        num_nodes = len(labels)
+
+        # Out-edges grouped by source, sorted by target within each row
+        order = np.lexsort((dst, src))
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+
+        # Reverse adjacency for predecessors / in-degree
+        in_order = np.lexsort((src, dst))
+        in_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=num_nodes), out=in_indptr[1:])
+
+        return cls(
+            labels=labels,
+            indptr=indptr,
+            indices=dst[order],
+            amount=edge_table.total_amount[order],
+            transaction_count=edge_table.count[order],
+            first_time=edge_table.first_time[order],
+            last_time=edge_table.last_time[order],
+            edge_id=order.astype(np.int64),
+            in_indptr=in_indptr,
+            in_indices=src[in_order]
+        )
+
+    def number_of_nodes(self):
+        return len(self.labels)
+
+    def number_of_edges(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the adjacency and edge-attribute arrays"""
+        arrays = (self.indptr, self.indices, self.amount, self.transaction_count,
+                  self.first_time, self.last_time, self.edge_id, self.in_indptr, self.in_indices)
+        return sum(array.nbytes for array in arrays)
+
+    def code(self, label):
+        """Integer code of an account label, or -1 if unknown"""
+        try:
+            return int(self._label_index.get_loc(label))
+        except KeyError:
+            return self._added_labels.get(label, -1)
+
+    def codes(self, labels):
+        codes = self._label_index.get_indexer(labels)
+        if self._added_labels:
+            missing = np.flatnonzero(codes < 0)
+            codes[missing] = [self._added_labels.get(label, -1)
+                              for label in np.asarray(labels, dtype=object)[missing]]
+        return codes
+
+    def extend(self, edge_table, new_labels, touched, num_new_edges):
+        """Apply an EdgeTable.extend in place.
+
+        new_labels get the next node codes, the aggregates of the touched edge
+        ids are refreshed and the last num_new_edges edges of edge_table are
+        inserted into the sorted rows with vectorized inserts.
+        """
+        num_old = self.number_of_nodes()
+        if len(new_labels):
+            self.labels = np.concatenate([self.labels, np.asarray(new_labels, dtype=self.labels.dtype)])
+            if len(self._added_labels) + len(new_labels) > num_old // 10:
+                self._label_index = pd.Index(self.labels)
+                self._added_labels = {}
+            else:
+                self._added_labels.update(zip(new_labels, range(num_old, len(self.labels))))
+        num_nodes = self.number_of_nodes()
+
+        # Row-major (source, target) keys are sorted, so positions come from searchsorted
+        keys = np.repeat(np.arange(num_old, dtype=np.int64), self.out_degree()) * num_nodes + self.indices
+        in_keys = np.repeat(np.arange(num_old, dtype=np.int64), self.in_degree()) * num_nodes + self.in_indices
+
+        if len(touched):
+            positions = np.searchsorted(keys, self.codes(edge_table.src[touched]).astype(np.int64) * num_nodes +
+                                        self.codes(edge_table.dst[touched]))
+            self.amount[positions] = edge_table.total_amount[touched]
+            self.transaction_count[positions] = edge_table.count[touched]
+            self.first_time[positions] = edge_table.first_time[touched]
+            self.last_time[positions] = edge_table.last_time[touched]
+
+        if num_new_edges:
+            first_new = len(edge_table) - num_new_edges
+            src = self.codes(edge_table.src[first_new:]).astype(np.int64)
+            dst = self.codes(edge_table.dst[first_new:]).astype(np.int64)
+            order = np.argsort(src * num_nodes + dst, kind='stable')
+            at = np.searchsorted(keys, src[order] * num_nodes + dst[order])
+            edge_ids = first_new + order
+            self.indices = np.insert(self.indices, at, dst[order])
+            self.amount = np.insert(self.amount, at, edge_table.total_amount[edge_ids])
+            self.transaction_count = np.insert(self.transaction_count, at, edge_table.count[edge_ids])
+            self.first_time = np.insert(self.first_time, at, edge_table.first_time[edge_ids])
+            self.last_time = np.insert(self.last_time, at, edge_table.last_time[edge_ids])
+            self.edge_id = np.insert(self.edge_id, at, edge_ids)
+
+            in_order = np.argsort(dst * num_nodes + src, kind='stable')
+            in_at = np.searchsorted(in_keys, dst[in_order] * num_nodes + src[in_order])
+            self.in_indices = np.insert(self.in_indices, in_at, src[in_order])
+        else:
+            src = dst = np.empty(0, dtype=np.int64)
+
+        self.indptr = self._grown_indptr(self.indptr, src, num_nodes)
+        self.in_indptr = self._grown_indptr(self.in_indptr, dst, num_nodes)
+
+    @staticmethod
+    def _grown_indptr(indptr, rows, num_nodes):
+        """indptr padded to num_nodes rows with one more entry per element of rows"""
+        grown = np.full(num_nodes + 1, indptr[-1], dtype=np.int64)
+        grown[:len(indptr)] = indptr
+        grown[1:] += np.cumsum(np.bincount(rows, minlength=num_nodes))
+        return grown
+
+    def successors(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def predecessors(self, node):
+        return self.in_indices[self.in_indptr[node]:self.in_indptr[node + 1]]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.diff(self.in_indptr)
+
+    def degree(self):
+        return self.out_degree() + self.in_degree()
+
+    def weighted_degree(self):
+        """Total amount flowing in and out of every node"""
+        src = np.repeat(np.arange(self.number_of_nodes(), dtype=np.int32), self.out_degree())
+        num_nodes = self.number_of_nodes()
+        return (np.bincount(src, weights=self.amount, minlength=num_nodes) +
+                np.bincount(self.indices, weights=self.amount, minlength=num_nodes))
+
+    def edge_position(self, u, v):
+        """Position of edge u -> v in the CSR arrays, or -1 if absent"""
+        start, end = self.indptr[u], self.indptr[u + 1]
+        pos = start + np.searchsorted(self.indices[start:end], v)
+        if pos < end and self.indices[pos] == v:
+            return int(pos)
+        return -1
+
+    def edge_data(self, u, v):
+        """Edge attributes for codes u -> v in the same shape as the networkx edges"""
+        pos = self.edge_position(u, v)
+        if pos < 0:
+            return None
+
+        first, last = self.first_time[pos:pos + 1], self.last_time[pos:pos + 1]
+        last_timestamp = last.view('datetime64[ns]').astype('datetime64[us]').tolist()[0]
+        return {
+            'edge_id': int(self.edge_id[pos]),
+            'amount': float(self.amount[pos]),
+            'transaction_count': int(self.transaction_count[pos]),
+            'first_timestamp': first.view('datetime64[ns]').astype('datetime64[us]').tolist()[0],
+            'last_timestamp': last_timestamp,
+            'timestamp': last_timestamp
+        }
+
+    def to_scipy(self, weighted=False):
+        """Adjacency as a scipy.sparse CSR matrix (shares the index arrays)"""
+        num_nodes = self.number_of_nodes()
+        data = self.amount if weighted else np.ones(len(self.indices), dtype=np.int8)
+        return sparse.csr_matrix((data, self.indices, self.indptr), shape=(num_nodes, num_nodes))
+
+    def connected_components(self, nodes=None):
+        """Weakly connected components as lists of node codes.
+
+        nodes optionally restricts the graph to an induced subgraph (array of codes).
+        """
+        num_nodes = self.number_of_nodes()
+        if nodes is None:
+            matrix = self.to_scipy()
+            members = np.arange(num_nodes)
+        else:
+            members = np.asarray(nodes, dtype=np.int64)
+            mask = np.zeros(num_nodes, dtype=bool)
+            mask[members] = True
+            src = np.repeat(np.arange(num_nodes, dtype=np.int32), self.out_degree())
+            keep = mask[src] & mask[self.indices]
+            matrix = sparse.csr_matrix(
+                (np.ones(keep.sum(), dtype=np.int8), (src[keep], self.indices[keep])),
+                shape=(num_nodes, num_nodes)
+            )
+
+        _, component_labels = csgraph.connected_components(matrix, directed=True, connection='weak')
+        member_labels = component_labels[members]
+        order = np.argsort(member_labels, kind='stable')
+        boundaries = np.flatnonzero(np.diff(member_labels[order])) + 1
+        return [group.tolist() for group in np.split(members[order], boundaries)] if len(members) else []
+
+    def to_networkx(self):
+        """Materialize an equivalent networkx DiGraph for algorithms without a CSR implementation"""
+        graph = nx.DiGraph()
+        labels = self.labels.tolist()
+        graph.add_nodes_from(labels)
+
+        first_times = self.first_time.view('datetime64[ns]').astype('datetime64[us]').tolist()
+        last_times = self.last_time.view('datetime64[ns]').astype('datetime64[us]').tolist()
+        src = np.repeat(np.arange(self.number_of_nodes()), self.out_degree())
+        graph.add_edges_from(
+            (labels[u], labels[v], {
+                'edge_id': edge_id,
+                'amount': amount,
+                'transaction_count': count,
+                'first_timestamp': first,
+                'last_timestamp': last,
+                'timestamp': last
+            })
+            for u, v, edge_id, amount, count, first, last in zip(
+                src.tolist(), self.indices.tolist(), self.edge_id.tolist(), self.amount.tolist(),
+                self.transaction_count.tolist(), first_times, last_times)
+        )
+        return graph
@@ -0,0 +1,426 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import RawArray
+
+import numpy as np
+import networkx as nx
+from scipy.sparse import csgraph
+
+from csr_graph import CSRGraph
+
+
+def _adjacency(graph):
+    """(successors, predecessors) callables returning lists for a networkx or CSR graph"""
+    if isinstance(graph, CSRGraph):
+        # Each node's CSR slice is converted to a list once per search, on first visit
+        succ, pred = {}, {}
+
+        def successors(node):
+            if node not in succ:
+                succ[node] = graph.successors(node).tolist()
+            return succ[node]
+
+        def predecessors(node):
+            if node not in pred:
+                pred[node] = graph.predecessors(node).tolist()
+            return pred[node]
+
+        return successors, predecessors
+
+    succ, pred = graph._succ, graph._pred
+    return (lambda node: list(succ[node])), (lambda node: list(pred[node]))
+
+
+def canonical_cycle(cycle):
+    """Rotate a cycle (list of nodes, start not repeated) to begin at its smallest node"""
+    start = min(range(len(cycle)), key=cycle.__getitem__)
+    return list(cycle[start:]) + list(cycle[:start])
+
+
+def strongly_connected_components(graph, min_size=1):
+    """Strongly connected components with at least min_size nodes, each sorted, largest first"""
+    if isinstance(graph, CSRGraph):
+        _, labels = csgraph.connected_components(graph.to_scipy(), directed=True, connection='strong')
+        order = np.argsort(labels, kind='stable')
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        components = [component.tolist() for component in np.split(order, boundaries)] if len(labels) else []
+    else:
+        components = [sorted(component) for component in nx.strongly_connected_components(graph)]
+
+    components = [component for component in components if len(component) >= min_size]
+    components.sort(key=lambda component: (-len(component), component[0]))
+    return components
+
+
+def bounded_simple_cycles(graph, max_length, min_length=3, deadline=None):
+    """Lazily yield simple cycles with min_length..max_length nodes.
+
+    Johnson-style enumeration with the length bound enforced during the search:
+    the graph is split into strongly connected components first (components
+    smaller than min_length cannot hold a qualifying cycle and are skipped),
+    and within a component each cycle is reported once, rotated to start at
+    its smallest node. A bounded reverse BFS from the start node prunes every
+    extension that could not close within max_length. deadline is an absolute
+    time.time() after which the search stops.
+
+    Being a generator, the caller's cycle cap stops the work immediately.
+    """
+    successors, predecessors = _adjacency(graph)
+
+    for component in strongly_connected_components(graph, min_size=min_length):
+        rank = {node: index for index, node in enumerate(component)}
+        for start_rank in range(len(component) - min_length + 1):
+            yield from _cycles_through(component[start_rank], rank, successors, predecessors,
+                                       max_length, min_length, deadline)
+
+            if deadline is not None and time.time() > deadline:
+                return
+
+
+def _distances_to(target, rank, predecessors, max_depth):
+    """Hop distance to target from later-ranked nodes (reverse BFS, depth-bounded)"""
+    target_rank = rank[target]
+    distances = {target: 0}
+    queue = deque([target])
+    while queue:
+        node = queue.popleft()
+        depth = distances[node]
+        if depth >= max_depth:
+            continue
+        for previous in predecessors(node):
+            if rank.get(previous, -1) > target_rank and previous not in distances:
+                distances[previous] = depth + 1
+                queue.append(previous)
+    return distances
+
+
+def _cycles_through(start, rank, successors, predecessors, max_length, min_length, deadline):
+    """Yield length-bounded simple cycles through start.
+
+    Only nodes ranked after start in its component are used, so every cycle is
+    found exactly once: from its first-ranked (smallest) node.
+    """
+    distances = _distances_to(start, rank, predecessors, max_length - 1)
+    if len(distances) < min_length:
+        return
+
+    path = [start]
+    on_path = {start}
+    stack = [iter(successors(start))]
+    steps = 0
+
+    while stack:
+        advanced = False
+        for neighbor in stack[-1]:
+            if neighbor == start:
+                if len(path) >= min_length:
+                    yield list(path)
+                continue
+
+            # Extending to neighbor leaves at least distances[neighbor] hops to close
+            remaining = distances.get(neighbor)
+            if remaining is None or neighbor in on_path or len(path) + remaining > max_length:
+                continue
+
+            path.append(neighbor)
+            on_path.add(neighbor)
+            stack.append(iter(successors(neighbor)))
+            advanced = True
+            break
+
+        if not advanced:
+            stack.pop()
+            on_path.discard(path.pop())
+
+        steps += 1
+        if deadline is not None and steps % 1024 == 0 and time.time() > deadline:
+            return
+
+
+# Per-process state for parallel_bounded_cycles workers, set by _init_cycle_worker
+_worker_state = {}
+
+
+def _init_cycle_worker(succ, pred, components, max_length, min_length, max_cycles, deadline, found):
+    _worker_state.update(
+        succ=succ, pred=pred, components=components, max_length=max_length,
+        min_length=min_length, max_cycles=max_cycles, deadline=deadline,
+        found=np.frombuffer(found, dtype=np.int64)
+    )
+
+
+def _component_adjacency(graph, components):
+    """Successor / predecessor lists restricted to each node's own component"""
+    successors, predecessors = _adjacency(graph)
+    component_of = {node: index for index, component in enumerate(components) for node in component}
+
+    succ, pred = {}, {}
+    for node, index in component_of.items():
+        succ[node] = [n for n in successors(node) if component_of.get(n) == index]
+        pred[node] = [n for n in predecessors(node) if component_of.get(n) == index]
+    return succ, pred
+
+
+def _plan_cycle_tasks(components, min_length, target_tasks):
+    """Split start nodes into ordered tasks of (component_index, first_start, end_start) ranges.
+
+    Small components are batched together and large ones are split by start
+    node; concatenating task outputs in order reproduces the sequential
+    bounded_simple_cycles order.
+    """
+    starts_per_component = [len(component) - min_length + 1 for component in components]
+    chunk_size = max(1, sum(starts_per_component) // max(target_tasks, 1))
+
+    tasks, current, current_size = [], [], 0
+    for index, num_starts in enumerate(starts_per_component):
+        first = 0
+        while first < num_starts:
+            end = min(num_starts, first + chunk_size - current_size)
+            current.append((index, first, end))
+            current_size += end - first
+            first = end
+            if current_size >= chunk_size:
+                tasks.append(current)
+                current, current_size = [], 0
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+def _run_cycle_task(task_index, ranges):
+    """Enumerate the cycles of one task, stopping once earlier tasks fill the budget"""
+    state = _worker_state
+    succ, pred = state['succ'], state['pred']
+    found = state['found']
+    max_cycles, deadline = state['max_cycles'], state['deadline']
+
+    cycles = []
+    for component_index, first, end in ranges:
+        component = state['components'][component_index]
+        rank = {node: index for index, node in enumerate(component)}
+        for start_rank in range(first, end):
+            for cycle in _cycles_through(component[start_rank], rank, succ.__getitem__, pred.__getitem__,
+                                         state['max_length'], state['min_length'], deadline):
+                cycles.append(cycle)
+                found[task_index] = len(cycles)
+                # Earlier tasks' counts only grow, so once they plus ours reach the
+                # budget, nothing more from this task can make the merged result
+                if found[:task_index].sum() + len(cycles) >= max_cycles:
+                    return cycles
+
+            if deadline is not None and time.time() > deadline:
+                return cycles
+    return cycles
+
+
+def parallel_bounded_cycles(graph, max_length, max_cycles, workers, min_length=3, deadline=None):
+    """Enumerate length-bounded cycles across a process pool.
+
+    Cycles never cross strongly connected components, so components (and
+    start-node ranges of large components) are independent tasks. Workers
+    share a global cycle budget through a shared counter array and stop at
+    the deadline. Results are merged in task order and truncated to
+    max_cycles, which gives the same cycles in the same order as the
+    sequential bounded_simple_cycles (unless the deadline cuts the search).
+    """
+    components = strongly_connected_components(graph, min_size=min_length)
+    if not components:
+        return []
+
+    succ, pred = _component_adjacency(graph, components)
+    tasks = _plan_cycle_tasks(components, min_length, target_tasks=workers * 8)
+    found = RawArray('q', len(tasks))
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_cycle_worker,
+        initargs=(succ, pred, components, max_length, min_length, max_cycles, deadline, found)
+    ) as pool:
+        futures = [pool.submit(_run_cycle_task, task_index, ranges) for task_index, ranges in enumerate(tasks)]
+        results = [future.result() for future in futures]
+
+    cycles = []
+    for task_cycles in results:
+        cycles.extend(task_cycles[:max_cycles - len(cycles)])
+        if len(cycles) >= max_cycles:
+            break
+    return cycles
+
+
+def cycles_through_edge(graph, u, v, max_length, min_length=3, deadline=None):
+    """Yield simple cycles that use the edge u -> v, as node lists starting [u, v, ...].
+
+    Bounded bidirectional search: a reverse BFS from u and a forward BFS from
+    v, both limited to max_length - 1 hops, meet on the only nodes a closing
+    path v ~> u can use (forward distance + reverse distance <= max_length - 1).
+    The path enumeration then stays inside that meeting set, so the work
+    depends on the neighbourhood of the edge, not on the size of the graph.
+    """
+    successors, predecessors = _adjacency(graph)
+    budget = max_length - 1  # hops available for the path back from v to u
+
+    to_u = {u: 0}
+    queue = deque([u])
+    while queue:
+        node = queue.popleft()
+        if to_u[node] >= budget:
+            continue
+        for previous in predecessors(node):
+            if previous not in to_u:
+                to_u[previous] = to_u[node] + 1
+                queue.append(previous)
+
+    if v not in to_u or v == u:
+        return
+
+    from_v = {v: 0}
+    queue = deque([v])
+    while queue:
+        node = queue.popleft()
+        for neighbor in successors(node):
+            if neighbor in from_v or neighbor not in to_u:
+                continue
+            if from_v[node] + 1 + to_u[neighbor] <= budget:
+                from_v[neighbor] = from_v[node] + 1
+                queue.append(neighbor)
+
+    path = [u, v]
+    on_path = {u, v}
+    stack = [iter(successors(v))]
+    steps = 0
+
+    while stack:
+        advanced = False
+        for neighbor in stack[-1]:
+            if neighbor == u:
+                if len(path) >= min_length:
+                    yield list(path)
+                continue
+
+            remaining = to_u.get(neighbor)
+            if neighbor not in from_v or neighbor in on_path or len(path) + remaining > max_length:
+                continue
+
+            path.append(neighbor)
+            on_path.add(neighbor)
+            stack.append(iter(successors(neighbor)))
+            advanced = True
+            break
+
+        if not advanced:
+            stack.pop()
+            if stack:
+                on_path.discard(path.pop())
+
+        steps += 1
+        if deadline is not None and steps % 1024 == 0 and time.time() > deadline:
+            return
+
+
+def _timed_adjacency(graph, edge_table):
+    """out_edges(node) -> [(successor, sorted int64 transaction times)] for either backend"""
+    if isinstance(graph, CSRGraph):
+        def out_edges(node):
+            start, end = graph.indptr[node], graph.indptr[node + 1]
+            return [(int(successor), edge_table.times(edge_id))
+                    for successor, edge_id in zip(graph.indices[start:end], graph.edge_id[start:end])]
+    else:
+        succ = graph._succ
+
+        def out_edges(node):
+            return [(successor, edge_table.times(data['edge_id'])) for successor, data in succ[node].items()]
+
+    return out_edges
+
+
+def temporal_cycles(graph, edge_table, window_ns, max_length, min_length=3, deadline=None):
+    """Lazily yield time-respecting cycles as (nodes, hop_times, hop_edge_positions).
+
+    A temporal cycle leaves its first node at t0 and follows edges whose
+    transactions happen at strictly increasing times, returning to the first
+    node no later than t0 + window_ns. At each hop the earliest feasible
+    transaction is taken, which never loses a cycle (waiting longer only
+    shrinks what is reachable inside the window). Start transactions that a
+    later start on the same first edge dominates are skipped, and each node
+    sequence is reported once, in temporal order starting from its first hop.
+    hop_edge_positions index into each hop edge's sorted transactions.
+    """
+    out_edges = _timed_adjacency(graph, edge_table)
+    reported = set()
+    steps = 0
+
+    for component in strongly_connected_components(graph, min_size=min_length):
+        members = set(component)
+        adjacency = {}
+
+        def edges_from(node):
+            if node not in adjacency:
+                adjacency[node] = [(successor, times) for successor, times in out_edges(node)
+                                   if successor in members]
+            return adjacency[node]
+
+        for start in component:
+            for first_hop, first_times in edges_from(start):
+                for t0, first_position in _dominant_start_times(first_times, edges_from(first_hop)):
+                    window_end = t0 + window_ns
+                    path, hop_times, hop_positions = [start, first_hop], [t0], [first_position]
+                    on_path = {start, first_hop}
+                    stack = [(iter(edges_from(first_hop)), t0)]
+
+                    while stack:
+                        iterator, current_time = stack[-1]
+                        advanced = False
+                        for successor, times in iterator:
+                            position = int(np.searchsorted(times, current_time, side='right'))
+                            if position >= len(times) or times[position] > window_end:
+                                continue
+                            arrival = int(times[position])
+
+                            if successor == start:
+                                if len(path) >= min_length:
+                                    key = tuple(canonical_cycle(path))
+                                    if key not in reported:
+                                        reported.add(key)
+                                        yield list(path), hop_times + [arrival], hop_positions + [position]
+                                continue
+
+                            if successor in on_path or len(path) >= max_length:
+                                continue
+
+                            path.append(successor)
+                            hop_times.append(arrival)
+                            hop_positions.append(position)
+                            on_path.add(successor)
+                            stack.append((iter(edges_from(successor)), arrival))
+                            advanced = True
+                            break
+
+                        if not advanced:
+                            stack.pop()
+                            if stack:
+                                on_path.discard(path.pop())
+                                hop_times.pop()
+                                hop_positions.pop()
+
+                        steps += 1
+                        if deadline is not None and steps % 1024 == 0 and time.time() > deadline:
+                            return
+
+
+def _dominant_start_times(first_times, next_edges):
+    """Start transactions worth searching from on one first-hop edge.
+
+    Two starts that see the same next departure from the first hop reach the
+    same cycles, and the later one has the later window end, so only the
+    last start before each next departure is kept.
+    """
+    if not next_edges:
+        return []
+
+    departures = np.sort(np.concatenate([times for _, times in next_edges]))
+    next_departure = np.searchsorted(departures, first_times, side='right')
+    is_last = np.ones(len(first_times), dtype=bool)
+    is_last[:-1] = next_departure[1:] != next_departure[:-1]
+    keep = np.flatnonzero(is_last & (next_departure < len(departures)))
+    return [(int(first_times[i]), int(i)) for i in keep]
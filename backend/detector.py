@@ -7,77 +7,357 @@ import uuid
 import time
 import random
 
+from edge_table import EdgeTable
+from csr_graph import CSRGraph
+from smurfing import SlidingWindowScanner
+from centrality import betweenness_centrality, CentralityCache
+from propagation import RiskFlow
+from layout import LayoutCache, ReducedGraph
+from cycles import (bounded_simple_cycles, parallel_bounded_cycles, canonical_cycle, temporal_cycles,
+                    cycles_through_edge)
+
 class MoneyMulingDetector:
-    def __init__(self):
-        self.transactions = None
-        self.graph = None
+    GRAPH_BACKENDS = ('networkx', 'csr')
+    SMURFING_WINDOWS_HOURS = (1, 6, 24, 72)  # Sliding windows scanned together for split transactions
+
+    def __init__(self, graph_backend='networkx', cycle_workers=1, centrality_workers=1):
+        self._transaction_batches = []  # Loaded frame plus appended batches, concatenated on access
+        self.graph_backend = graph_backend
+        self.cycle_workers = cycle_workers  # >1 spreads cycle search over a process pool
+        self.centrality_workers = centrality_workers  # >1 spreads sampled betweenness over a process pool
+        self._graph = None
+        self.csr = None  # Array-backed graph when graph_backend == 'csr'
+        self.edge_table = None  # Per-edge aggregates of parallel transactions
+        self.accounts = None  # AccountCodec when account IDs are dictionary-encoded
         self.rings = {}  # Store identified rings
+        self.detection_stats = {}  # Per-detector run statistics
+        self._cycle_keys = set()  # Canonical forms of cycles already stored as rings
+        self._duplicate_cycles = 0
+        self.graph_version = 0  # Bumped whenever the graph is rebuilt or extended
+        self._scanner = None  # (graph_version, SlidingWindowScanner) for the structuring detectors
+        self.centrality_cache = CentralityCache()  # Shared with TransactionGraphAnalyzer
+        self.layout_cache = LayoutCache()  # Visualization node positions, updated incrementally on append
+        self.reduced_layout_cache = LayoutCache()  # Positions of the reduced (level-of-detail) graph
+
+    @property
+    def transactions(self):
+        """All loaded transactions (appended batches are concatenated on first access)"""
+        if len(self._transaction_batches) > 1:
+            self._transaction_batches = [pd.concat(self._transaction_batches, ignore_index=True)]
+        return self._transaction_batches[0] if self._transaction_batches else None
+
+    @transactions.setter
+    def transactions(self, value):
+        self._transaction_batches = [] if value is None else [value]
+
+    def num_transactions(self):
+        """Number of loaded transactions without concatenating appended batches"""
+        return sum(len(batch) for batch in self._transaction_batches)
+
+    @property
+    def graph(self):
+        """networkx view of the transaction graph (built from CSR on first access)"""
+        if self._graph is None and self.csr is not None:
+            print(f"[DETECTOR] Materializing networkx graph from CSR backend ({self.csr.number_of_nodes()} nodes)")
+            self._graph = self.csr.to_networkx()
+        return self._graph
+
+    @graph.setter
+    def graph(self, value):
+        self._graph = value
+
+    def load_transactions(self, transactions_df, graph_backend=None, accounts=None):
+        """Load transaction data, optionally choosing the graph backend and an AccountCodec"""
+        # With a codec, from_account / to_account already hold its int32 codes
+        self.accounts = accounts
+        if graph_backend is not None:
+            if graph_backend not in self.GRAPH_BACKENDS:
+                raise ValueError(f"Unknown graph backend '{graph_backend}'. Expected one of {self.GRAPH_BACKENDS}")
+            self.graph_backend = graph_backend
 
-    def load_transactions(self, transactions_df):
-        """Load transaction data"""
         self.transactions = transactions_df.copy()
+        self.rings = {}  # Rings from a previous load refer to a different code space
+        self._cycle_keys = set()
+        self.layout_cache.clear()
+        self.reduced_layout_cache.clear()
         self._build_graph()
 
+    def append_transactions(self, transactions_df, max_cycle_length=8, max_cycles=1000, timeout_seconds=60):
+        """Add a batch of transactions and detect only the cycles it creates (batch encoded with the same codec)"""
+        if self.transactions is None:
+            self.load_transactions(transactions_df, accounts=self.accounts)
+            return []
+
+        start_time = time.time()
+        deadline = start_time + timeout_seconds
+        self._transaction_batches.append(transactions_df.copy())
+
+        # Only the batch's (from, to) pairs are aggregated and merged into the graph
+        num_accounts = self.num_accounts()
+        touched, num_new_edges = self.edge_table.extend(transactions_df, self._edge_id)
+        first_new = len(self.edge_table) - num_new_edges
+        if self.accounts is not None:
+            new_accounts = list(range(num_accounts, len(self.accounts)))
+        else:
+            endpoints = pd.unique(np.concatenate([self.edge_table.src[first_new:], self.edge_table.dst[first_new:]]))
+            known = self.csr.codes(endpoints) >= 0 if self.csr is not None else [a in self._graph for a in endpoints]
+            new_accounts = endpoints[~np.asarray(known, dtype=bool)].tolist()
+
+        if self.csr is not None:
+            self.csr.extend(self.edge_table, new_accounts, touched, num_new_edges)
+            self._graph = None
+        else:
+            self._graph.add_nodes_from(new_accounts)
+            self._graph.add_edges_from(self.edge_table.edge_attributes(
+                np.concatenate([touched, np.arange(first_new, len(self.edge_table))])))
+        self.graph_version += 1
+
+        # A cycle that is new after the append uses at least one new (from, to) pair,
+        # so the bounded bidirectional search runs from those edges only
+        sources = self.edge_table.src[first_new:]
+        targets = self.edge_table.dst[first_new:]
+        not_loop = sources != targets
+        if self.csr is not None:
+            graph = self.csr
+            sources = self.csr.codes(sources[not_loop]).tolist()
+            targets = self.csr.codes(targets[not_loop]).tolist()
+        else:
+            graph = self.graph
+            sources = sources[not_loop].tolist()
+            targets = targets[not_loop].tolist()
+
+        cycles = []
+        self._duplicate_cycles = 0
+        try:
+            for u, v in zip(sources, targets):
+                for cycle in cycles_through_edge(graph, u, v, max_cycle_length, deadline=deadline):
+                    if len(cycles) >= max_cycles:
+                        break
+                    if not self._is_new_cycle(cycle):
+                        continue
+                    if self.csr is not None:
+                        cycle = self.csr.labels[cycle].tolist()
+                    cycle_data = self._analyze_cycle(canonical_cycle(cycle))
+                    if cycle_data:
+                        cycles.append(cycle_data)
+
+                if len(cycles) >= max_cycles or time.time() > deadline:
+                    break
+
+        except Exception as e:
+            print(f"[DETECTOR] Error in incremental cycle detection: {e}")
+
+        print(f"[DETECTOR] Appended {len(transactions_df)} transactions ({num_new_edges} new edges): "
+              f"{len(cycles)} new circular routing patterns in {time.time() - start_time:.2f}s")
+        self.detection_stats['incremental'] = {
+            'transactions_appended': len(transactions_df),
+            'new_edges': num_new_edges,
+            'cycles_found': len(cycles),
+            'duplicates_skipped': self._duplicate_cycles
+        }
+        return cycles
+
     def _build_graph(self):
         """Build transaction graph from data"""
-        self.graph = nx.DiGraph()
-
-        # Add nodes (accounts)
-        accounts = set(self.transactions['from_account']).union(set(self.transactions['to_account']))
-        self.graph.add_nodes_from(accounts)
-
-        # Add edges (transactions)
-        for _, row in self.transactions.iterrows():
-            self.graph.add_edge(
-                row['from_account'],
-                row['to_account'],
-                amount=row['amount'],
-                timestamp=row['timestamp'],
-                transaction_id=row['transaction_id']
-            )
-
-    def detect_circular_fund_routing(self, max_cycle_length=8, max_cycles=1000, timeout_seconds=300):
+        # Add nodes (accounts); encoded accounts are simply codes 0..n-1
+        if self.accounts is not None:
+            accounts = list(range(len(self.accounts)))
+        else:
+            accounts = pd.unique(pd.concat(
+                [self.transactions['from_account'], self.transactions['to_account']],
+                ignore_index=True
+            )).tolist()
+
+        # Aggregate all parallel transactions per (from, to) pair in one sorted
+        # pass and bulk-load one edge per pair. Edge attributes carry the exact
+        # totals; the per-edge (timestamp, amount) history lives in the edge table.
+        self.edge_table = EdgeTable.from_transactions(self.transactions)
+        self.graph_version += 1
+
+        if self.graph_backend == 'csr':
+            self.csr = CSRGraph.from_edge_table(self.edge_table, accounts)
+            self._graph = None
+            print(f"[DETECTOR] Built CSR graph: {self.csr.number_of_nodes()} nodes, "
+                  f"{self.csr.number_of_edges()} edges, {self.csr.nbytes / 1024**2:.1f} MB")
+        else:
+            self.csr = None
+            self._graph = nx.DiGraph()
+            self._graph.add_nodes_from(accounts)
+            self._graph.add_edges_from(self.edge_table.edge_attributes())
+
+    def num_accounts(self):
+        """Number of accounts (nodes) without materializing a networkx graph"""
+        if self.csr is not None:
+            return self.csr.number_of_nodes()
+        return self._graph.number_of_nodes() if self._graph is not None else 0
+
+    def num_edges(self):
+        """Number of distinct (from, to) edges without materializing a networkx graph"""
+        if self.csr is not None:
+            return self.csr.number_of_edges()
+        return self._graph.number_of_edges() if self._graph is not None else 0
+
+    def _edge_data(self, from_account, to_account):
+        """Edge attributes for an account pair on whichever backend is active"""
+        if self.csr is not None:
+            u, v = self.csr.code(from_account), self.csr.code(to_account)
+            if u < 0 or v < 0:
+                return None
+            edge_data = self.csr.edge_data(u, v)
+            if edge_data is not None:
+                edge_data['transaction_id'] = self.edge_table.last_transaction_id[edge_data['edge_id']]
+            return edge_data
+        return self._graph.get_edge_data(from_account, to_account)
+
+    def _edge_id(self, from_account, to_account):
+        """EdgeTable id of an existing edge, or -1"""
+        edge_data = self._edge_data(from_account, to_account)
+        return -1 if edge_data is None else edge_data['edge_id']
+
+    def edge_record(self, from_account, to_account):
+        """Get the aggregated record of an edge, including its sorted (timestamp, amount) array"""
+        edge_data = self._edge_data(from_account, to_account)
+        if edge_data is None:
+            return None
+
+        record = dict(edge_data)
+        record['transactions'] = self.edge_table.transactions(edge_data['edge_id'])
+        return record
+
+    def detect_circular_fund_routing(self, max_cycle_length=8, max_cycles=1000, timeout_seconds=300, workers=None):
         """Detect circular fund routing patterns with scalability limits"""
         cycles = []
         start_time = time.time()
+        workers = workers or self.cycle_workers
+        self._cycle_keys = set()
+        self._duplicate_cycles = 0
         
         try:
+            if workers > 1:
+                # Exhaustive bounded search, strongly connected components spread
+                # over a process pool under a shared cycle budget and deadline
+                print(f"[DETECTOR] Parallel cycle search with {workers} workers")
+                cycles = self._detect_cycles_parallel(max_cycle_length, max_cycles, timeout_seconds, workers)
+
             # For large graphs, limit cycle detection to avoid exponential time
-            if self.graph.number_of_nodes() > 10000 or self.graph.number_of_edges() > 50000:
-                print(f"[DETECTOR] Large graph detected ({self.graph.number_of_nodes()} nodes, {self.graph.number_of_edges()} edges)")
+            elif self.num_accounts() > 10000 or self.num_edges() > 50000:
+                print(f"[DETECTOR] Large graph detected ({self.num_accounts()} nodes, {self.num_edges()} edges)")
                 print("[DETECTOR] Using optimized cycle detection for large datasets")
                 
                 # Use a more efficient approach for large graphs
                 cycles = self._detect_cycles_efficiently(max_cycle_length, max_cycles, timeout_seconds)
             else:
-                # For smaller graphs, use the original approach
-                all_cycles = list(nx.simple_cycles(self.graph))
-                
-                for cycle in all_cycles[:max_cycles]:  # Limit number of cycles
-                    if len(cycle) <= max_cycle_length:
-                        if time.time() - start_time > timeout_seconds:
-                            print(f"[DETECTOR] Cycle detection timed out after {timeout_seconds}s")
-                            break
-                            
-                        cycle_data = self._analyze_cycle(cycle)
-                        if cycle_data:
-                            cycles.append(cycle_data)
+                # For smaller graphs, enumerate all cycles up to max_cycle_length.
+                # The enumerator is lazy and length-bounded, so the cycle cap and
+                # the timeout stop the search itself, not just the reporting.
+                graph = self.csr if self.csr is not None else self.graph
+                deadline = start_time + timeout_seconds
+
+                for cycle in bounded_simple_cycles(graph, max_cycle_length, deadline=deadline):
+                    if len(cycles) >= max_cycles:  # Limit number of cycles
+                        break
+                    if not self._is_new_cycle(cycle):
+                        continue
+                    if self.csr is not None:
+                        cycle = self.csr.labels[cycle].tolist()
+
+                    cycle_data = self._analyze_cycle(cycle)
+                    if cycle_data:
+                        cycles.append(cycle_data)
+
+                if time.time() > deadline:
+                    print(f"[DETECTOR] Cycle detection timed out after {timeout_seconds}s")
                             
-            print(f"[DETECTOR] Found {len(cycles)} circular routing patterns")
+            print(f"[DETECTOR] Found {len(cycles)} circular routing patterns "
+                  f"({self._duplicate_cycles} duplicate rotations skipped)")
+            self.detection_stats['circular_routing'] = {
+                'mode': 'structural',
+                'cycles_found': len(cycles),
+                'duplicates_skipped': self._duplicate_cycles
+            }
             return cycles
             
         except Exception as e:
             print(f"[DETECTOR] Error in cycle detection: {e}")
             return cycles
 
+    def detect_temporal_cycles(self, window_hours=24, max_cycle_length=8, max_cycles=1000, timeout_seconds=300):
+        """Detect time-respecting circular routing: each hop later than the previous, all within the window"""
+        cycles = []
+        start_time = time.time()
+        deadline = start_time + timeout_seconds
+        window_ns = int(window_hours * 3600 * 1e9)
+        self._cycle_keys = set()
+        self._duplicate_cycles = 0
+
+        try:
+            graph = self.csr if self.csr is not None else self.graph
+            for cycle, hop_times, _ in temporal_cycles(graph, self.edge_table, window_ns,
+                                                       max_cycle_length, deadline=deadline):
+                if len(cycles) >= max_cycles:
+                    break
+                if not self._is_new_cycle(cycle):
+                    continue
+                if self.csr is not None:
+                    cycle = self.csr.labels[cycle].tolist()
+
+                cycle_data = self._analyze_cycle(cycle)
+                if cycle_data:
+                    # Report the span of the time-ordered hops, not of every transaction on the edges
+                    cycle_data['time_span_seconds'] = (hop_times[-1] - hop_times[0]) / 1e9
+                    cycle_data['start_time'] = pd.Timestamp(hop_times[0])
+                    cycle_data['end_time'] = pd.Timestamp(hop_times[-1])
+                    cycle_data['window_hours'] = window_hours
+                    cycles.append(cycle_data)
+
+            if time.time() > deadline:
+                print(f"[DETECTOR] Temporal cycle detection timed out after {timeout_seconds}s")
+
+        except Exception as e:
+            print(f"[DETECTOR] Error in temporal cycle detection: {e}")
+
+        print(f"[DETECTOR] Found {len(cycles)} temporal circular routing patterns within {window_hours}h")
+        self.detection_stats['circular_routing'] = {
+            'mode': 'temporal',
+            'window_hours': window_hours,
+            'cycles_found': len(cycles),
+            'duplicates_skipped': self._duplicate_cycles
+        }
+        return cycles
+
+    def _detect_cycles_parallel(self, max_cycle_length=8, max_cycles=1000, timeout_seconds=300, workers=2):
+        """Cycle detection across worker processes with deterministic merged results"""
+        graph = self.csr if self.csr is not None else self.graph
+        deadline = time.time() + timeout_seconds
+
+        found_cycles = parallel_bounded_cycles(graph, max_cycle_length, max_cycles, workers, deadline=deadline)
+        if time.time() > deadline:
+            print(f"[DETECTOR] Cycle detection timed out after {timeout_seconds}s")
+
+        cycles = []
+        for cycle in found_cycles:
+            if not self._is_new_cycle(cycle):
+                continue
+            if self.csr is not None:
+                cycle = self.csr.labels[cycle].tolist()
+            cycle_data = self._analyze_cycle(cycle)
+            if cycle_data:
+                cycles.append(cycle_data)
+        return cycles
+
     def _detect_cycles_efficiently(self, max_cycle_length=8, max_cycles=1000, timeout_seconds=300):
         """Efficient cycle detection for large graphs"""
         cycles = []
         start_time = time.time()
         
         # Sample high-degree nodes for cycle detection
-        degrees = dict(self.graph.degree())
-        high_degree_nodes = sorted(degrees.keys(), key=lambda x: degrees[x], reverse=True)[:min(1000, len(degrees))]
+        if self.csr is not None:
+            # Degrees straight from the CSR offsets; nodes are integer codes
+            degrees = self.csr.degree()
+            high_degree_nodes = np.argsort(-degrees, kind='stable')[:1000].tolist()
+        else:
+            degrees = dict(self.graph.degree())
+            high_degree_nodes = sorted(degrees.keys(), key=lambda x: degrees[x], reverse=True)[:min(1000, len(degrees))]
         
         print(f"[DETECTOR] Sampling from {len(high_degree_nodes)} high-degree nodes")
         
@@ -91,6 +371,8 @@ class MoneyMulingDetector:
                 for cycle in node_cycles:
                     if len(cycles) >= max_cycles:
                         break
+                    if self.csr is not None:
+                        cycle = self.csr.labels[cycle].tolist()
                     cycle_data = self._analyze_cycle(cycle)
                     if cycle_data:
                         cycles.append(cycle_data)
@@ -99,14 +381,28 @@ class MoneyMulingDetector:
                 
         return cycles
 
+    def _is_new_cycle(self, cycle):
+        """Record a cycle by its canonical rotation; False if that ring was already seen"""
+        key = tuple(canonical_cycle(cycle))
+        if key in self._cycle_keys:
+            self._duplicate_cycles += 1
+            return False
+        self._cycle_keys.add(key)
+        return True
+
     def _find_cycles_from_node(self, start_node, max_length=8, max_cycles=10):
-        """Find cycles starting from a specific node using DFS"""
+        """Find new cycles through a specific node using DFS (canonical form, duplicates skipped)"""
         cycles = []
         visited = set()
         path = []
+        if self.csr is not None:
+            def successors(node):
+                return self.csr.successors(node).tolist()
+        else:
+            successors = self.graph.successors
         
         def dfs(current, depth=0):
-            if depth > max_length:
+            if depth >= max_length:
                 return
             if len(cycles) >= max_cycles:
                 return
@@ -114,10 +410,12 @@ class MoneyMulingDetector:
             path.append(current)
             visited.add(current)
             
-            for neighbor in self.graph.successors(current):
+            for neighbor in successors(current):
                 if neighbor == start_node and len(path) > 2:
-                    # Found a cycle
-                    cycles.append(path + [start_node])
+                    # Found a cycle; the path already holds every member exactly once
+                    cycle = canonical_cycle(path)
+                    if self._is_new_cycle(cycle):
+                        cycles.append(cycle)
                 elif neighbor not in visited:
                     dfs(neighbor, depth + 1)
                     
@@ -132,21 +430,25 @@ class MoneyMulingDetector:
         try:
             cycle_edges = []
             total_amount = 0
-            timestamps = []
+            num_transactions = 0
+            first_timestamps = []
+            last_timestamps = []
 
             for i in range(len(cycle)):
                 from_acc = cycle[i]
                 to_acc = cycle[(i + 1) % len(cycle)]
 
-                if self.graph.has_edge(from_acc, to_acc):
-                    edge_data = self.graph.get_edge_data(from_acc, to_acc)
-                    if isinstance(edge_data, dict):
-                        cycle_edges.append((from_acc, to_acc, edge_data))
-                        total_amount += edge_data.get('amount', 0)
-                        timestamps.append(edge_data.get('timestamp'))
+                edge_data = self._edge_data(from_acc, to_acc)
+                if isinstance(edge_data, dict):
+                    # Edge attributes aggregate every parallel transaction on the edge
+                    cycle_edges.append((from_acc, to_acc, edge_data))
+                    total_amount += edge_data.get('amount', 0)
+                    num_transactions += edge_data.get('transaction_count', 1)
+                    first_timestamps.append(edge_data.get('first_timestamp', edge_data.get('timestamp')))
+                    last_timestamps.append(edge_data.get('last_timestamp', edge_data.get('timestamp')))
 
             if cycle_edges:
-                time_span = max(timestamps) - min(timestamps) if len(timestamps) > 1 else timedelta(0)
+                time_span = max(last_timestamps) - min(first_timestamps)
                 
                 ring_id = f"RING_{len(self.rings):03d}"
                 self.rings[ring_id] = {
@@ -160,6 +462,7 @@ class MoneyMulingDetector:
                     'cycle': cycle,
                     'length': len(cycle),
                     'total_amount': total_amount,
+                    'num_transactions': num_transactions,
                     'time_span_seconds': time_span.total_seconds(),
                     'ring_id': ring_id
                 }
@@ -168,99 +471,146 @@ class MoneyMulingDetector:
             
         return None
 
-    def detect_smurfing_patterns(self, threshold_amount=10000, min_splits=3):
-
-        # Group transactions by source account and time window
-        grouped = self.transactions.groupby(['from_account', pd.Grouper(key='timestamp', freq='1h')])
-
-        for (source_account, time_window), group in grouped:
-            if len(group) >= min_splits:
-                total_outflow = group['amount'].sum()
-                avg_amount = group['amount'].mean()
-                max_amount = group['amount'].max()
+    def _window_scanner(self):
+        """Time-sorted transaction copy shared by the fan-out and fan-in detectors"""
+        if self._scanner is None or self._scanner[0] != self.graph_version:
+            self._scanner = (self.graph_version, SlidingWindowScanner(self.transactions))
+        return self._scanner[1]
+
+    def detect_smurfing_patterns(self, threshold_amount=10000, min_splits=3, window_hours=None):
+        """Detect smurfing (fan-out): bursts of small outgoing transactions within sliding windows"""
+        # window_hours is one width or a sequence (default SMURFING_WINDOWS_HOURS)
+        return self._detect_structuring('fan_out', threshold_amount, min_splits, window_hours)
+
+    def detect_fan_in_patterns(self, threshold_amount=10000, min_splits=3, window_hours=None):
+        """Detect fan-in structuring: bursts of small deposits collected by one account"""
+        return self._detect_structuring('fan_in', threshold_amount, min_splits, window_hours)
+
+    def _detect_structuring(self, direction, threshold_amount, min_splits, window_hours):
+        """Sliding-window structuring findings for one direction ('fan_out' or 'fan_in')"""
+        findings = []
+        if window_hours is None:
+            window_hours = self.SMURFING_WINDOWS_HOURS
+        windows_hours = sorted(np.atleast_1d(window_hours).tolist())
+        fan_out = direction == 'fan_out'
 
-                # Check if this looks like smurfing
-                if (total_outflow > threshold_amount and
-                    avg_amount < threshold_amount * 0.1 and
-                    max_amount < threshold_amount * 0.5):
+        try:
+            windows = self._window_scanner().grouped('from_account' if fan_out else 'to_account')
+            clusters = windows.find_clusters([hours * 3600 for hours in windows_hours], threshold_amount, min_splits)
+            counterparties_per_cluster = windows.segment_counterparties(clusters['start'], clusters['end'])
+            scores = self._calculate_smurfing_scores(
+                *windows.segment_amounts(clusters['start'], clusters['end']), threshold_amount)
+            window_starts = windows.timestamps(clusters['start'])
+            window_ends = windows.timestamps(clusters['end'] - 1)
+
+            for index, (account, counterparties) in enumerate(zip(clusters['account'].tolist(),
+                                                                  counterparties_per_cluster)):
+                total_amount = float(clusters['total'][index])
+                num_transactions = int(clusters['count'][index])
 
-                    recipients = list(group['to_account'].unique())
-                    ring_id = f"RING_{len(self.rings):03d}"
-                    
+                ring_id = f"RING_{len(self.rings):03d}"
+                finding = {
+                    'direction': direction,
+                    'time_window': window_starts[index],
+                    'window_end': window_ends[index],
+                    'window_hours': clusters['window'][index] / 3600,
+                    'matched_windows_hours': [seconds / 3600 for seconds in clusters['matched_windows'][index]],
+                    'total_amount': total_amount,
+                    'num_transactions': num_transactions,
+                    'avg_amount': total_amount / num_transactions,
+                    'suspicious_score': float(scores[index]),
+                    'ring_id': ring_id
+                }
+                if fan_out:
+                    finding.update(source_account=account, recipients=counterparties)
                     self.rings[ring_id] = {
                         'type': 'smurfing',
-                        'members': [source_account] + recipients,
-                        'source': source_account,
-                        'recipients': recipients,
-                        'total_amount': total_outflow
+                        'direction': direction,
+                        'members': [account] + counterparties,
+                        'source': account,
+                        'recipients': counterparties,
+                        'total_amount': total_amount
                     }
+                else:
+                    finding.update(target_account=account, senders=counterparties)
+                    self.rings[ring_id] = {
+                        'type': 'smurfing',
+                        'direction': direction,
+                        'members': [account] + counterparties,
+                        'target': account,
+                        'senders': counterparties,
+                        'total_amount': total_amount
+                    }
+                findings.append(finding)
 
-                    smurfing_groups.append({
-                        'source_account': source_account,
-                        'time_window': time_window,
-                        'total_amount': total_outflow,
-                        'num_transactions': len(group),
-                        'recipients': recipients,
-                        'avg_amount': avg_amount,
-                        'suspicious_score': self._calculate_smurfing_score(group, threshold_amount),
-                        'ring_id': ring_id
-                    })
-
-        return smurfing_groups
+        except Exception as e:
+            print(f"[DETECTOR] Error detecting {direction} smurfing patterns: {e}")
+
+        per_window = defaultdict(int)
+        for finding in findings:
+            per_window[finding['window_hours']] += 1
+        print(f"[DETECTOR] Found {len(findings)} {direction} smurfing patterns across {windows_hours}h windows")
+        self.detection_stats['smurfing' if fan_out else 'fan_in'] = {
+            'windows_hours': windows_hours,
+            'patterns_per_window': {hours: per_window.get(hours, 0) for hours in windows_hours}
+        }
+        return findings
 
-    def detect_layered_shell_networks(self, min_layer_depth=3):
+    def detect_layered_shell_networks(self, min_layer_depth=3, centrality_mode='auto',
+                                      centrality_epsilon=0.05, centrality_max_samples=500):
         """Detect layered shell network patterns"""
+        # Betweenness is exact on small graphs and sampled (within centrality_epsilon) on large ones
         shell_networks = []
 
         # Find accounts with high centrality but low legitimate activity
         try:
-            # Calculate centrality measures
-            betweenness = nx.betweenness_centrality(self.graph)
-            degree = dict(self.graph.degree())
-
-            # Calculate transaction volumes
-            account_volumes = defaultdict(float)
-            for _, row in self.transactions.iterrows():
-                account_volumes[row['from_account']] += row['amount']
-                account_volumes[row['to_account']] += row['amount']
-
-            # Identify potential shell accounts
-            potential_shells = []
-            for account in self.graph.nodes():
-                centrality_score = betweenness.get(account, 0)
-                degree_score = degree.get(account, 0)
-                volume = account_volumes.get(account, 0)
-
-                # Shell accounts typically have high centrality but low volume
-                if centrality_score > np.percentile(list(betweenness.values()), 75) and volume < np.percentile(list(account_volumes.values()), 25):
-                    potential_shells.append({
-                        'account': account,
-                        'centrality': centrality_score,
-                        'degree': degree_score,
-                        'volume': volume
-                    })
-
-            # Find connected components of shell accounts
-            shell_subgraph = self.graph.subgraph([s['account'] for s in potential_shells])
-            components = list(nx.connected_components(shell_subgraph.to_undirected()))
+            # Calculate centrality measures (cached until the graph changes)
+            cache_hits = self.centrality_cache.hits
+            nodes, scores, centrality_info = self.betweenness(centrality_mode, centrality_epsilon,
+                                                              centrality_max_samples)
+            centrality_info = dict(centrality_info, cached=self.centrality_cache.hits > cache_hits)
+            print(f"[DETECTOR] Betweenness centrality: {centrality_info['mode']} "
+                  f"({centrality_info['samples']} sources, epsilon {centrality_info['epsilon']}, "
+                  f"cached {centrality_info['cached']})")
+            self.detection_stats['shell_networks'] = {'centrality': centrality_info}
+
+            # Transaction volumes (in + out) aligned with the centrality scores
+            volume = self._account_volumes(nodes)
+
+            # Shell accounts typically have high centrality but low volume;
+            # both percentiles are taken once over all accounts
+            is_shell = (scores > np.percentile(scores, 75)) & (volume < np.percentile(volume, 25))
+            shell_positions = np.flatnonzero(is_shell)
+            print(f"[DETECTOR] {len(shell_positions)} potential shell accounts out of {len(nodes)}")
+
+            # Find connected components of shell accounts (as positions in nodes)
+            if self.csr is not None:
+                # CSR node codes are the positions themselves
+                components = self.csr.connected_components(shell_positions)
+            else:
+                node_index = pd.Index(nodes)
+                shell_subgraph = self.graph.subgraph([nodes[i] for i in shell_positions.tolist()])
+                components = [node_index.get_indexer(list(component)).tolist()
+                              for component in nx.connected_components(shell_subgraph.to_undirected())]
 
             for component in components:
                 if len(component) >= min_layer_depth:
                     ring_id = f"RING_{len(self.rings):03d}"
-                    component_list = list(component)
-                    
+                    component_list = [nodes[i] for i in component]
+                    total_volume = float(volume[component].sum())
+
                     self.rings[ring_id] = {
                         'type': 'shell_network',
                         'members': component_list,
                         'size': len(component_list),
-                        'total_volume': sum(account_volumes.get(acc, 0) for acc in component_list)
+                        'total_volume': total_volume
                     }
 
                     shell_networks.append({
                         'accounts': component_list,
                         'size': len(component),
-                        'total_volume': sum(account_volumes.get(acc, 0) for acc in component),
-                        'avg_centrality': np.mean([betweenness.get(acc, 0) for acc in component]),
+                        'total_volume': total_volume,
+                        'avg_centrality': float(scores[component].mean()),
                         'ring_id': ring_id
                     })
 
@@ -269,143 +619,250 @@ class MoneyMulingDetector:
 
         return shell_networks
 
-    def _detect_cycles_efficiently(self, max_cycle_length=8, max_cycles=1000, timeout_seconds=300):
-        """Efficient cycle detection for large graphs"""
-        cycles = []
-        start_time = time.time()
-        
-        # Sample high-degree nodes for cycle detection
-        degrees = dict(self.graph.degree())
-        high_degree_nodes = sorted(degrees.keys(), key=lambda x: degrees[x], reverse=True)[:min(1000, len(degrees))]
-        
-        print(f"[DETECTOR] Sampling from {len(high_degree_nodes)} high-degree nodes")
-        
-        for node in high_degree_nodes[:100]:  # Limit starting nodes
-            if time.time() - start_time > timeout_seconds:
-                break
-                
-            try:
-                # Find cycles starting from this node
-                node_cycles = self._find_cycles_from_node(node, max_cycle_length, max_cycles // 100)
-                for cycle in node_cycles:
-                    if len(cycles) >= max_cycles:
-                        break
-                    cycle_data = self._analyze_cycle(cycle)
-                    if cycle_data:
-                        cycles.append(cycle_data)
-            except:
-                continue
-                
-        return cycles
-    
-    def _find_cycles_from_node(self, start_node, max_length=8, max_cycles=10):
-        """Find cycles starting from a specific node using DFS"""
-        cycles = []
-        visited = set()
-        path = []
-        
-        def dfs(current, depth=0):
-            if depth > max_length:
-                return
-            if len(cycles) >= max_cycles:
-                return
-                
-            path.append(current)
-            visited.add(current)
-            
-            for neighbor in self.graph.successors(current):
-                if neighbor == start_node and len(path) > 2:
-                    # Found a cycle
-                    cycles.append(path + [start_node])
-                elif neighbor not in visited:
-                    dfs(neighbor, depth + 1)
-                    
-            path.pop()
-            visited.remove(current)
-        
-        dfs(start_node)
-        return cycles
-    
-    def _analyze_cycle(self, cycle):
-        """Analyze a single cycle and return cycle data"""
-        try:
-            cycle_edges = []
-            total_amount = 0
-            timestamps = []
-
-            for i in range(len(cycle)):
-                from_acc = cycle[i]
-                to_acc = cycle[(i + 1) % len(cycle)]
+    def betweenness(self, mode='auto', epsilon=0.05, max_samples=500):
+        """(nodes, scores, info) betweenness of the current graph, computed once per graph version"""
+        def compute():
+            graph = self.csr if self.csr is not None else self.graph
+            return betweenness_centrality(graph, mode=mode, epsilon=epsilon, max_samples=max_samples,
+                                          workers=self.centrality_workers)
+
+        return self.centrality_cache.get(self.graph_version, ('betweenness', mode, epsilon, max_samples), compute)
+
+    def cached_betweenness(self, mode='auto', epsilon=0.05, max_samples=500):
+        """betweenness() if it was already computed for the current graph version, else None"""
+        return self.centrality_cache.peek(self.graph_version, ('betweenness', mode, epsilon, max_samples))
+
+    def risk_flow(self):
+        """RiskFlow (amount-weighted counterparty matrix) of the current graph, cached per graph version"""
+        def compute():
+            nodes = self.csr.labels.tolist() if self.csr is not None else list(self.graph.nodes())
+            return RiskFlow.from_edge_table(nodes, self.edge_table)
+
+        return self.centrality_cache.get(self.graph_version, ('risk_flow',), compute)
+
+    def reduced_graph(self, rings, node_budget=500, hops=1):
+        """ReducedGraph around the members of rings, cached per graph version, budget and ring membership"""
+        ring_key = tuple((ring_id, tuple(ring.get('members', []))) for ring_id, ring in rings.items())
+
+        def compute():
+            nodes = self.csr.labels.tolist() if self.csr is not None else list(self.graph.nodes())
+            members = [member for ring in rings.values() for member in ring.get('members', [])]
+            return ReducedGraph.from_edge_table(nodes, self.edge_table, members, node_budget=node_budget, hops=hops)
+
+        return self.centrality_cache.get(self.graph_version, ('reduced_graph', node_budget, hops, ring_key), compute)
+
+    def personalized_pagerank(self, seed_accounts, top_k=20, alpha=0.15, epsilon=1e-4, include_seeds=False):
+        """(ranked, info) accounts most flow-connected to the seed accounts, by local push personalized PageRank"""
+        flow = self.risk_flow()
+        seeds = flow.positions(list(seed_accounts))
+        seeds = seeds[seeds >= 0]
+        if len(seeds) == 0:
+            return [], {'pushes': 0, 'touched': 0, 'converged': True, 'alpha': alpha, 'epsilon': epsilon}
+
+        rows, scores, info = flow.personalized_pagerank(seeds, alpha=alpha, epsilon=epsilon)
+        is_seed = np.isin(rows, seeds)
+        if not include_seeds:
+            rows, scores, is_seed = rows[~is_seed], scores[~is_seed], is_seed[~is_seed]
+
+        top = np.argsort(-scores, kind='stable')[:top_k]
+        ranked = [{
+            'account_id': flow.nodes[row],
+            'score': float(score),
+            'is_seed': bool(seed)
+        } for row, score, seed in zip(rows[top].tolist(), scores[top].tolist(), is_seed[top].tolist())]
+
+        print(f"[DETECTOR] Personalized PageRank from {len(seeds)} seeds: {info['pushes']} pushes, "
+              f"{info['touched']} accounts touched")
+        return ranked, info
+
+    def detect_pass_through_chains(self, min_chain_length=3, max_degree=2, flow_tolerance=0.1,
+                                   max_delay_hours=24, centrality_mode='auto'):
+        """Detect layering as chains of low-degree pass-through accounts"""
+        chains = []
 
-                if self.graph.has_edge(from_acc, to_acc):
-                    edge_data = self.graph.get_edge_data(from_acc, to_acc)
-                    if isinstance(edge_data, dict):
-                        cycle_edges.append((from_acc, to_acc, edge_data))
-                        total_amount += edge_data.get('amount', 0)
-                        timestamps.append(edge_data.get('timestamp'))
+        try:
+            nodes = self.csr.labels.tolist() if self.csr is not None else list(self.graph.nodes())
+            num_nodes = len(nodes)
+            node_index = pd.Index(nodes)
+            src = node_index.get_indexer(self.edge_table.src)
+            dst = node_index.get_indexer(self.edge_table.dst)
+            amounts = self.edge_table.total_amount
+            first_times = self.edge_table.first_time
+
+            # Per-account in / out aggregates
+            out_degree = np.bincount(src, minlength=num_nodes)
+            in_degree = np.bincount(dst, minlength=num_nodes)
+            outflow = np.bincount(src, weights=amounts, minlength=num_nodes)
+            inflow = np.bincount(dst, weights=amounts, minlength=num_nodes)
+            no_time = np.iinfo(np.int64).max
+            first_out = np.full(num_nodes, no_time)
+            np.minimum.at(first_out, src, first_times)
+            first_in = np.full(num_nodes, no_time)
+            np.minimum.at(first_in, dst, first_times)
+
+            # Few counterparties each side, balanced flow, money leaves soon after it arrives
+            delay = first_out - first_in
+            is_pass_through = (
+                (in_degree >= 1) & (in_degree <= max_degree) &
+                (out_degree >= 1) & (out_degree <= max_degree) &
+                (np.abs(inflow - outflow) <= flow_tolerance * np.maximum(inflow, outflow)) &
+                (delay >= 0) & (delay <= max_delay_hours * 3600 * 1e9)
+            )
 
-            if cycle_edges:
-                time_span = max(timestamps) - min(timestamps) if len(timestamps) > 1 else timedelta(0)
-                
+            # One-to-one links between pass-through accounts
+            link = is_pass_through[src] & is_pass_through[dst] & (src != dst)
+            link_out = np.bincount(src[link], minlength=num_nodes)
+            link_in = np.bincount(dst[link], minlength=num_nodes)
+            link &= (link_out[src] == 1) & (link_in[dst] == 1)
+
+            next_node = np.full(num_nodes, -1)
+            next_node[src[link]] = dst[link]
+            has_previous = np.zeros(num_nodes, dtype=bool)
+            has_previous[dst[link]] = True
+
+            # Walk each maximal chain from its head; linked accounts without a head form a cycle
+            next_list = next_node.tolist()
+            # Reuse betweenness only if the shell detector already computed it; never start it from here
+            cached = self.cached_betweenness(centrality_mode)
+            centrality = None
+            for head in np.flatnonzero((next_node >= 0) & ~has_previous).tolist():
+                chain = [head]
+                while next_list[chain[-1]] >= 0:
+                    chain.append(next_list[chain[-1]])
+                if len(chain) < min_chain_length:
+                    continue
+
+                component_list = [nodes[i] for i in chain]
+                total_volume = float(inflow[chain].sum() + outflow[chain].sum())
+                if cached is not None:
+                    if centrality is None:
+                        centrality = cached[1][pd.Index(cached[0]).get_indexer(nodes)]
+                    avg_centrality = float(centrality[chain].mean())
+                else:
+                    # Betweenness from the paths along the chain alone (feeder -> members -> exit):
+                    # member j relays (j + 1) * (len - j) pairs, normalized as for directed graphs
+                    length = len(chain)
+                    avg_centrality = (length + 1) * (length + 2) / 6 / max((num_nodes - 1) * (num_nodes - 2), 1)
                 ring_id = f"RING_{len(self.rings):03d}"
                 self.rings[ring_id] = {
-                    'type': 'circular_routing',
-                    'members': cycle,
-                    'edges': cycle_edges,
-                    'total_amount': total_amount
+                    'type': 'shell_network',
+                    'pattern': 'pass_through_chain',
+                    'members': component_list,
+                    'size': len(component_list),
+                    'total_volume': total_volume
                 }
 
-                return {
-                    'cycle': cycle,
-                    'length': len(cycle),
-                    'total_amount': total_amount,
-                    'time_span_seconds': time_span.total_seconds(),
+                chains.append({
+                    'accounts': component_list,
+                    'size': len(component_list),
+                    'total_volume': total_volume,
+                    'avg_centrality': avg_centrality,
+                    'pattern': 'pass_through_chain',
+                    'chain_inflow': float(inflow[chain[0]]),
+                    'chain_outflow': float(outflow[chain[-1]]),
+                    'max_delay_hours': float(delay[chain].max() / 3.6e12),
                     'ring_id': ring_id
-                }
+                })
+
+            print(f"[DETECTOR] {int(is_pass_through.sum())} pass-through accounts, {len(chains)} layering chains")
+            self.detection_stats['pass_through_chains'] = {
+                'pass_through_accounts': int(is_pass_through.sum()),
+                'chains_found': len(chains)
+            }
+
         except Exception as e:
-            print(f"[DETECTOR] Error analyzing cycle: {e}")
-            
-        return None
+            print(f"[DETECTOR] Error detecting pass-through chains: {e}")
+
+        return chains
+
+    def _account_volumes(self, nodes):
+        """Transaction volume (amount in + out) of every node, as an array aligned with nodes"""
+        if self.csr is not None:
+            return self.csr.weighted_degree()
 
-    def _calculate_smurfing_score(self, transaction_group, threshold):
-        """Calculate suspicious score for smurfing pattern"""
-        amounts = transaction_group['amount'].values
-        total = amounts.sum()
+        node_index = pd.Index(nodes)
+        amounts = self.edge_table.total_amount
+        return (np.bincount(node_index.get_indexer(self.edge_table.src), weights=amounts, minlength=len(nodes)) +
+                np.bincount(node_index.get_indexer(self.edge_table.dst), weights=amounts, minlength=len(nodes)))
 
-        # Score based on amount distribution uniformity
-        std_dev = np.std(amounts)
-        mean = np.mean(amounts)
+    def _calculate_smurfing_scores(self, amounts, offsets, threshold):
+        """Suspicious scores for many smurfing groups at once (group i is amounts[offsets[i]:offsets[i + 1]])"""
+        counts = np.diff(offsets)
+        num_groups = len(counts)
+        group = np.repeat(np.arange(num_groups), counts)
+        non_empty = counts > 0
+        safe_counts = np.maximum(counts, 1)
+
+        # Score based on amount distribution uniformity (population std / mean, two-pass)
+        mean = np.bincount(group, weights=amounts, minlength=num_groups) / safe_counts
+        deviation = amounts - mean[group]
+        std_dev = np.sqrt(np.bincount(group, weights=deviation * deviation, minlength=num_groups) / safe_counts)
 
         # Lower std/mean ratio indicates more uniform splitting (more suspicious)
-        uniformity_ratio = std_dev / mean if mean > 0 else 0
+        uniformity_ratio = np.divide(std_dev, mean, out=np.zeros(num_groups), where=mean > 0)
 
         # Score based on how well amounts avoid detection thresholds
-        amounts_below_threshold = sum(1 for amt in amounts if amt < threshold * 0.1)
-        threshold_avoidance_score = amounts_below_threshold / len(amounts)
+        threshold_avoidance_score = np.bincount(group, weights=amounts < threshold * 0.1,
+                                                minlength=num_groups) / safe_counts
+
+        scores = (1 - uniformity_ratio) * 0.6 + threshold_avoidance_score * 0.4
+        return np.where(non_empty, scores, 0.0)
+
+    def run_full_detection(self, temporal_window_hours=None, centrality_mode='auto'):
+        """Run all detection algorithms (temporal cycles if temporal_window_hours is set)"""
+        # Each run stores every ring exactly once
+        self.rings = {}
+        self.detection_stats = {}
 
-        return (1 - uniformity_ratio) * 0.6 + threshold_avoidance_score * 0.4
+        if temporal_window_hours:
+            circular_routing = self.detect_temporal_cycles(window_hours=temporal_window_hours)
+        else:
+            circular_routing = self.detect_circular_fund_routing()
 
-    def run_full_detection(self):
-        """Run all detection algorithms"""
         results = {
-            'circular_routing': self.detect_circular_fund_routing(),
-            'smurfing': self.detect_smurfing_patterns(),
-            'shell_networks': self.detect_layered_shell_networks(),
-            'rings': self.rings
+            'circular_routing': circular_routing,
+            'smurfing': self.detect_smurfing_patterns() + self.detect_fan_in_patterns(),
+            'shell_networks': (self.detect_layered_shell_networks(centrality_mode=centrality_mode) +
+                               self.detect_pass_through_chains(centrality_mode=centrality_mode)),
+            'rings': self.rings,
+            'detection_stats': self.detection_stats
         }
 
         return results
 
+    def decode_accounts(self, results):
+        """Decode account codes in detection / scoring output back to account IDs"""
+        if self.accounts is None:
+            return results
+        return self.accounts.decode_results(results)
+
+    def account_labels(self, accounts):
+        """Account IDs for a list of graph nodes"""
+        if self.accounts is None:
+            return list(accounts)
+        return self.accounts.decode(list(accounts))
+
     def get_all_accounts(self):
         """Get all accounts in the graph"""
-        return list(self.graph.nodes())
+        if self.csr is not None:
+            return self.account_labels(self.csr.labels.tolist())
+        return self.account_labels(self.graph.nodes())
 
     def get_account_transactions(self, account):
         """Get all transactions for a specific account"""
         if self.transactions is None:
             return []
-        
-        return self.transactions[
+
+        if self.accounts is not None:
+            account = self.accounts.code(account)
+
+        account_transactions = self.transactions[
             (self.transactions['from_account'] == account) | 
             (self.transactions['to_account'] == account)
-        ].to_dict('records')
\ No newline at end of file
+        ]
+        if self.accounts is not None:
+            account_transactions = account_transactions.assign(
+                from_account=self.accounts.decode(account_transactions['from_account']),
+                to_account=self.accounts.decode(account_transactions['to_account'])
+            )
+        return account_transactions.to_dict('records')
\ No newline at end of file
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+
+class EdgeTable:
+    """Aggregated per-edge records for all parallel transactions between two accounts.
+
+    Built in one sorted pass over the transactions. Edge k covers rows
+    offsets[k]:offsets[k + 1] of tx_time / tx_amount, which are sorted by
+    timestamp, so every aggregate is an O(1) array lookup and the full
+    (timestamp, amount) history of an edge is a slice, not a DataFrame scan.
+    Timestamps are stored as int64 nanoseconds.
+    """
+
+    TRANSACTION_DTYPE = np.dtype([('timestamp', 'datetime64[ns]'), ('amount', 'float64')])
+
+    def __init__(self, src, dst, count, total_amount, first_time, last_time,
+                 last_transaction_id, offsets, tx_time, tx_amount):
+        self.src = src
+        self.dst = dst
+        self.count = count
+        self.total_amount = total_amount
+        self.first_time = first_time
+        self.last_time = last_time
+        self.last_transaction_id = last_transaction_id
+        self.offsets = offsets
+        self.tx_time = tx_time
+        self.tx_amount = tx_amount
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """Build the table from a DataFrame with from_account, to_account, amount, timestamp"""
+        from_values = transactions['from_account'].to_numpy()
+        to_values = transactions['to_account'].to_numpy()
+        from_codes, _ = pd.factorize(from_values)
+        to_codes, _ = pd.factorize(to_values)
+        times = pd.to_datetime(transactions['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        amounts = transactions['amount'].to_numpy(dtype=np.float64)
+
+        # Sort once by (from, to, timestamp); each (from, to) run is one edge
+        order = np.lexsort((times, to_codes, from_codes))
+        from_codes = from_codes[order]
+        to_codes = to_codes[order]
+        tx_time = times[order]
+        tx_amount = amounts[order]
+
+        num_rows = len(order)
+        if num_rows == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(from_values[:0], to_values[:0], empty, np.empty(0), empty, empty,
+                       np.empty(0, dtype=object), np.zeros(1, dtype=np.int64), tx_time, tx_amount)
+
+        is_start = np.empty(num_rows, dtype=bool)
+        is_start[0] = True
+        is_start[1:] = (from_codes[1:] != from_codes[:-1]) | (to_codes[1:] != to_codes[:-1])
+        starts = np.flatnonzero(is_start)
+        offsets = np.append(starts, num_rows).astype(np.int64)
+        ends = offsets[1:] - 1
+
+        return cls(
+            src=from_values[order[starts]],
+            dst=to_values[order[starts]],
+            count=np.diff(offsets),
+            total_amount=np.add.reduceat(tx_amount, starts),
+            first_time=tx_time[starts],
+            last_time=tx_time[ends],
+            last_transaction_id=transactions['transaction_id'].to_numpy()[order[ends]],
+            offsets=offsets,
+            tx_time=tx_time,
+            tx_amount=tx_amount
+        )
+
+    def __len__(self):
+        return len(self.count)
+
+    def extend(self, transactions, find_edge):
+        """Merge a batch of transactions into the table in place.
+
+        find_edge(from_account, to_account) gives the id of an existing edge
+        or -1. Existing edges keep their ids and new (from, to) pairs become
+        edges len(self).. in order of first appearance. Only the batch is
+        grouped and sorted; stored rows are moved with vectorized copies.
+        Returns (ids of existing edges that received transactions, number of new edges).
+        """
+        num_edges = len(self)
+        if len(transactions) == 0:
+            return np.empty(0, dtype=np.int64), 0
+
+        from_values = transactions['from_account'].to_numpy()
+        to_values = transactions['to_account'].to_numpy()
+        pair_codes, pairs = pd.MultiIndex.from_arrays([from_values, to_values]).factorize()
+        pair_edge = np.array([find_edge(u, v) for u, v in pairs], dtype=np.int64)
+        is_new = pair_edge < 0
+        num_new = int(is_new.sum())
+        pair_edge[is_new] = num_edges + np.arange(num_new)
+        total_edges = num_edges + num_new
+
+        # Batch rows grouped by edge, time-sorted within each edge
+        row_edge = pair_edge[pair_codes]
+        times = pd.to_datetime(transactions['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        order = np.lexsort((times, row_edge))
+        row_edge = row_edge[order]
+        times = times[order]
+        amounts = transactions['amount'].to_numpy(dtype=np.float64)[order]
+        transaction_ids = transactions['transaction_id'].to_numpy()[order]
+
+        batch_count = np.bincount(row_edge, minlength=total_edges)
+        old_count = np.concatenate([self.count, np.zeros(num_new, dtype=self.count.dtype)])
+        count = old_count + batch_count
+        offsets = np.zeros(total_edges + 1, dtype=np.int64)
+        np.cumsum(count, out=offsets[1:])
+
+        # Batch rows go after the stored rows of their edge (new edges at the end)
+        insert_at = self.offsets[np.minimum(row_edge + 1, num_edges)]
+        tx_time = np.insert(self.tx_time, insert_at, times)
+        tx_amount = np.insert(self.tx_amount, insert_at, amounts)
+
+        is_start = np.ones(len(row_edge), dtype=bool)
+        is_start[1:] = row_edge[1:] != row_edge[:-1]
+        starts = np.flatnonzero(is_start)
+        ends = np.append(starts[1:], len(row_edge)) - 1
+        batch_edges = row_edge[starts]
+        touched = batch_edges[batch_edges < num_edges]
+
+        # Re-sort the edges whose batch rows are not all later than their stored ones
+        late = batch_edges < num_edges
+        late[late] = times[starts][late] < self.last_time[batch_edges[late]]
+        unsorted = batch_edges[late]
+        if len(unsorted):
+            lengths = count[unsorted]
+            rows = np.repeat(offsets[unsorted] - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+            rows += np.arange(lengths.sum())
+            resorted = rows[np.lexsort((tx_time[rows], np.repeat(unsorted, lengths)))]
+            tx_time[rows] = tx_time[resorted]
+            tx_amount[rows] = tx_amount[resorted]
+
+        first_time = np.concatenate([self.first_time, times[starts][batch_edges >= num_edges]])
+        last_time = np.concatenate([self.last_time, times[ends][batch_edges >= num_edges]])
+        last_transaction_id = np.concatenate([self.last_transaction_id,
+                                              transaction_ids[ends][batch_edges >= num_edges]])
+        first_time[touched] = np.minimum(first_time[touched], times[starts][batch_edges < num_edges])
+        # Ties go to the batch, which comes after the stored rows in transaction order
+        is_later = times[ends][batch_edges < num_edges] >= last_time[touched]
+        last_time[touched[is_later]] = times[ends][batch_edges < num_edges][is_later]
+        last_transaction_id[touched[is_later]] = transaction_ids[ends][batch_edges < num_edges][is_later]
+
+        new_pairs = pairs[is_new]
+        self.src = np.concatenate([self.src, np.asarray(new_pairs.get_level_values(0), dtype=self.src.dtype)])
+        self.dst = np.concatenate([self.dst, np.asarray(new_pairs.get_level_values(1), dtype=self.dst.dtype)])
+        self.count = count
+        self.total_amount = (np.concatenate([self.total_amount, np.zeros(num_new)]) +
+                             np.bincount(row_edge, weights=amounts, minlength=total_edges))
+        self.first_time = first_time
+        self.last_time = last_time
+        self.last_transaction_id = last_transaction_id
+        self.offsets = offsets
+        self.tx_time = tx_time
+        self.tx_amount = tx_amount
+        return touched, num_new
+
+    def edge_attributes(self, edge_ids=None):
+        """Yield (from, to, attributes) tuples ready for DiGraph.add_edges_from (all edges or edge_ids)"""
+        if edge_ids is None:
+            edge_ids = np.arange(len(self))
+        # datetime64[us] -> datetime objects is a C-level conversion, far cheaper
+        # than materializing one pd.Timestamp per edge
+        first_times = self.first_time[edge_ids].view('datetime64[ns]').astype('datetime64[us]').tolist()
+        last_times = self.last_time[edge_ids].view('datetime64[ns]').astype('datetime64[us]').tolist()
+        for edge_id, src, dst, count, total, first, last, transaction_id in zip(
+                np.asarray(edge_ids).tolist(), self.src[edge_ids].tolist(), self.dst[edge_ids].tolist(),
+                self.count[edge_ids].tolist(), self.total_amount[edge_ids].tolist(), first_times, last_times,
+                self.last_transaction_id[edge_ids].tolist()):
+            yield src, dst, {
+                'edge_id': edge_id,
+                'amount': total,
+                'transaction_count': count,
+                'first_timestamp': first,
+                'last_timestamp': last,
+                'timestamp': last,
+                'transaction_id': transaction_id
+            }
+
+    def transactions(self, edge_id):
+        """Time-sorted (timestamp, amount) records of one edge"""
+        start, end = self.offsets[edge_id], self.offsets[edge_id + 1]
+        records = np.empty(end - start, dtype=self.TRANSACTION_DTYPE)
+        records['timestamp'] = self.tx_time[start:end].view('datetime64[ns]')
+        records['amount'] = self.tx_amount[start:end]
+        return records
+
+    def times(self, edge_id):
+        """Time-sorted int64 nanosecond timestamps of one edge (a view, no copy)"""
+        return self.tx_time[self.offsets[edge_id]:self.offsets[edge_id + 1]]
+
+    def amounts(self, edge_id):
+        """Amounts of one edge aligned with times(edge_id) (a view, no copy)"""
+        return self.tx_amount[self.offsets[edge_id]:self.offsets[edge_id + 1]]
@@ -5,16 +5,18 @@ from collections import defaultdict
 import numpy as np
 from datetime import datetime
 
+from centrality import average_clustering
+
 class TransactionGraphAnalyzer:
     def __init__(self, detector):
         self.detector = detector
-        self.graph = detector.graph
         self.color_scheme = {
             'normal': '#1f77b4',           # Blue
             'suspicious': '#ff7f0e',       # Orange
             'high_risk': '#d62728',        # Red
             'critical': '#9467bd',         # Purple
-            'minimal': '#2ca02c'           # Green
+            'minimal': '#2ca02c',          # Green
+            'collapsed': '#7f7f7f'         # Grey, super-nodes of a reduced graph
         }
         self.ring_colors = [
             '#FF6B6B',  # Red
@@ -27,15 +29,37 @@ class TransactionGraphAnalyzer:
             '#85C1E2'   # Sky Blue
         ]
 
-    def create_enhanced_network_visualization(self, detection_results, scorer, rings=None):
+    @property
+    def graph(self):
+        """The detector's networkx graph (materialized lazily on the CSR backend)"""
+        return self.detector.graph
+
+    def create_enhanced_network_visualization(self, detection_results, scorer, rings=None, node_budget=None, hops=1):
         """Create enhanced interactive visualization with ring highlighting"""
+        # Graphs larger than node_budget are drawn as a ReducedGraph around the ring members
         fig = go.Figure()
 
-        if not self.graph or self.graph.number_of_nodes() == 0:
+        if self.detector.num_accounts() == 0:
             return self._create_empty_chart()
 
-        # Get positions for nodes using spring layout
-        pos = nx.spring_layout(self.graph, k=2, iterations=50, seed=42)
+        super_nodes = {}
+        subtitle = "Colored nodes = Fraud rings detected"
+        if node_budget is not None and self.detector.num_accounts() > node_budget:
+            reduced = self.detector.reduced_graph(rings or {}, node_budget=node_budget, hops=hops)
+            graph, super_nodes = reduced.graph, reduced.super_nodes
+            pos = self.detector.reduced_layout_cache.get((self.detector.graph_version, id(reduced)), graph)
+            subtitle += (f" | {graph.number_of_nodes() - len(super_nodes)} of {reduced.num_accounts} accounts shown,"
+                         f" grey nodes = collapsed components")
+        else:
+            graph = self.graph
+            # Spring layout positions, cached per graph version (new nodes placed incrementally)
+            pos = self.detector.layout_cache.get(self.detector.graph_version, graph)
+
+        # Account IDs for display (graph nodes may be integer account codes)
+        nodes = [node for node in graph.nodes() if node not in super_nodes]
+        node_labels = dict(zip(nodes, self.detector.account_labels(nodes)))
+        for super_node, info in super_nodes.items():
+            node_labels[super_node] = f"{info['accounts']} accounts"
 
         # Determine node colors and sizes based on rings and risk
         node_colors = []
@@ -54,8 +78,12 @@ class TransactionGraphAnalyzer:
         ring_color_map = {}
         ring_counter = 0
 
-        for node in self.graph.nodes():
-            if node in node_to_ring:
+        for node in graph.nodes():
+            if node in super_nodes:
+                node_colors.append(self.color_scheme['collapsed'])
+                node_sizes.append(min(15 + 4 * np.log2(super_nodes[node]['accounts']), 45))
+                node_risk_levels[node] = 'N/A'
+            elif node in node_to_ring:
                 ring_id = node_to_ring[node]
                 if ring_id not in ring_color_map:
                     ring_color_map[ring_id] = self.ring_colors[ring_counter % len(self.ring_colors)]
@@ -68,43 +96,35 @@ class TransactionGraphAnalyzer:
                 node_sizes.append(15)  # Smaller for normal nodes
                 node_risk_levels[node] = 'MINIMAL'
 
-        # Create edge traces with directional arrows
-        edge_traces = []
-        for edge in self.graph.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-
-            # Check if edge is part of a ring
-            edge_color = '#888'
-            edge_width = 1
-            if edge[0] in node_to_ring and edge[1] in node_to_ring:
-                if node_to_ring[edge[0]] == node_to_ring[edge[1]]:
-                    edge_color = ring_color_map[node_to_ring[edge[0]]]
-                    edge_width = 3
-
-            edge_trace = go.Scatter(
-                x=[x0, x1], y=[y0, y1],
-                mode='lines',
-                line=dict(width=edge_width, color=edge_color),
-                hoverinfo='text',
-                text=f"{edge[0]} → {edge[1]}",
-                showlegend=False
-            )
-            edge_traces.append(edge_trace)
+        # Edges drawn as a few batched traces: one per ring colour plus one for
+        # all other edges, each a None-separated polyline
+        edge_groups = defaultdict(list)
+        for u, v in graph.edges():
+            ring_id = node_to_ring.get(u)
+            if ring_id is not None and node_to_ring.get(v) == ring_id:
+                edge_groups[ring_color_map[ring_id]].append((u, v))
+            else:
+                edge_groups[None].append((u, v))
 
-        # Add all edge traces
-        for edge_trace in edge_traces:
-            fig.add_trace(edge_trace)
+        for color, edges in sorted(edge_groups.items(), key=lambda item: item[0] is not None):
+            fig.add_trace(self._edge_trace(edges, pos, node_labels, color=color or '#888',
+                                           width=3 if color else 1))
 
         # Create node trace with enhanced properties
-        node_x = [pos[node][0] for node in self.graph.nodes()]
-        node_y = [pos[node][1] for node in self.graph.nodes()]
+        node_x = [pos[node][0] for node in graph.nodes()]
+        node_y = [pos[node][1] for node in graph.nodes()]
 
         node_text = []
-        for node in self.graph.nodes():
+        for node in graph.nodes():
+            if node in super_nodes:
+                node_text.append(
+                    f"<b>Collapsed component: {super_nodes[node]['accounts']} accounts</b>"
+                    f"<br>Total flow: ${super_nodes[node]['total_amount']:,.2f}"
+                )
+                continue
             ring_info = f"<br>Ring: {node_to_ring.get(node, 'N/A')}" if node in node_to_ring else ""
             node_text.append(
-                f"<b>Account: {node}</b>"
+                f"<b>Account: {node_labels[node]}</b>"
                 f"<br>Risk Level: {node_risk_levels.get(node, 'MINIMAL')}"
                 f"{ring_info}"
             )
@@ -112,7 +132,7 @@ class TransactionGraphAnalyzer:
         fig.add_trace(go.Scatter(
             x=node_x, y=node_y,
             mode='markers + text',
-            text=[node for node in self.graph.nodes()],
+            text=[node_labels[node] for node in graph.nodes()],
             textposition='top center',
             textfont=dict(size=10, color='black'),
             hoverinfo='text',
@@ -121,8 +141,8 @@ class TransactionGraphAnalyzer:
                 color=node_colors,
                 size=node_sizes,
                 line=dict(
-                    color=['#FFD700' if node in node_to_ring else '#888' for node in self.graph.nodes()],
-                    width=3 if any(node in node_to_ring for node in self.graph.nodes()) else 1
+                    color=['#FFD700' if node in node_to_ring else '#888' for node in graph.nodes()],
+                    width=3 if any(node in node_to_ring for node in graph.nodes()) else 1
                 ),
                 opacity=0.9
             ),
@@ -131,7 +151,7 @@ class TransactionGraphAnalyzer:
 
         # Update layout with legend
         fig.update_layout(
-            title="<b>Money Muling Detection Network</b><br><sub>Colored nodes = Fraud rings detected</sub>",
+            title=f"<b>Money Muling Detection Network</b><br><sub>{subtitle}</sub>",
             titlefont_size=16,
             showlegend=True,
             hovermode='closest',
@@ -145,6 +165,30 @@ class TransactionGraphAnalyzer:
 
         return fig
 
+    def _edge_trace(self, edges, pos, node_labels, color, width):
+        """One Scatter trace for many edges: x / y / text run [u, v, None] per edge"""
+        num_edges = len(edges)
+        x = np.empty(3 * num_edges, dtype=object)
+        y = np.empty(3 * num_edges, dtype=object)
+        text = np.empty(3 * num_edges, dtype=object)
+        if num_edges:
+            sources, targets = zip(*edges)
+            start = np.array([pos[u] for u in sources], dtype=float)
+            end = np.array([pos[v] for v in targets], dtype=float)
+            x[0::3], x[1::3] = start[:, 0], end[:, 0]
+            y[0::3], y[1::3] = start[:, 1], end[:, 1]
+            labels = [f"{node_labels[u]} → {node_labels[v]}" for u, v in edges]
+            text[0::3] = text[1::3] = labels
+
+        return go.Scatter(
+            x=x.tolist(), y=y.tolist(),
+            mode='lines',
+            line=dict(width=width, color=color),
+            hoverinfo='text',
+            text=text.tolist(),
+            showlegend=False
+        )
+
     def create_risk_distribution_chart(self, fraud_ring_output):
         """Create risk distribution pie chart"""
         if not fraud_ring_output or 'fraud_rings' not in fraud_ring_output:
@@ -244,33 +288,65 @@ class TransactionGraphAnalyzer:
         )
         return fig
 
+    def _cached_metric(self, name, compute):
+        """Graph metric from the detector's centrality cache (recomputed only when the graph changes)"""
+        return self.detector.centrality_cache.get(self.detector.graph_version, (name,), compute)
+
     def analyze_graph_metrics(self):
         """Calculate comprehensive graph metrics"""
-        if not self.graph:
+        csr = self.detector.csr
+        if csr is None and not self.graph:
             return {}
 
         metrics = {}
 
         # Basic metrics
-        metrics['num_nodes'] = self.graph.number_of_nodes()
-        metrics['num_edges'] = self.graph.number_of_edges()
-        metrics['density'] = nx.density(self.graph)
+        if csr is not None:
+            num_nodes = csr.number_of_nodes()
+            num_edges = csr.number_of_edges()
+            metrics['num_nodes'] = num_nodes
+            metrics['num_edges'] = num_edges
+            metrics['density'] = num_edges / (num_nodes * (num_nodes - 1)) if num_nodes > 1 else 0
+        else:
+            metrics['num_nodes'] = self.graph.number_of_nodes()
+            metrics['num_edges'] = self.graph.number_of_edges()
+            metrics['density'] = nx.density(self.graph)
 
         # Centrality measures
         try:
-            metrics['degree_centrality'] = nx.degree_centrality(self.graph)
-            metrics['betweenness_centrality'] = nx.betweenness_centrality(self.graph)
-            metrics['closeness_centrality'] = nx.closeness_centrality(self.graph)
+            if csr is not None:
+                scale = 1 / (csr.number_of_nodes() - 1) if csr.number_of_nodes() > 1 else 1
+                metrics['degree_centrality'] = dict(zip(csr.labels.tolist(), (csr.degree() * scale).tolist()))
+            else:
+                metrics['degree_centrality'] = nx.degree_centrality(self.graph)
+            # O(VE) metrics come from the detector's cache, computed once per graph version
+            nodes, scores, info = self.detector.betweenness()
+            metrics['betweenness_centrality'] = dict(zip(nodes, scores.tolist()))
+            metrics['betweenness_mode'] = info['mode']
+            if csr is not None:
+                # All-pairs BFS would need the networkx graph the CSR backend avoids building
+                metrics['closeness_skipped'] = "Not computed on the csr graph backend"
+            else:
+                metrics['closeness_centrality'] = self._cached_metric(
+                    'closeness', lambda: nx.closeness_centrality(self.graph))
         except:
             metrics['centrality_error'] = "Could not calculate centrality"
 
         # Connected components
-        undirected = self.graph.to_undirected()
-        metrics['connected_components'] = len(list(nx.connected_components(undirected)))
+        if csr is not None:
+            metrics['connected_components'] = len(csr.connected_components())
+        else:
+            undirected = self.graph.to_undirected()
+            metrics['connected_components'] = len(list(nx.connected_components(undirected)))
 
         # Clustering coefficient
         try:
-            metrics['clustering_coefficient'] = nx.average_clustering(undirected)
+            if csr is not None:
+                metrics['clustering_coefficient'] = self._cached_metric(
+                    'clustering', lambda: average_clustering(csr))
+            else:
+                metrics['clustering_coefficient'] = self._cached_metric(
+                    'clustering', lambda: nx.average_clustering(self.graph.to_undirected()))
         except:
             metrics['clustering_error'] = "Could not calculate clustering"
 
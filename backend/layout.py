@@ -0,0 +1,229 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+from scipy import sparse
+from scipy.sparse import csgraph
+
+
+class LayoutCache:
+    """Node positions of the transaction graph, kept across graph versions.
+
+    The first request runs the full spring layout. While the graph version is
+    unchanged the same positions are returned; when the graph grows (appended
+    transactions) only the new nodes are placed, each at the centre of its
+    already-placed neighbours plus a small offset, so existing nodes keep
+    their positions and no layout iterations run. A new upload calls clear().
+    """
+
+    def __init__(self, k=2, iterations=50, seed=42, relayout_fraction=0.5):
+        self.k = k
+        self.iterations = iterations
+        self.seed = seed
+        self.relayout_fraction = relayout_fraction  # Run a full layout when this share of nodes is new
+        self.version = None
+        self.positions = {}
+        self.stats = {'full_layouts': 0, 'incremental_updates': 0, 'hits': 0}
+
+    def get(self, version, graph):
+        """Positions {node: array([x, y])} of every node of graph at this graph version"""
+        if version == self.version and len(self.positions) == graph.number_of_nodes():
+            self.stats['hits'] += 1
+            return self.positions
+
+        new_nodes = [node for node in graph.nodes() if node not in self.positions]
+        if not self.positions or len(new_nodes) > self.relayout_fraction * graph.number_of_nodes():
+            self.positions = nx.spring_layout(graph, k=self.k, iterations=self.iterations, seed=self.seed)
+            self.stats['full_layouts'] += 1
+        elif new_nodes:
+            self._place_new_nodes(graph, new_nodes, np.random.default_rng(self.seed + len(self.positions)))
+            self.stats['incremental_updates'] += 1
+
+        self.version = version
+        return self.positions
+
+    def _place_new_nodes(self, graph, new_nodes, rng):
+        """Put each new node next to the mean position of its placed neighbours.
+
+        Nodes are placed breadth-first out from the existing layout, so a new
+        chain hanging off a placed node unrolls from it. A group of new nodes
+        with no link to the layout is started at a random point.
+        """
+        coordinates = np.array(list(self.positions.values()))
+        low, high = coordinates.min(axis=0), coordinates.max(axis=0)
+        spread = 0.05 * max(float((high - low).max()), 1e-3)
+
+        pending = set(new_nodes)
+        queue = deque(new_nodes)
+        stalled = 0
+        while pending:
+            node = queue.popleft() if queue else next(iter(pending))
+            if node not in pending:
+                continue
+
+            neighbours = list(nx.all_neighbors(graph, node))
+            placed = [self.positions[n] for n in neighbours if n in self.positions]
+            if placed:
+                self.positions[node] = np.mean(placed, axis=0) + rng.normal(0, spread, 2)
+            elif stalled >= len(pending):
+                self.positions[node] = rng.uniform(low, high)
+            else:
+                queue.append(node)
+                stalled += 1
+                continue
+
+            pending.discard(node)
+            queue.extend(n for n in neighbours if n in pending)
+            stalled = 0
+
+    def clear(self):
+        self.version = None
+        self.positions = {}
+
+
+class ReducedGraph:
+    """Level-of-detail view of the transaction graph for drawing, bounded by a node budget.
+
+    Ring members are kept as accounts, then their k-hop neighbourhood hop by
+    hop (highest-flow accounts first once a hop no longer fits). Every other
+    account is collapsed into a super-node per weakly connected component
+    of the remaining graph; the largest components get their own super-node
+    and the rest share one. Parallel links between a kept account and a
+    super-node are merged into one edge, and when more than edge_budget
+    edges remain the ring-internal and then highest-amount ones are kept,
+    so the figure size depends on the budgets, not on the input.
+    """
+
+    SUPER_NODE_SHARE = 0.1  # Part of the node budget reserved for component super-nodes
+    EDGES_PER_NODE = 4  # Default edge budget per node of the node budget
+
+    def __init__(self, graph, super_nodes, num_accounts, num_edges):
+        self.graph = graph  # nx.DiGraph of kept accounts and ('component', i) super-nodes
+        self.super_nodes = super_nodes  # {super-node: {'accounts': n, 'total_amount': x}}
+        self.num_accounts = num_accounts  # Accounts in the full graph
+        self.num_edges = num_edges  # Edges in the full graph
+
+    @classmethod
+    def from_edge_table(cls, nodes, edge_table, ring_members, node_budget=500, hops=1, edge_budget=None):
+        """Reduce the graph given by its node list and EdgeTable around ring_members (graph nodes)"""
+        if node_budget < 2:
+            raise ValueError(f"node_budget must be at least 2, got {node_budget}")
+        if edge_budget is None:
+            edge_budget = cls.EDGES_PER_NODE * node_budget
+
+        node_index = pd.Index(nodes)
+        num_nodes = len(nodes)
+        src = node_index.get_indexer(edge_table.src)
+        dst = node_index.get_indexer(edge_table.dst)
+        amounts = edge_table.total_amount
+        flow = np.bincount(src, amounts, num_nodes) + np.bincount(dst, amounts, num_nodes)
+
+        is_member = np.zeros(num_nodes, dtype=bool)
+        members = node_index.get_indexer(list(ring_members))
+        is_member[members[members >= 0]] = True
+
+        if num_nodes <= node_budget:
+            keep = np.ones(num_nodes, dtype=bool)
+        else:
+            keep = cls._neighbourhood(num_nodes, src, dst, flow, members,
+                                      node_budget - max(1, int(cls.SUPER_NODE_SHARE * node_budget)), hops)
+
+        # Kept accounts are reduced nodes 0..K-1, super-nodes follow
+        kept = np.flatnonzero(keep)
+        reduced_of = np.full(num_nodes, -1, dtype=np.int64)
+        reduced_of[kept] = np.arange(len(kept))
+        group_sizes = cls._collapse_components(num_nodes, src, dst, keep, reduced_of,
+                                               node_budget - len(kept))
+
+        # Merge edges that land on the same pair of reduced nodes; drop edges inside a super-node
+        num_reduced = len(kept) + len(group_sizes)
+        reduced_src, reduced_dst = reduced_of[src], reduced_of[dst]
+        linked = reduced_src != reduced_dst
+        merged = sparse.coo_matrix(
+            (amounts[linked], (reduced_src[linked], reduced_dst[linked])), shape=(num_reduced, num_reduced)
+        ).tocsr().tocoo()
+        counts = sparse.coo_matrix(
+            (np.ones(linked.sum()), (reduced_src[linked], reduced_dst[linked])), shape=(num_reduced, num_reduced)
+        ).tocsr().tocoo()
+
+        if merged.nnz > edge_budget:
+            reduced_member = np.zeros(num_reduced, dtype=bool)
+            reduced_member[:len(kept)] = is_member[kept]
+            in_ring = reduced_member[merged.row] & reduced_member[merged.col]
+            order = np.lexsort((-merged.data, ~in_ring))[:edge_budget]
+        else:
+            order = np.arange(merged.nnz)
+
+        # Account nodes keep their graph IDs; super-nodes are tuples so they never clash
+        kept_nodes = [nodes[i] for i in kept]
+        super_ids = [('component', i) for i in range(len(group_sizes))]
+        reduced_nodes = kept_nodes + super_ids
+        group_of = reduced_of[~keep] - len(kept)
+        group_amounts = np.bincount(group_of, flow[~keep], len(group_sizes))
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(kept_nodes)
+        graph.add_nodes_from(super_ids)
+        graph.add_edges_from(
+            (reduced_nodes[u], reduced_nodes[v], {'total_amount': float(amount), 'edges': int(count)})
+            for u, v, amount, count in zip(merged.row[order], merged.col[order], merged.data[order],
+                                           counts.data[order])
+        )
+        super_nodes = {
+            super_id: {'accounts': int(size), 'total_amount': round(float(amount), 2)}
+            for super_id, size, amount in zip(super_ids, group_sizes, group_amounts)
+        }
+        return cls(graph, super_nodes, num_nodes, len(src))
+
+    @staticmethod
+    def _neighbourhood(num_nodes, src, dst, flow, members, budget, hops):
+        """Mask of ring members and their hops-hop neighbourhood, at most budget nodes"""
+        keep = np.zeros(num_nodes, dtype=bool)
+        members = pd.unique(members[members >= 0])[:budget]
+        keep[members] = True
+
+        adjacency = sparse.csr_matrix(
+            (np.ones(2 * len(src), dtype=bool), (np.concatenate([src, dst]), np.concatenate([dst, src]))),
+            shape=(num_nodes, num_nodes)
+        )
+        frontier = keep.copy()
+        for _ in range(hops):
+            room = budget - int(keep.sum())
+            if room <= 0 or not frontier.any():
+                break
+            # Neighbours straight from the frontier rows' column indices (no counts that could overflow)
+            reached = np.unique(adjacency[np.flatnonzero(frontier)].indices)
+            reached = reached[~keep[reached]]
+            if len(reached) > room:
+                reached = reached[np.argsort(-flow[reached], kind='stable')[:room]]
+            keep[reached] = True
+            frontier = np.zeros(num_nodes, dtype=bool)
+            frontier[reached] = True
+        return keep
+
+    @staticmethod
+    def _collapse_components(num_nodes, src, dst, keep, reduced_of, budget):
+        """Assign every dropped node a super-node in reduced_of; returns super-node sizes.
+
+        Weak components of the dropped nodes, largest first; past budget - 1
+        of them the remaining components share the last super-node.
+        """
+        dropped = np.flatnonzero(~keep)
+        if not len(dropped):
+            return np.zeros(0, dtype=np.int64)
+
+        inside = ~keep[src] & ~keep[dst]
+        remainder = sparse.csr_matrix(
+            (np.ones(inside.sum(), dtype=bool), (src[inside], dst[inside])), shape=(num_nodes, num_nodes)
+        )
+        _, component_labels = csgraph.connected_components(remainder, directed=True, connection='weak')
+        _, component_of, sizes = np.unique(component_labels[dropped], return_inverse=True, return_counts=True)
+
+        budget = max(budget, 1)
+        order = np.argsort(-sizes, kind='stable')
+        group = np.full(len(sizes), min(len(sizes), budget) - 1, dtype=np.int64)
+        own = order[:budget - 1] if len(sizes) > budget else order
+        group[own] = np.arange(len(own))
+        reduced_of[dropped] = keep.sum() + group[component_of]
+        return np.bincount(group, sizes).astype(np.int64)
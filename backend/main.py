@@ -11,6 +11,8 @@ import io
 import numpy as np
 
 from detector import MoneyMulingDetector
+from accounts import AccountCodec
+from centrality import CENTRALITY_MODES
 from scoring import SuspiciousActivityScorer
 from graph_rules import TransactionGraphAnalyzer
 
@@ -72,7 +74,10 @@ def api_response(data=None, error=None, status_code=200):
     return response
 
 # Global instances
-detector = MoneyMulingDetector()
+detector = MoneyMulingDetector(
+    cycle_workers=int(os.environ.get('CYCLE_WORKERS', '1')),
+    centrality_workers=int(os.environ.get('CENTRALITY_WORKERS', '1'))
+)
 scorer = SuspiciousActivityScorer()
 analyzer = None
 last_detection_results = None
@@ -97,8 +102,9 @@ def health_check():
             },
             'detector': {
                 'loaded': detector.transactions is not None,
-                'transactions': len(detector.transactions) if detector.transactions is not None else 0,
-                'accounts': detector.graph.number_of_nodes() if detector.graph else 0
+                'transactions': detector.num_transactions(),
+                'accounts': detector.num_accounts(),
+                'graph_backend': detector.graph_backend
             }
         }
         
@@ -133,6 +139,13 @@ def upload_transactions():
         if file.filename == '':
             return api_response(error='No file selected', status_code=400)
 
+        graph_backend = request.values.get('graph_backend')
+        if graph_backend is not None and graph_backend not in MoneyMulingDetector.GRAPH_BACKENDS:
+            return api_response(
+                error=f'Unknown graph_backend: {graph_backend}. Expected one of {list(MoneyMulingDetector.GRAPH_BACKENDS)}',
+                status_code=400
+            )
+
         # Read CSV file in chunks to handle large files
         chunks = []
         chunk_size = 10000  # Process in chunks of 10k rows
@@ -184,23 +197,29 @@ def upload_transactions():
         except Exception as e:
             return api_response(error=f'Error reading CSV: {str(e)}', status_code=400)
 
+        # Dictionary-encode account IDs once; everything downstream works on int32 codes
+        accounts = AccountCodec()
+        df = accounts.encode_frame(df)
+
         # Load data into detector (detector expects columns 'from_account' and 'to_account')
-        detector.load_transactions(df)
+        detector.load_transactions(df, graph_backend=graph_backend, accounts=accounts)
         
         # Debug logging
         print(f"[DEBUG] Detector loaded transactions: {detector.transactions is not None}")
         print(f"[DEBUG] Detector rows: {len(detector.transactions) if detector.transactions is not None else 0}")
-        print(f"[DEBUG] Detector graph nodes: {detector.graph.number_of_nodes() if detector.graph else 0}")
-        print(f"[DEBUG] Detector graph edges: {detector.graph.number_of_edges() if detector.graph else 0}")
+        print(f"[DEBUG] Detector graph backend: {detector.graph_backend}")
+        print(f"[DEBUG] Detector graph nodes: {detector.num_accounts()}")
+        print(f"[DEBUG] Detector graph edges: {detector.num_edges()}")
 
-        # Update analyzer
-        global analyzer
+        # Update analyzer; results of the previous data set use another codec's codes
+        global analyzer, last_detection_results
         analyzer = TransactionGraphAnalyzer(detector)
+        last_detection_results = None
 
         response_data = {
             'message': 'Transaction data loaded successfully',
             'num_transactions': len(df),
-            'num_accounts': len(set(df['from_account']).union(set(df['to_account']))),
+            'num_accounts': len(accounts),
             'date_range': {
                 'start': df['timestamp'].min().isoformat(),
                 'end': df['timestamp'].max().isoformat()
@@ -227,15 +246,27 @@ def run_detection():
         
         # Check data size and warn for large datasets
         num_transactions = len(detector.transactions)
-        num_accounts = detector.graph.number_of_nodes() if detector.graph else 0
+        num_accounts = detector.num_accounts()
         
         print(f"[DETECTION] Starting detection on {num_transactions} transactions, {num_accounts} accounts")
         
         if num_transactions > 100000:
             print("[DETECTION] Large dataset detected - using optimized processing")
         
+        # Optional time-respecting cycle search, e.g. ?temporal_window_hours=24
+        temporal_window_hours = request.args.get('temporal_window_hours', type=float)
+
+        # Betweenness for shell networks: auto (exact on small graphs), exact or approximate
+        centrality_mode = request.args.get('centrality_mode', 'auto')
+        if centrality_mode not in CENTRALITY_MODES:
+            return api_response(
+                error=f'Unknown centrality_mode: {centrality_mode}. Expected one of {list(CENTRALITY_MODES)}',
+                status_code=400
+            )
+
         # Run detection (algorithms have built-in limits to prevent infinite processing)
-        detection_results = detector.run_full_detection()
+        detection_results = detector.run_full_detection(temporal_window_hours=temporal_window_hours,
+                                                        centrality_mode=centrality_mode)
         last_detection_results = detection_results
         
         # Debug logging
@@ -248,7 +279,7 @@ def run_detection():
         scoring_report = scorer.generate_overall_report(detection_results)
 
         # Generate fraud ring output
-        fraud_ring_output = scorer.generate_fraud_ring_output(detection_results, scoring_report)
+        fraud_ring_output = scorer.generate_fraud_ring_output(detection_results, scoring_report, risk_flow=detector.risk_flow())
         
         print(f"[DETECTION] Found {len(fraud_ring_output.get('fraud_rings', []))} fraud rings")
         print(f"[DETECTION] Found {len(fraud_ring_output.get('suspicious_accounts', []))} suspicious accounts")
@@ -262,9 +293,9 @@ def run_detection():
         sys.stdout.flush()
 
         return api_response(data={
-            'detection_results': detection_results,
-            'scoring_report': scoring_report,
-            'fraud_ring_output': fraud_ring_output,
+            'detection_results': detector.decode_accounts(detection_results),
+            'scoring_report': detector.decode_accounts(scoring_report),
+            'fraud_ring_output': detector.decode_accounts(fraud_ring_output),
             'timestamp': datetime.now().isoformat(),
             'processing_stats': {
                 'transactions_processed': num_transactions,
@@ -281,6 +312,158 @@ def run_detection():
     except Exception as e:
         return api_response(error=str(e), status_code=500)
 
+@app.route('/api/append-transactions', methods=['POST'])
+def append_transactions():
+    """Append a batch of transactions and detect only the cycles it creates"""
+    try:
+        global last_detection_results
+
+        if detector.transactions is None:
+            return api_response(error='No transaction data loaded. Please upload data first.', status_code=400)
+
+        if 'file' not in request.files:
+            return api_response(error='No file provided', status_code=400)
+
+        file = request.files['file']
+        if file.filename == '':
+            return api_response(error='No file selected', status_code=400)
+
+        df = pd.read_csv(file)
+        expected_new = ['transaction_id', 'sender_id', 'receiver_id', 'amount', 'timestamp']
+        expected_old = ['transaction_id', 'from_account', 'to_account', 'amount', 'timestamp']
+
+        if all(col in df.columns for col in expected_new):
+            df = df.rename(columns={'sender_id': 'from_account', 'receiver_id': 'to_account'})
+        elif not all(col in df.columns for col in expected_old):
+            missing = [col for col in expected_new if col not in df.columns]
+            return api_response(
+                error=f'Missing required columns: {missing}. Required: {expected_new}',
+                status_code=400
+            )
+
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+        if df['timestamp'].isna().any():
+            return api_response(
+                error='Invalid timestamp format in data. Expected: YYYY-MM-DD HH:MM:SS',
+                status_code=400
+            )
+
+        # Encode with the loaded dictionary so existing accounts keep their codes
+        if detector.accounts is not None:
+            df = detector.accounts.encode_frame(df)
+
+        new_cycles = detector.append_transactions(df)
+
+        # New rings land in detector.rings, which the last results share
+        if last_detection_results is not None:
+            last_detection_results['circular_routing'].extend(new_cycles)
+            last_detection_results['detection_stats'] = detector.detection_stats
+
+        response_data = {
+            'message': 'Transactions appended successfully',
+            'num_transactions_appended': len(df),
+            'num_transactions': detector.num_transactions(),
+            'num_accounts': detector.num_accounts(),
+            'new_circular_routing': detector.decode_accounts(new_cycles),
+            'incremental_stats': detector.detection_stats.get('incremental', {})
+        }
+        print(f"[APPEND] Appended {len(df)} transactions, {len(new_cycles)} new cycles")
+        return api_response(data=response_data, status_code=200)
+
+    except Exception as e:
+        return api_response(error=str(e), status_code=500)
+
+@app.route('/api/rescore', methods=['POST'])
+def rescore_detection():
+    """Re-rank the last detection results under a weight / threshold profile without re-running detection"""
+    # Body: {"profile": name} applies a stored profile; "weights" (per pattern type overrides),
+    # "risk_thresholds" (4 ascending scores) or "min_score" (0-100) define one, stored if named
+    try:
+        if detector.transactions is None or last_detection_results is None:
+            return api_response(error='No detection results available.', status_code=400)
+
+        processing_start = time.time()
+        body = request.get_json(silent=True) or {}
+        name = body.get('profile')
+        settings = {key: body[key] for key in ('weights', 'risk_thresholds', 'min_score') if key in body}
+
+        try:
+            if settings:
+                profile = scorer.register_profile(name, **settings) if name else scorer.make_profile(**settings)
+            elif name:
+                if name not in scorer.profiles:
+                    return api_response(
+                        error=f"Unknown scoring profile '{name}'. Stored profiles: {sorted(scorer.profiles)}",
+                        status_code=404
+                    )
+                profile = scorer.profiles[name]
+            else:
+                profile = scorer.make_profile()
+        except (TypeError, ValueError, AttributeError) as e:
+            return api_response(error=f'Invalid scoring profile: {e}', status_code=400)
+
+        scoring_report = scorer.generate_overall_report(last_detection_results, detailed=False, profile=profile)
+        fraud_ring_output = scorer.generate_fraud_ring_output(last_detection_results, scoring_report, profile=profile,
+                                                               risk_flow=detector.risk_flow())
+        fraud_ring_output['summary']['processing_time_seconds'] = round(time.time() - processing_start, 4)
+
+        print(f"[RESCORE] Profile {name or '(unnamed)'}: {len(fraud_ring_output['fraud_rings'])} fraud rings")
+        return api_response(data={
+            'profile': name,
+            'profile_settings': profile,
+            'fraud_ring_output': detector.decode_accounts(fraud_ring_output),
+            'overall_risk': scoring_report['overall_risk'],
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        return api_response(error=str(e), status_code=500)
+
+@app.route('/api/related-accounts', methods=['POST'])
+def related_accounts():
+    """Rank the accounts most flow-connected to a set of investigator seed accounts"""
+    # Body: {"seed_accounts": [...], "top_k": 20, "alpha": 0.15, "epsilon": 1e-4, "include_seeds": false}
+    try:
+        if detector.transactions is None:
+            return api_response(error='No transaction data loaded. Please upload data first.', status_code=400)
+
+        body = request.get_json(silent=True) or {}
+        seed_accounts = body.get('seed_accounts') or []
+        if not isinstance(seed_accounts, list) or not seed_accounts:
+            return api_response(error='seed_accounts must be a non-empty list of account IDs', status_code=400)
+
+        try:
+            top_k = int(body.get('top_k', 20))
+            alpha = float(body.get('alpha', 0.15))
+            epsilon = float(body.get('epsilon', 1e-4))
+        except (TypeError, ValueError):
+            return api_response(error='top_k, alpha and epsilon must be numbers', status_code=400)
+        if top_k < 1 or not 0 < alpha < 1 or epsilon <= 0:
+            return api_response(error='Expected top_k >= 1, 0 < alpha < 1 and epsilon > 0', status_code=400)
+
+        seeds = seed_accounts
+        if detector.accounts is not None:
+            seeds = [detector.accounts.code(account) for account in seed_accounts]
+        positions = detector.risk_flow().positions(seeds)
+        unknown = [account for account, position in zip(seed_accounts, positions) if position < 0]
+        if unknown:
+            return api_response(error=f'Unknown seed accounts: {unknown}', status_code=404)
+
+        query_start = time.time()
+        ranked, info = detector.personalized_pagerank(seeds, top_k=top_k, alpha=alpha, epsilon=epsilon,
+                                                      include_seeds=bool(body.get('include_seeds', False)))
+
+        return api_response(data={
+            'seed_accounts': seed_accounts,
+            'related_accounts': detector.decode_accounts(ranked),
+            'stats': info,
+            'processing_time_seconds': round(time.time() - query_start, 4),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        return api_response(error=str(e), status_code=500)
+
 @app.route('/api/graph-metrics', methods=['GET'])
 def get_graph_metrics():
     """Get graph analysis metrics"""
@@ -289,6 +472,10 @@ def get_graph_metrics():
             return api_response(error='No data loaded. Please upload transactions first.', status_code=400)
 
         metrics = analyzer.analyze_graph_metrics()
+        if detector.accounts is not None:
+            for key in ('degree_centrality', 'betweenness_centrality', 'closeness_centrality'):
+                if key in metrics:
+                    metrics[key] = detector.accounts.decode_keys(metrics[key])
 
         return api_response(data={
             'metrics': metrics,
@@ -301,10 +488,17 @@ def get_graph_metrics():
 @app.route('/api/visualizations/network', methods=['GET'])
 def get_network_visualization():
     """Get enhanced network visualization data"""
+    # Optional ?node_budget=500&hops=1 reduces large graphs to ring members, their neighbourhood
+    # and one super-node per component of the remaining accounts
     try:
         if analyzer is None or detector.transactions is None:
             return api_response(error='No data loaded. Please upload transactions and run detection first.', status_code=400)
 
+        node_budget = request.args.get('node_budget', type=int)
+        hops = request.args.get('hops', 1, type=int)
+        if (node_budget is not None and node_budget < 2) or hops < 0:
+            return api_response(error='Expected node_budget >= 2 and hops >= 0', status_code=400)
+
         # Get latest detection results
         if last_detection_results is None:
             detection_results = detector.run_full_detection()
@@ -314,11 +508,14 @@ def get_network_visualization():
         fig = analyzer.create_enhanced_network_visualization(
             detection_results,
             scorer,
-            rings=detection_results.get('rings', {})
+            rings=detection_results.get('rings', {}),
+            node_budget=node_budget,
+            hops=hops
         )
 
         return api_response(data={
             'plotly_data': fig.to_dict(),
+            'reduced': node_budget is not None and detector.num_accounts() > node_budget,
             'timestamp': datetime.now().isoformat()
         })
 
@@ -337,7 +534,7 @@ def get_risk_distribution():
         else:
             detection_results = last_detection_results
 
-        scoring_report = scorer.generate_overall_report(detection_results)
+        scoring_report = scorer.generate_overall_report(detection_results, detailed=False)
         fraud_ring_output = scorer.generate_fraud_ring_output(detection_results, scoring_report)
 
         fig = analyzer.create_risk_distribution_chart(fraud_ring_output)
@@ -358,11 +555,11 @@ def get_fraud_rings():
             return api_response(error='No detection results available.', status_code=400)
 
         detection_results = last_detection_results
-        scoring_report = scorer.generate_overall_report(detection_results)
+        scoring_report = scorer.generate_overall_report(detection_results, detailed=False)
         fraud_ring_output = scorer.generate_fraud_ring_output(detection_results, scoring_report)
 
         return api_response(data={
-            'fraud_rings': fraud_ring_output['fraud_rings'],
+            'fraud_rings': detector.decode_accounts(fraud_ring_output['fraud_rings']),
             'timestamp': datetime.now().isoformat()
         })
 
@@ -377,8 +574,10 @@ def download_fraud_report():
             return jsonify({'error': 'No detection results available.'}), 400
 
         detection_results = last_detection_results
-        scoring_report = scorer.generate_overall_report(detection_results)
-        fraud_ring_output = scorer.generate_fraud_ring_output(detection_results, scoring_report)
+        scoring_report = scorer.generate_overall_report(detection_results, detailed=False)
+        fraud_ring_output = detector.decode_accounts(
+            scorer.generate_fraud_ring_output(detection_results, scoring_report, risk_flow=detector.risk_flow())
+        )
 
         # Create JSON output with required format
         output = {
@@ -513,6 +712,13 @@ def analyze_csv():
         if file.filename == '':
             return api_response(error='No file selected', status_code=400)
 
+        graph_backend = request.values.get('graph_backend')
+        if graph_backend is not None and graph_backend not in MoneyMulingDetector.GRAPH_BACKENDS:
+            return api_response(
+                error=f'Unknown graph_backend: {graph_backend}. Expected one of {list(MoneyMulingDetector.GRAPH_BACKENDS)}',
+                status_code=400
+            )
+
         # Read and validate CSV. Accept new input spec (sender_id/receiver_id) or old (from_account/to_account)
         df = pd.read_csv(file)
         expected_new = ['transaction_id', 'sender_id', 'receiver_id', 'amount', 'timestamp']
@@ -537,17 +743,22 @@ def analyze_csv():
                 status_code=400
             )
 
-        # Step 2: Load data and run detection
-        detector.load_transactions(df)
-        global analyzer
+        # Step 2: Dictionary-encode account IDs, load data and run detection
+        accounts = AccountCodec()
+        df = accounts.encode_frame(df)
+        detector.load_transactions(df, graph_backend=graph_backend, accounts=accounts)
+        global analyzer, last_detection_results
         analyzer = TransactionGraphAnalyzer(detector)
+        last_detection_results = None
 
         # Run detection
         detection_results = detector.run_full_detection()
 
         # Generate scoring and fraud ring output
-        scoring_report = scorer.generate_overall_report(detection_results)
-        fraud_ring_output = scorer.generate_fraud_ring_output(detection_results, scoring_report)
+        scoring_report = scorer.generate_overall_report(detection_results, detailed=False)
+        fraud_ring_output = detector.decode_accounts(
+            scorer.generate_fraud_ring_output(detection_results, scoring_report, risk_flow=detector.risk_flow())
+        )
 
         # Step 3: Generate visualization data
         network_viz = analyzer.create_enhanced_network_visualization(
@@ -562,7 +773,7 @@ def analyze_csv():
                 'suspicious_accounts': fraud_ring_output.get('suspicious_accounts', []),
                 'graph_data': network_viz.to_dict() if network_viz else None,
                 'summary': fraud_ring_output.get('summary', {}),
-                'detection_details': detection_results
+                'detection_details': detector.decode_accounts(detection_results)
             },
             'timestamp': datetime.now().isoformat()
         })
@@ -1,7 +1,176 @@
+import copy
 import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
+from itertools import chain
 import json
 
+class AccountIndex:
+    """Per-account view of one run's findings (max score, pattern bitmask, rings), in first-mention order"""
+
+    PATTERNS = ('circular_routing', 'smurfing', 'shell_network')
+    # Propagated risk (0-100) at which an account outside every finding is reported
+    PROPAGATION_FLOOR = 10.0
+
+    def __init__(self, members, pattern_types, risk_scores, ring_ids, core):
+        """Index one account list per finding, with its pattern type, 0-100 risk score and ring_id"""
+        # core: per-finding flags (aligned with members) marking who counts towards total_accounts
+        # Memberships are flattened and factorized once, so every aggregate is one scatter
+        lengths = np.array([len(accounts) for accounts in members], dtype=np.int64)
+        finding = np.repeat(np.arange(len(members)), lengths)
+        codes, accounts = pd.factorize(np.fromiter(chain.from_iterable(members), dtype=object, count=lengths.sum()))
+        bits = np.left_shift(1, np.array([self.PATTERNS.index(p) for p in pattern_types], dtype=np.int64))
+        num_accounts = len(accounts)
+
+        self.findings = members
+        self.finding_types = list(pattern_types)
+        self.risk_scores = list(risk_scores)
+        self.ring_ids = list(ring_ids)
+        self.accounts = np.asarray(accounts, dtype=object).tolist()
+        self._codes, self._finding = codes, finding
+        self.max_score = self._max_scores(risk_scores)
+        self.patterns = np.zeros(num_accounts, dtype=np.int64)
+        np.bitwise_or.at(self.patterns, codes, bits[finding])
+        self.is_core = np.bincount(codes, weights=np.fromiter(chain.from_iterable(core), dtype=bool, count=lengths.sum()),
+                                   minlength=num_accounts) > 0
+
+        # Memberships grouped by account, in finding order within each account
+        order = np.argsort(codes, kind='stable')
+        self._membership_findings = finding[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=num_accounts))])
+        self.first_ring = [self.ring_ids[i] for i in self._membership_findings[self._offsets[:-1]].tolist()]
+        self._positions = {account: position for position, account in enumerate(self.accounts)}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def _max_scores(self, risk_scores):
+        max_score = np.zeros(len(self.accounts))
+        np.maximum.at(max_score, self._codes, np.asarray(risk_scores, dtype=np.float64)[self._finding])
+        return max_score
+
+    def rescored(self, risk_scores):
+        """Copy of the index under new per-finding risk scores, sharing the membership arrays"""
+        index = copy.copy(self)
+        index.risk_scores = list(risk_scores)
+        index.max_score = self._max_scores(risk_scores)
+        index._entries = {}
+        return index
+
+    @property
+    def num_core_accounts(self):
+        return int(self.is_core.sum())
+
+    @classmethod
+    def pattern_names(cls, mask):
+        return [name for bit, name in enumerate(cls.PATTERNS) if mask >> bit & 1]
+
+    def rings_of(self, account):
+        """Distinct ring_ids of every finding the account belongs to"""
+        position = self._positions[account]
+        findings = self._membership_findings[self._offsets[position]:self._offsets[position + 1]]
+        return list(dict.fromkeys(self.ring_ids[i] for i in findings.tolist()))
+
+    def fraud_rings(self, min_score=0):
+        """fraud_rings entries; the first finding of each ring defines its members, pattern and score"""
+        if ('fraud_rings', min_score) in self._entries:
+            return self._copy_entries(self._entries['fraud_rings', min_score], 'member_accounts')
+
+        rings = {}
+        for ring_id, members, pattern_type, risk_score in zip(
+                self.ring_ids, self.findings, self.finding_types, self.risk_scores):
+            if ring_id not in rings and risk_score >= min_score:
+                rings[ring_id] = {
+                    'ring_id': ring_id,
+                    'member_accounts': members,
+                    'pattern_type': pattern_type,
+                    'risk_score': round(risk_score, 1)
+                }
+        self._entries['fraud_rings', min_score] = list(rings.values())
+        return self._copy_entries(self._entries['fraud_rings', min_score], 'member_accounts')
+
+    def _propagation(self, risk_flow):
+        """Propagated risk of every node of risk_flow, seeded with the accounts' max scores"""
+        if ('propagation', risk_flow) not in self._entries:
+            risk, info = risk_flow.propagate(self.accounts, self.max_score)
+            print(f"[SCORING] Risk propagation: {info['iterations']} iterations, residual {info['residual']:.2e}")
+            self._entries['propagation', risk_flow] = risk
+        return self._entries['propagation', risk_flow]
+
+    def propagated_risk(self, risk_flow):
+        """Risk of every account after spreading the accounts' max scores over a RiskFlow"""
+        positions = risk_flow.positions(self.accounts)
+        return np.where(positions >= 0, self._propagation(risk_flow)[positions], self.max_score)
+
+    def suspicious_accounts(self, min_score=0, risk_flow=None, propagation_floor=PROPAGATION_FLOOR):
+        """suspicious_accounts entries, highest score first (ties in first-seen order)"""
+        # With a risk_flow entries carry propagated_risk, and accounts outside every finding whose
+        # propagated risk reaches propagation_floor are added as 'risk_propagation' entries
+        key = ('suspicious_accounts', min_score, risk_flow, propagation_floor)
+        if key in self._entries:
+            return self._copy_entries(self._entries[key], 'detected_patterns')
+
+        num_accounts = len(self.accounts)
+        scores, propagated = self.max_score, None
+        if risk_flow is not None:
+            propagated = self.propagated_risk(risk_flow)
+            # Counterparties reached only through propagation, scored by the risk they received
+            risk = self._propagation(risk_flow)
+            outside = np.ones(len(risk_flow), dtype=bool)
+            positions = risk_flow.positions(self.accounts)
+            outside[positions[positions >= 0]] = False
+            reached = np.flatnonzero(outside & (risk >= propagation_floor))
+            scores = np.concatenate([scores, risk[reached]])
+            propagated = np.concatenate([propagated, risk[reached]]).tolist()
+
+        # Only the entries above min_score are built, already in output order
+        order = np.argsort(-scores, kind='stable')
+        order = order[scores[order] >= min_score].tolist()
+        score_list, masks = scores.tolist(), self.patterns.tolist()
+        names = {mask: self.pattern_names(mask) for mask in set(masks)}
+        entries = []
+        for position in order:
+            if position < num_accounts:
+                entry = {
+                    'account_id': self.accounts[position],
+                    'suspicion_score': score_list[position],
+                    'detected_patterns': list(names[masks[position]]),
+                    'ring_id': self.first_ring[position]
+                }
+            else:
+                entry = {
+                    'account_id': risk_flow.nodes[reached[position - num_accounts]],
+                    'suspicion_score': score_list[position],
+                    'detected_patterns': ['risk_propagation'],
+                    'ring_id': None
+                }
+            if propagated is not None:
+                entry['propagated_risk'] = propagated[position]
+            entries.append(entry)
+
+        self._entries[key] = entries
+        return self._copy_entries(entries, 'detected_patterns')
+
+    @staticmethod
+    def _copy_entries(entries, list_key):
+        """Copies of cached output entries (and their list_key lists), so callers can't change later responses"""
+        return [{**entry, list_key: list(entry[list_key])} for entry in entries]
+
+
+class FindingTable:
+    """Scoring-ready snapshot of one detection run: feature columns and AccountIndex, extracted once"""
+
+    def __init__(self, features, index):
+        self.features = features
+        self.index = index
+        self.scored = {}  # Default and stored profiles by name: (profile, result)
+        self.inline = None  # Last inline profile: (profile, result)
+
+    def __len__(self):
+        return len(self.index.findings)
+
+
 class SuspiciousActivityScorer:
     def __init__(self):
         self.weights = {
@@ -21,93 +190,174 @@ class SuspiciousActivityScorer:
                 'volume_anomaly': 0.3
             }
         }
+        self.risk_thresholds = self.RISK_THRESHOLDS.tolist()
+        self.profiles = {}
+        self._finding_table = None
+
+    # Feature columns (field, default when missing) of each pattern type's findings
+    FEATURES = {
+        'circular_routing': [('length', 0), ('total_amount', 0.0), ('time_span_seconds', 0.0)],
+        'smurfing': [('total_amount', 0.0), ('num_transactions', 0), ('suspicious_score', 0.5)],
+        'shell_network': [('size', 0), ('avg_centrality', 0.5), ('total_volume', 0.0)]
+    }
+    RESULT_KEYS = {'circular_routing': 'circular_routing', 'smurfing': 'smurfing', 'shell_network': 'shell_networks'}
+    RISK_THRESHOLDS = np.array([0.2, 0.4, 0.6, 0.8])
+    RISK_LEVELS = np.array(['MINIMAL', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL'])
+
+    def make_profile(self, weights=None, risk_thresholds=None, min_score=0):
+        """Scoring profile: the current weights with overrides, risk band thresholds and a 0-100 reporting floor"""
+        # weights overrides components per pattern type, e.g. {'smurfing': {'frequency': 0.5}}
+        merged = {pattern_type: dict(components) for pattern_type, components in self.weights.items()}
+        for pattern_type, overrides in (weights or {}).items():
+            if pattern_type not in merged:
+                raise ValueError(f"Unknown pattern type '{pattern_type}'. Expected one of {list(merged)}")
+            unknown = set(overrides) - set(merged[pattern_type])
+            if unknown:
+                raise ValueError(f"Unknown {pattern_type} weights {sorted(unknown)}. Expected {list(merged[pattern_type])}")
+            merged[pattern_type].update({name: float(value) for name, value in overrides.items()})
+
+        thresholds = [float(t) for t in (self.risk_thresholds if risk_thresholds is None else risk_thresholds)]
+        if len(thresholds) != len(self.RISK_LEVELS) - 1 or thresholds != sorted(thresholds):
+            raise ValueError(f"risk_thresholds must be {len(self.RISK_LEVELS) - 1} ascending scores "
+                             f"for {self.RISK_LEVELS[1:].tolist()}")
+
+        return {'weights': merged, 'risk_thresholds': thresholds, 'min_score': float(min_score)}
+
+    def register_profile(self, name, weights=None, risk_thresholds=None, min_score=0):
+        """Store a named profile for later rescoring requests"""
+        self.profiles[name] = self.make_profile(weights, risk_thresholds, min_score)
+        return self.profiles[name]
+
+    def _profile(self, profile):
+        return profile if profile is not None else self.make_profile()
 
     def score_circular_routing(self, cycle_data):
         """Score circular fund routing patterns"""
-        cycle_length = cycle_data['length']
-        total_amount = cycle_data['total_amount']
-        time_span_hours = cycle_data['time_span'].total_seconds() / 3600
+        return self._item_score(self.score_circular_routing_batch(**self.extract_features('circular_routing', [cycle_data])))
+
+    def score_smurfing(self, smurfing_data):
+        """Score smurfing patterns"""
+        return self._item_score(self.score_smurfing_batch(**self.extract_features('smurfing', [smurfing_data])))
+
+    def score_shell_network(self, network_data):
+        """Score layered shell networks"""
+        return self._item_score(self.score_shell_network_batch(**self.extract_features('shell_network', [network_data])))
+
+    def score_circular_routing_batch(self, length, total_amount, time_span_seconds, profile=None):
+        """Score many circular routing patterns at once from aligned arrays"""
+        profile = self._profile(profile)
+        weights = profile['weights']['circular_routing']
 
         # Normalize scores (higher scores = more suspicious)
-        length_score = min(cycle_length / 10, 1.0)  # Max at 10 nodes
-        amount_score = min(total_amount / 100000, 1.0)  # Max at $100k
-        time_score = 1 - min(time_span_hours / 24, 1.0)  # Shorter time = more suspicious
+        length_score = np.minimum(length / 10, 1.0)  # Max at 10 nodes
+        amount_score = np.minimum(total_amount / 100000, 1.0)  # Max at $100k
+        time_score = 1 - np.minimum(time_span_seconds / 3600 / 24, 1.0)  # Shorter time = more suspicious
 
         score = (
-            length_score * self.weights['circular_routing']['cycle_length'] +
-            amount_score * self.weights['circular_routing']['total_amount'] +
-            time_score * self.weights['circular_routing']['time_span']
+            length_score * weights['cycle_length'] +
+            amount_score * weights['total_amount'] +
+            time_score * weights['time_span']
         )
+        return self._batch_result(score, profile, length_score=length_score, amount_score=amount_score,
+                                  time_score=time_score)
 
-        return {
-            'score': score,
-            'components': {
-                'length_score': length_score,
-                'amount_score': amount_score,
-                'time_score': time_score
-            },
-            'risk_level': self._classify_risk(score)
-        }
-
-    def score_smurfing(self, smurfing_data):
-        """Score smurfing patterns"""
-        total_amount = smurfing_data['total_amount']
-        num_transactions = smurfing_data['num_transactions']
-        suspicious_score = smurfing_data.get('suspicious_score', 0.5)
+    def score_smurfing_batch(self, total_amount, num_transactions, suspicious_score, profile=None):
+        """Score many smurfing patterns at once from aligned arrays"""
+        profile = self._profile(profile)
+        weights = profile['weights']['smurfing']
 
         # Amount ratio (how much above normal threshold)
-        amount_ratio = min(total_amount / 50000, 1.0)  # Max at $50k
+        amount_ratio = np.minimum(total_amount / 50000, 1.0)  # Max at $50k
 
         # Frequency score (more transactions = more suspicious)
-        frequency_score = min(num_transactions / 20, 1.0)  # Max at 20 transactions
+        frequency_score = np.minimum(num_transactions / 20, 1.0)  # Max at 20 transactions
 
         score = (
-            amount_ratio * self.weights['smurfing']['amount_ratio'] +
-            frequency_score * self.weights['smurfing']['frequency'] +
-            suspicious_score * self.weights['smurfing']['uniformity']
+            amount_ratio * weights['amount_ratio'] +
+            frequency_score * weights['frequency'] +
+            suspicious_score * weights['uniformity']
         )
+        return self._batch_result(score, profile, amount_ratio=amount_ratio, frequency_score=frequency_score,
+                                  uniformity_score=suspicious_score)
 
-        return {
-            'score': score,
-            'components': {
-                'amount_ratio': amount_ratio,
-                'frequency_score': frequency_score,
-                'uniformity_score': suspicious_score
-            },
-            'risk_level': self._classify_risk(score)
-        }
-
-    def score_shell_network(self, network_data):
-        """Score layered shell networks"""
-        network_size = network_data['size']
-        avg_centrality = network_data.get('avg_centrality', 0.5)
-        total_volume = network_data['total_volume']
+    def score_shell_network_batch(self, size, avg_centrality, total_volume, profile=None):
+        """Score many layered shell networks at once from aligned arrays"""
+        profile = self._profile(profile)
+        weights = profile['weights']['shell_network']
 
         # Network size score
-        size_score = min(network_size / 15, 1.0)  # Max at 15 accounts
+        size_score = np.minimum(size / 15, 1.0)  # Max at 15 accounts
 
         # Centrality score (higher centrality = more suspicious)
         centrality_score = avg_centrality
 
         # Volume anomaly (low volume for high centrality = suspicious)
-        volume_score = 1 - min(total_volume / 10000, 1.0)  # Lower volume = higher score
+        volume_score = 1 - np.minimum(total_volume / 10000, 1.0)  # Lower volume = higher score
 
         score = (
-            size_score * self.weights['shell_network']['network_size'] +
-            centrality_score * self.weights['shell_network']['centrality'] +
-            volume_score * self.weights['shell_network']['volume_anomaly']
+            size_score * weights['network_size'] +
+            centrality_score * weights['centrality'] +
+            volume_score * weights['volume_anomaly']
         )
+        return self._batch_result(score, profile, size_score=size_score, centrality_score=centrality_score,
+                                  volume_score=volume_score)
+
+    def extract_features(self, pattern_type, findings):
+        """Columnar float arrays of the scoring features of a list of findings"""
+        columns = {}
+        for field, default in self.FEATURES[pattern_type]:
+            if field == 'time_span_seconds':
+                values = [self._time_span_seconds(finding) for finding in findings]
+            else:
+                values = [finding.get(field, default) for finding in findings]
+            columns[field] = np.array(values, dtype=np.float64)
+        return columns
+
+    def score_all(self, detection_results, profile=None):
+        """Batch scores of every pattern type: {pattern_type: {'score', 'risk_level', components...}}"""
+        return self.score_features(self.finding_table(detection_results).features, profile)
+
+    def score_features(self, features, profile=None):
+        """Batch scores of already extracted feature columns"""
+        profile = self._profile(profile)
+        return {
+            pattern_type: getattr(self, f'score_{pattern_type}_batch')(**columns, profile=profile)
+            for pattern_type, columns in features.items()
+        }
+
+    def classify_risk_batch(self, scores, risk_thresholds=None):
+        """Risk level of every score (same bands as _classify_risk unless thresholds are given)"""
+        thresholds = self.risk_thresholds if risk_thresholds is None else risk_thresholds
+        return self.RISK_LEVELS[np.searchsorted(thresholds, scores, side='right')]
 
+    def _batch_result(self, score, profile, **components):
         return {
             'score': score,
-            'components': {
-                'size_score': size_score,
-                'centrality_score': centrality_score,
-                'volume_score': volume_score
-            },
-            'risk_level': self._classify_risk(score)
+            'risk_level': self.classify_risk_batch(score, profile['risk_thresholds']),
+            'components': components
+        }
+
+    def _item_score(self, batch, index=0):
+        """Per-item score dict (the single-finding API) from a batch result"""
+        return {
+            'score': float(batch['score'][index]),
+            'components': {name: float(values[index]) for name, values in batch['components'].items()},
+            'risk_level': str(batch['risk_level'][index])
         }
 
+    def _time_span_seconds(self, cycle_data):
+        """Cycle time span in seconds (detector output) or from a timedelta 'time_span'"""
+        if 'time_span_seconds' in cycle_data:
+            return cycle_data['time_span_seconds']
+        time_span = cycle_data.get('time_span')
+        return time_span.total_seconds() if time_span is not None else 0.0
+
+    def smurfing_members(self, smurfing_data):
+        """Accounts of a smurfing finding, the splitting / collecting account first"""
+        if smurfing_data.get('direction') == 'fan_in':
+            return [smurfing_data['target_account']] + smurfing_data.get('senders', [])
+        return [smurfing_data['source_account']] + smurfing_data.get('recipients', [])
+
     def _classify_risk(self, score):
         """Classify risk level based on score"""
         if score >= 0.8:
@@ -121,176 +371,126 @@ class SuspiciousActivityScorer:
         else:
             return 'MINIMAL'
 
-    def generate_fraud_ring_output(self, detection_results, scoring_report):
-        """Generate fraud ring output in required JSON format"""
-        suspicious_accounts = {}
-        fraud_rings = {}
-
-        # Process circular routing patterns
-        for cycle in detection_results.get('circular_routing', []):
-            ring_id = cycle.get('ring_id', 'UNKNOWN')
-            score_data = self.score_circular_routing(cycle)
-            risk_score = score_data['score'] * 100
-
-            # Add to fraud_rings
-            if ring_id not in fraud_rings:
-                fraud_rings[ring_id] = {
-                    'ring_id': ring_id,
-                    'member_accounts': cycle['cycle'],
-                    'pattern_type': 'circular_routing',
-                    'risk_score': round(risk_score, 1)
-                }
-
-            # Add accounts to suspicious_accounts
-            for account in cycle['cycle']:
-                if account not in suspicious_accounts:
-                    suspicious_accounts[account] = {
-                        'account_id': account,
-                        'suspicion_score': 0,
-                        'detected_patterns': [],
-                        'ring_id': ring_id
-                    }
-                suspicious_accounts[account]['suspicion_score'] = max(
-                    suspicious_accounts[account]['suspicion_score'],
-                    risk_score
-                )
-                if 'circular_routing' not in suspicious_accounts[account]['detected_patterns']:
-                    suspicious_accounts[account]['detected_patterns'].append('circular_routing')
-
-        # Process smurfing patterns
-        for smurf in detection_results.get('smurfing', []):
-            ring_id = smurf.get('ring_id', 'UNKNOWN')
-            score_data = self.score_smurfing(smurf)
-            risk_score = score_data['score'] * 100
-
-            # Add to fraud_rings
-            if ring_id not in fraud_rings:
-                fraud_rings[ring_id] = {
-                    'ring_id': ring_id,
-                    'member_accounts': [smurf['source_account']] + smurf.get('recipients', []),
-                    'pattern_type': 'smurfing',
-                    'risk_score': round(risk_score, 1)
-                }
+    def finding_table(self, detection_results):
+        """FindingTable of a run's findings, rebuilt for a new results object or changed finding counts"""
+        # Findings edited in place keep the same key; call invalidate() after such edits
+        key = tuple(len(detection_results.get(k, [])) for k in self.RESULT_KEYS.values())
+        if self._finding_table is not None:
+            cached_results, cached_key, table = self._finding_table
+            if cached_results is detection_results and cached_key == key:
+                return table
+
+        features = {}
+        members, pattern_types, ring_ids, core = [], [], [], []
+        for pattern_type, result_key in self.RESULT_KEYS.items():
+            findings = detection_results.get(result_key, [])
+            features[pattern_type] = self.extract_features(pattern_type, findings)
+            if pattern_type == 'circular_routing':
+                finding_members = [list(f['cycle']) for f in findings]
+            elif pattern_type == 'smurfing':
+                finding_members = [self.smurfing_members(f) for f in findings]
+            else:
+                finding_members = [list(f['accounts']) for f in findings]
+
+            members.extend(finding_members)
+            pattern_types.extend([pattern_type] * len(findings))
+            ring_ids.extend(f.get('ring_id', 'UNKNOWN') for f in findings)
+            # Smurfing counterparties are flagged but not counted as analyzed accounts
+            core.extend([pattern_type != 'smurfing' or i == 0 for i in range(len(m))] for m in finding_members)
+
+        index = AccountIndex(members, pattern_types, np.zeros(len(members)), ring_ids, core)
+        table = FindingTable(features, index)
+        self._finding_table = (detection_results, key, table)
+        return table
+
+    def invalidate(self):
+        """Drop the cached FindingTable, e.g. after editing detection results in place"""
+        self._finding_table = None
+
+    def scored_run(self, detection_results, profile=None):
+        """(batch scores, AccountIndex) of a run under a profile, cached on its FindingTable"""
+        table = self.finding_table(detection_results)
+        # The default and stored profiles are kept by name; inline profiles share one slot, so a
+        # request's report and ring output score once while per-request settings can't grow the cache
+        names = [name for name, stored in self.profiles.items() if stored is profile]
+        key = names[0] if names else None
+        inline = profile is not None and not names
+        profile = self._profile(profile)
+
+        cached = table.inline if inline else table.scored.get(key)
+        if cached is not None and cached[0] == profile:
+            return cached[1]
+        scores = self.score_features(table.features, profile)
+        risk_scores = np.concatenate([scores[pattern_type]['score'] for pattern_type in self.RESULT_KEYS]) * 100
+        scored = (scores, table.index.rescored(risk_scores.tolist()))
+        if inline:
+            table.inline = (copy.deepcopy(profile), scored)
+        else:
+            table.scored[key] = (copy.deepcopy(profile), scored)
+        return scored
 
-            # Add accounts
-            for account in [smurf['source_account']] + smurf.get('recipients', []):
-                if account not in suspicious_accounts:
-                    suspicious_accounts[account] = {
-                        'account_id': account,
-                        'suspicion_score': 0,
-                        'detected_patterns': [],
-                        'ring_id': ring_id
-                    }
-                suspicious_accounts[account]['suspicion_score'] = max(
-                    suspicious_accounts[account]['suspicion_score'],
-                    risk_score
-                )
-                if 'smurfing' not in suspicious_accounts[account]['detected_patterns']:
-                    suspicious_accounts[account]['detected_patterns'].append('smurfing')
-
-        # Process shell networks
-        for network in detection_results.get('shell_networks', []):
-            ring_id = network.get('ring_id', 'UNKNOWN')
-            score_data = self.score_shell_network(network)
-            risk_score = score_data['score'] * 100
-
-            # Add to fraud_rings
-            if ring_id not in fraud_rings:
-                fraud_rings[ring_id] = {
-                    'ring_id': ring_id,
-                    'member_accounts': network['accounts'],
-                    'pattern_type': 'shell_network',
-                    'risk_score': round(risk_score, 1)
-                }
+    def account_index(self, detection_results, profile=None):
+        """AccountIndex of a run's findings with their risk scores under a profile"""
+        return self.scored_run(detection_results, profile)[1]
 
-            # Add accounts
-            for account in network['accounts']:
-                if account not in suspicious_accounts:
-                    suspicious_accounts[account] = {
-                        'account_id': account,
-                        'suspicion_score': 0,
-                        'detected_patterns': [],
-                        'ring_id': ring_id
-                    }
-                suspicious_accounts[account]['suspicion_score'] = max(
-                    suspicious_accounts[account]['suspicion_score'],
-                    risk_score
-                )
-                if 'shell_network' not in suspicious_accounts[account]['detected_patterns']:
-                    suspicious_accounts[account]['detected_patterns'].append('shell_network')
-
-        # Sort suspicious accounts by suspicion score (descending)
-        sorted_suspicious = sorted(
-            suspicious_accounts.values(),
-            key=lambda x: x['suspicion_score'],
-            reverse=True
-        )
+    def generate_fraud_ring_output(self, detection_results, scoring_report, profile=None, risk_flow=None):
+        """Generate fraud ring output in required JSON format"""
+        # A profile re-ranks findings and drops those under its min_score; a risk_flow
+        # (detector.risk_flow()) adds propagated risk and the counterparties it reaches
+        min_score = self._profile(profile)['min_score']
+        index = self.account_index(detection_results, profile)
+        fraud_rings = index.fraud_rings(min_score)
+        suspicious_accounts = index.suspicious_accounts(min_score, risk_flow)
 
         # Create summary
         summary = {
             'total_accounts_analyzed': scoring_report.get('summary', {}).get('total_accounts', 0),
             'suspicious_accounts_flagged': len(suspicious_accounts),
             'fraud_rings_detected': len(fraud_rings),
+            'accounts_flagged_by_propagation': sum(
+                entry['detected_patterns'] == ['risk_propagation'] for entry in suspicious_accounts),
             'processing_time_seconds': 0  # Will be updated by caller
         }
 
         return {
-            'suspicious_accounts': sorted_suspicious,
-            'fraud_rings': list(fraud_rings.values()),
+            'suspicious_accounts': suspicious_accounts,
+            'fraud_rings': fraud_rings,
             'summary': summary
         }
 
-    def generate_overall_report(self, detection_results):
-        """Generate comprehensive scoring report"""
+    def generate_overall_report(self, detection_results, detailed=True, profile=None):
+        """Generate comprehensive scoring report (per-finding detailed_scores only when detailed is set)"""
         report = {
             'summary': {
                 'total_circular_patterns': len(detection_results.get('circular_routing', [])),
                 'total_smurfing_groups': len(detection_results.get('smurfing', [])),
                 'total_shell_networks': len(detection_results.get('shell_networks', [])),
-                'total_accounts': len(set(
-                    sum([list(c.get('cycle', [])) for c in detection_results.get('circular_routing', [])], []) +
-                    [s['source_account'] for s in detection_results.get('smurfing', [])] +
-                    sum([n['accounts'] for n in detection_results.get('shell_networks', [])], [])
-                ))
+                'total_accounts': 0
             },
             'detailed_scores': []
         }
 
-        # Score circular routing
-        for cycle in detection_results.get('circular_routing', []):
-            score_data = self.score_circular_routing(cycle)
-            report['detailed_scores'].append({
-                'type': 'circular_routing',
-                'data': cycle,
-                'score': score_data
-            })
-
-        # Score smurfing
-        for smurf in detection_results.get('smurfing', []):
-            score_data = self.score_smurfing(smurf)
-            report['detailed_scores'].append({
-                'type': 'smurfing',
-                'data': smurf,
-                'score': score_data
-            })
-
-        # Score shell networks
-        for network in detection_results.get('shell_networks', []):
-            score_data = self.score_shell_network(network)
-            report['detailed_scores'].append({
-                'type': 'shell_network',
-                'data': network,
-                'score': score_data
-            })
+        scores, index = self.scored_run(detection_results, profile)
+        report['summary']['total_accounts'] = index.num_core_accounts
+
+        if detailed:
+            for pattern_type, result_key in self.RESULT_KEYS.items():
+                batch = scores[pattern_type]
+                for position, finding in enumerate(detection_results.get(result_key, [])):
+                    report['detailed_scores'].append({
+                        'type': pattern_type,
+                        'data': finding,
+                        'score': self._item_score(batch, position)
+                    })
 
         # Calculate overall risk
-        if report['detailed_scores']:
-            avg_score = np.mean([item['score']['score'] for item in report['detailed_scores']])
-            max_score = max([item['score']['score'] for item in report['detailed_scores']])
+        all_scores = np.concatenate([batch['score'] for batch in scores.values()])
+        if len(all_scores):
+            max_score = float(all_scores.max())
             report['overall_risk'] = {
-                'average_score': avg_score,
+                'average_score': float(all_scores.mean()),
                 'max_score': max_score,
-                'risk_level': self._classify_risk(max_score)
+                'risk_level': str(self.classify_risk_batch(max_score, self._profile(profile)['risk_thresholds']))
             }
         else:
             report['overall_risk'] = {
@@ -299,4 +499,4 @@ class SuspiciousActivityScorer:
                 'risk_level': 'MINIMAL'
             }
 
-        return report
\ No newline at end of file
+        return report
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+
+class SlidingWindowScanner:
+    """One time-sorted copy of the transactions shared by the structuring detectors.
+
+    grouped('from_account') gives the fan-out view (each sender's outgoing
+    transactions) and grouped('to_account') the fan-in view (each receiver's
+    incoming transactions). Both are derived from the same sorted arrays with
+    a stable sort on the account codes, and are cached.
+    """
+
+    DIRECTIONS = {'from_account': 'to_account', 'to_account': 'from_account'}
+
+    def __init__(self, transactions):
+        times = pd.to_datetime(transactions['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        order = np.argsort(times, kind='stable')
+
+        self.times = times[order]
+        self.amounts = transactions['amount'].to_numpy(dtype=np.float64)[order]
+        self.accounts = {key: transactions[key].to_numpy()[order] for key in self.DIRECTIONS}
+        self._views = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    def grouped(self, key):
+        """AccountWindows over the transactions grouped by key ('from_account' or 'to_account')"""
+        if key not in self._views:
+            group, labels = pd.factorize(self.accounts[key])
+            # Stable on already time-sorted rows: (account, timestamp) order
+            order = np.argsort(group, kind='stable')
+            self._views[key] = AccountWindows(
+                key, labels, group[order], self.times[order], self.amounts[order],
+                self.accounts[self.DIRECTIONS[key]][order]
+            )
+        return self._views[key]
+
+
+class AccountWindows:
+    """Vectorized sliding-window statistics over transactions grouped by account.
+
+    Rows are in (account, timestamp) order. For every row the trailing windows
+    [t - w, t] of the same account, for any number of widths w, are located
+    with a single merged sort of the rows and their window starts, and each
+    window's count, total and number of large transactions are differences of
+    prefix sums, so no Python code runs per account or per window.
+    """
+
+    def __init__(self, key, labels, group, times, amounts, counterparties):
+        self.key = key
+        self.labels = labels
+        self.group = group
+        self.times = times
+        self.amounts = amounts
+        self.counterparties = counterparties
+        self.prefix_amount = np.concatenate([[0.0], np.cumsum(amounts)])
+
+    def __len__(self):
+        return len(self.times)
+
+    def window_starts(self, windows_ns):
+        """First row of each row's trailing window [t - w, t] within its account, per width w.
+
+        All widths are resolved by one merged sort of the rows with every
+        width's window starts. Returns an array of shape (len(windows_ns), rows).
+        """
+        windows_ns = np.atleast_1d(np.asarray(windows_ns, dtype=np.int64))
+        num_rows, num_windows = len(self.times), len(windows_ns)
+
+        # Window starts (kind 0) sort before rows (kind 1) at equal times, so the
+        # rows placed ahead of a window start are exactly those outside the window
+        merged = np.lexsort((
+            np.repeat(np.array([0, 1], dtype=np.int8), [num_windows * num_rows, num_rows]),
+            np.concatenate([(self.times[None, :] - windows_ns[:, None]).ravel(), self.times]),
+            np.tile(self.group, num_windows + 1)
+        ))
+        is_start = merged < num_windows * num_rows
+        rows_before = np.cumsum(~is_start)
+
+        starts = np.empty(num_windows * num_rows, dtype=np.int64)
+        starts[merged[is_start]] = rows_before[is_start]
+        return starts.reshape(num_windows, num_rows)
+
+    def find_clusters(self, windows_seconds, threshold_amount, min_splits):
+        """Bursts of small transactions whose trailing windows look like structuring.
+
+        A row qualifies for a window width when its trailing window holds at
+        least min_splits transactions totalling more than threshold_amount,
+        averaging under 10% of it and none reaching 50% of it. Overlapping
+        qualifying windows of an account are merged into one burst per width,
+        and bursts of different widths that overlap are merged into their
+        union, so each burst is reported once with all of its transactions.
+        Every width comes out of the same sorted pass. Returns a dict of
+        aligned arrays: start / end (half-open row ranges in sorted order),
+        account, count, total, window (narrowest matching width, seconds) and
+        matched_windows (every width whose bursts it contains, seconds).
+        """
+        windows_seconds = np.atleast_1d(np.asarray(windows_seconds, dtype=np.float64))
+        order = np.argsort(windows_seconds, kind='stable')
+        windows_seconds = windows_seconds[order]
+
+        ends = np.arange(1, len(self.times) + 1)
+        all_starts = self.window_starts((windows_seconds * 1e9).astype(np.int64))
+        large = np.concatenate([[0], np.cumsum(self.amounts >= threshold_amount * 0.5)])
+
+        # Kept bursts, disjoint and sorted by start, with a bitmask of the widths that matched them
+        start = np.empty(0, dtype=np.int64)
+        end = np.empty(0, dtype=np.int64)
+        window = np.empty(0, dtype=np.float64)
+        matched = np.empty(0, dtype=np.int64)
+        for window_index, starts in enumerate(all_starts):
+            count = ends - starts
+            total = self.prefix_amount[ends] - self.prefix_amount[starts]
+            qualifies = (
+                (count >= min_splits) &
+                (total > threshold_amount) &
+                (total < threshold_amount * 0.1 * count) &
+                (large[ends] == large[starts])
+            )
+
+            rows = np.flatnonzero(qualifies)
+            window_start, window_end = starts[rows], ends[rows]
+            # Window starts never move backwards within an account, so a qualifying
+            # window opens a new burst unless it overlaps the previous one
+            new_burst = np.ones(len(rows), dtype=bool)
+            new_burst[1:] = (self.group[rows[1:]] != self.group[rows[:-1]]) | (window_start[1:] >= window_end[:-1])
+            first = np.flatnonzero(new_burst)
+            last = np.append(first[1:], len(rows))[:len(first)] - 1
+
+            # Row ranges of different accounts never overlap, so overlap means the same
+            # account; a burst overlapping kept (narrower) ones is merged with them into
+            # their union, which keeps the narrowest width and every matched width
+            start = np.concatenate([start, window_start[first]])
+            end = np.concatenate([end, window_end[last]])
+            window = np.concatenate([window, np.full(len(first), windows_seconds[window_index])])
+            matched = np.concatenate([matched, np.full(len(first), 1 << window_index, dtype=np.int64)])
+            order = np.argsort(start, kind='stable')
+            start, end, window, matched = start[order], end[order], window[order], matched[order]
+
+            if len(start):
+                reach = np.maximum.accumulate(end)
+                component = np.flatnonzero(np.concatenate([[True], start[1:] >= reach[:-1]]))
+                start = start[component]
+                end = np.maximum.reduceat(end, component)
+                window = np.minimum.reduceat(window, component)
+                matched = np.bitwise_or.reduceat(matched, component)
+
+        return {
+            'start': start,
+            'end': end,
+            'account': self.labels[self.group[start]] if len(start) else self.labels[:0],
+            'count': end - start,
+            'total': self.prefix_amount[end] - self.prefix_amount[start],
+            'window': window,
+            'matched_windows': [windows_seconds[(mask >> np.arange(len(windows_seconds))) & 1 == 1].tolist()
+                                for mask in matched.tolist()]
+        }
+
+    def segment_rows(self, starts, ends):
+        """Concatenated rows of several row ranges and the offsets of each range in them"""
+        lengths = ends - starts
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        rows = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - starts, lengths)
+        return rows, offsets
+
+    def segment_counterparties(self, starts, ends):
+        """Distinct counterparties of each row range, in order of first appearance"""
+        rows, offsets = self.segment_rows(starts, ends)
+        if len(rows) == 0:
+            return [[] for _ in starts]
+
+        segment = np.repeat(np.arange(len(starts)), np.diff(offsets))
+        codes, uniques = pd.factorize(self.counterparties[rows])
+
+        # First occurrence of each (segment, counterparty) pair
+        pair = segment.astype(np.int64) * len(uniques) + codes
+        _, first = np.unique(pair, return_index=True)
+        first.sort()
+        bounds = np.searchsorted(segment[first], np.arange(len(starts) + 1))
+        values = uniques[codes[first]].tolist()
+        return [values[bounds[i]:bounds[i + 1]] for i in range(len(starts))]
+
+    def segment_amounts(self, starts, ends):
+        """(amounts, offsets): amounts of several row ranges back to back, range i at offsets[i]:offsets[i + 1]"""
+        rows, offsets = self.segment_rows(starts, ends)
+        return self.amounts[rows], offsets
+
+    def timestamps(self, rows):
+        """Row times as pandas Timestamps"""
+        return pd.to_datetime(self.times[rows])
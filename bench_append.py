@@ -0,0 +1,73 @@
+"""
+Benchmark: appending a small batch vs. base size
+
+Loads num_rows synthetic transactions, then appends a fixed batch of
+BATCH_ROWS rows (about half touching existing edges, half new accounts).
+"merge" is append_transactions with the cycle search disabled, i.e. the
+edge table and graph update alone; "append" includes the search for
+cycles through the new edges. Both should stay flat as the base grows,
+while a full reload grows with it.
+
+Usage:
+    python bench_append.py                      # default row counts
+    python bench_append.py 100000 1000000
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from detector import MoneyMulingDetector
+from bench_build_graph import make_transactions
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+BATCH_ROWS = 100
+
+
+def make_batch(base, seed=7):
+    """BATCH_ROWS rows: half repeat existing (from, to) pairs, half go to new accounts"""
+    rng = np.random.default_rng(seed)
+    existing = base.iloc[rng.integers(0, len(base), BATCH_ROWS // 2)]
+    fresh = BATCH_ROWS - len(existing)
+    return pd.DataFrame({
+        'transaction_id': [f'NEW_{i:05d}' for i in range(BATCH_ROWS)],
+        'from_account': existing['from_account'].tolist() + existing['to_account'].iloc[:fresh].tolist(),
+        'to_account': existing['to_account'].tolist() + [f'NEW_ACC_{i:05d}' for i in range(fresh)],
+        'amount': np.round(rng.exponential(1000, BATCH_ROWS), 2),
+        'timestamp': pd.Timestamp('2026-02-01') + pd.to_timedelta(rng.integers(0, 86400, BATCH_ROWS), unit='s')
+    })
+
+
+def time_call(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    print("=" * 72)
+    print(f"{'rows':>9} {'backend':>9} {'load (s)':>10} {'merge (s)':>10} {'append (s)':>11} {'load / merge':>13}")
+    print("=" * 72)
+
+    for num_rows in sizes:
+        base = make_transactions(num_rows)
+        batch = make_batch(base)
+        for backend in MoneyMulingDetector.GRAPH_BACKENDS:
+            detector = MoneyMulingDetector(graph_backend=backend)
+            load = time_call(lambda: detector.load_transactions(base))
+            merge = time_call(lambda: detector.append_transactions(batch, max_cycles=0))
+
+            detector = MoneyMulingDetector(graph_backend=backend)
+            detector.load_transactions(base)
+            append = time_call(lambda: detector.append_transactions(batch))
+            print(f"{num_rows:>9} {backend:>9} {load:10.3f} {merge:10.3f} {append:11.3f} {load / merge:12.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: transaction graph construction time vs. row count
+
+Compares the old per-row iterrows/add_edge loop against the grouped,
+bulk-loaded MoneyMulingDetector._build_graph on synthetic data.
+
+Usage:
+    python bench_build_graph.py                     # default row counts
+    python bench_build_graph.py 10000 100000 2000000
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from detector import MoneyMulingDetector
+
+DEFAULT_SIZES = [10000, 50000, 200000, 1000000]
+LEGACY_MAX_ROWS = 200000  # The row loop gets too slow to be worth timing past this
+
+
+def make_transactions(num_rows, seed=42):
+    """Generate synthetic transactions with roughly num_rows / 4 accounts"""
+    rng = np.random.default_rng(seed)
+    num_accounts = max(num_rows // 4, 10)
+    from_idx = rng.integers(0, num_accounts, num_rows)
+    to_idx = (from_idx + rng.integers(1, num_accounts, num_rows)) % num_accounts
+    base = pd.Timestamp('2026-01-01')
+
+    return pd.DataFrame({
+        'transaction_id': [f'TXN_{i:08d}' for i in range(num_rows)],
+        'from_account': [f'ACC_{i:07d}' for i in from_idx],
+        'to_account': [f'ACC_{i:07d}' for i in to_idx],
+        'amount': np.round(rng.exponential(1000, num_rows), 2),
+        'timestamp': base + pd.to_timedelta(rng.integers(0, 30 * 86400, num_rows), unit='s')
+    })
+
+
+def build_graph_legacy(transactions):
+    """Original row-by-row graph construction"""
+    graph = nx.DiGraph()
+    accounts = set(transactions['from_account']).union(set(transactions['to_account']))
+    graph.add_nodes_from(accounts)
+    for _, row in transactions.iterrows():
+        graph.add_edge(
+            row['from_account'],
+            row['to_account'],
+            amount=row['amount'],
+            timestamp=row['timestamp'],
+            transaction_id=row['transaction_id']
+        )
+    return graph
+
+
+def time_call(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    print("=" * 72)
+    print(f"{'rows':>10} {'nodes':>10} {'edges':>10} {'legacy (s)':>12} {'grouped (s)':>12} {'speedup':>9}")
+    print("=" * 72)
+
+    for num_rows in sizes:
+        df = make_transactions(num_rows)
+
+        detector = MoneyMulingDetector()
+        detector.transactions = df
+        _, new_time = time_call(detector._build_graph)
+        graph = detector.graph
+
+        if num_rows <= LEGACY_MAX_ROWS:
+            legacy_graph, legacy_time = time_call(lambda: build_graph_legacy(df))
+            assert legacy_graph.number_of_edges() == graph.number_of_edges()
+            legacy_col = f"{legacy_time:12.3f}"
+            speedup_col = f"{legacy_time / new_time:8.1f}x"
+        else:
+            legacy_col = f"{'skipped':>12}"
+            speedup_col = f"{'-':>9}"
+
+        print(f"{num_rows:>10} {graph.number_of_nodes():>10} {graph.number_of_edges():>10} "
+              f"{legacy_col} {new_time:12.3f} {speedup_col}")
+
+
+if __name__ == '__main__':
+    main()
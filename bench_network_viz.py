@@ -0,0 +1,122 @@
+"""
+Benchmark: network figure build, payload size and serialization vs. edge count
+
+Compares the old one-Scatter-per-edge figure against the batched edge
+traces of TransactionGraphAnalyzer.create_enhanced_network_visualization
+on synthetic graphs. Node positions are random (seeded into the layout
+cache) so only figure construction and serialization are timed.
+
+Usage:
+    python bench_network_viz.py                     # default edge counts
+    python bench_network_viz.py 5000 50000 200000
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from detector import MoneyMulingDetector
+from graph_rules import TransactionGraphAnalyzer
+from scoring import SuspiciousActivityScorer
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+LEGACY_MAX_EDGES = 50000  # One trace per edge gets too slow to be worth timing past this
+NUM_RINGS = 20
+
+
+def make_detector(num_edges, seed=42):
+    """Detector loaded with about num_edges distinct edges, NUM_RINGS rings and a cached random layout"""
+    rng = np.random.default_rng(seed)
+    num_accounts = max(num_edges // 4, 10)
+    from_idx = rng.integers(0, num_accounts, num_edges)
+    to_idx = (from_idx + rng.integers(1, num_accounts, num_edges)) % num_accounts
+    df = pd.DataFrame({
+        'transaction_id': [f'TXN_{i:08d}' for i in range(num_edges)],
+        'from_account': [f'ACC_{i:07d}' for i in from_idx],
+        'to_account': [f'ACC_{i:07d}' for i in to_idx],
+        'amount': np.round(rng.exponential(1000, num_edges), 2),
+        'timestamp': pd.Timestamp('2026-01-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, num_edges), unit='s')
+    })
+
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+    nodes = list(detector.graph.nodes())
+    detector.layout_cache.positions = dict(zip(nodes, rng.uniform(-1, 1, (len(nodes), 2))))
+    detector.layout_cache.version = detector.graph_version
+
+    # Rings along existing edges so some edges are drawn in ring colours
+    rings = {}
+    for ring_index, (u, v) in enumerate(list(detector.graph.edges())[:NUM_RINGS]):
+        rings[f'RING_{ring_index:03d}'] = {'members': [u, v] + list(detector.graph.successors(v))[:3]}
+    return detector, rings
+
+
+def legacy_figure(analyzer, rings):
+    """Original figure construction: one Scatter trace per edge"""
+    graph = analyzer.graph
+    pos = analyzer.detector.layout_cache.positions
+    node_to_ring = {member: ring_id for ring_id, ring in rings.items() for member in ring['members']}
+    ring_color_map = {ring_id: analyzer.ring_colors[i % len(analyzer.ring_colors)] for i, ring_id in enumerate(rings)}
+
+    fig = go.Figure()
+    for u, v in graph.edges():
+        color, width = '#888', 1
+        if u in node_to_ring and node_to_ring.get(v) == node_to_ring[u]:
+            color, width = ring_color_map[node_to_ring[u]], 3
+        fig.add_trace(go.Scatter(
+            x=[pos[u][0], pos[v][0]], y=[pos[u][1], pos[v][1]],
+            mode='lines', line=dict(width=width, color=color),
+            hoverinfo='text', text=f"{u} → {v}", showlegend=False
+        ))
+    nodes = list(graph.nodes())
+    fig.add_trace(go.Scatter(x=[pos[n][0] for n in nodes], y=[pos[n][1] for n in nodes],
+                             mode='markers + text', text=nodes, name='Accounts'))
+    return fig
+
+
+def measure(build):
+    """(build seconds, serialize seconds, payload MB, number of traces)"""
+    start = time.perf_counter()
+    fig = build()
+    built = time.perf_counter()
+    payload = json.dumps(fig.to_dict())
+    serialized = time.perf_counter()
+    return built - start, serialized - built, len(payload) / 1024 ** 2, len(fig.data)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    scorer = SuspiciousActivityScorer()
+
+    print("=" * 96)
+    print(f"{'edges':>8} {'figure':>8} {'traces':>8} {'build (s)':>10} {'to_dict+json (s)':>17} "
+          f"{'payload (MB)':>13} {'total speedup':>14}")
+    print("=" * 96)
+
+    for num_edges in sizes:
+        detector, rings = make_detector(num_edges)
+        analyzer = TransactionGraphAnalyzer(detector)
+        edges = detector.num_edges()
+
+        batched = measure(lambda: analyzer.create_enhanced_network_visualization({}, scorer, rings=rings))
+        rows = [('batched', batched)]
+        if num_edges <= LEGACY_MAX_EDGES:
+            rows.insert(0, ('legacy', measure(lambda: legacy_figure(analyzer, rings))))
+
+        for name, (build, serialize, size_mb, traces) in rows:
+            if name == 'batched' and len(rows) == 2:
+                legacy = rows[0][1]
+                speedup = f"{(legacy[0] + legacy[1]) / (build + serialize):13.1f}x"
+            else:
+                speedup = f"{'-':>14}"
+            print(f"{edges:>8} {name:>8} {traces:>8} {build:10.3f} {serialize:17.3f} {size_mb:13.2f} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Account codec tests: encoding at ingest and decoding of detection / scoring output
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from accounts import AccountCodec
+from detector import MoneyMulingDetector
+from scoring import SuspiciousActivityScorer
+from test_cycle_search import make_transactions, canonical
+from test_smurfing import make_split_transactions
+
+
+def make_mixed_transactions():
+    """Random background with cycles, one split burst and one pass-through chain"""
+    hops = ['ORIGIN', 'P1', 'P2', 'P3', 'P4', 'DEST']
+    chain = pd.DataFrame({
+        'transaction_id': [f'C{i}' for i in range(5)],
+        'from_account': hops[:-1],
+        'to_account': hops[1:],
+        'amount': [10000.0, 9900.0, 9800.0, 9700.0, 9600.0],
+        'timestamp': pd.Timestamp('2026-02-15 08:00:00') + pd.to_timedelta(np.arange(5) * 2, unit='h')
+    })
+    splits = make_split_transactions('SRC', pd.Timestamp('2026-02-15 10:00:00'), 15, 2)
+    return pd.concat([make_transactions(30, 90), splits, chain], ignore_index=True)
+
+
+def account_values(obj):
+    """Every value stored under an account field or as a ring edge endpoint"""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in AccountCodec.ACCOUNT_FIELDS:
+                yield from (value if isinstance(value, list) else [value])
+            elif key == 'edges':
+                for edge in value:
+                    yield from edge[:2]
+            else:
+                yield from account_values(value)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            yield from account_values(item)
+
+
+def test_codec_round_trip_and_extend():
+    """Codes decode to the original IDs; a later batch keeps old codes and appends new ones"""
+    df = make_transactions(30, 90)
+    codec = AccountCodec()
+    encoded = codec.encode_frame(df)
+    assert encoded['from_account'].dtype == np.int32
+    assert codec.decode(encoded['from_account'].tolist()) == df['from_account'].tolist()
+    assert codec.decode(encoded['to_account'].tolist()) == df['to_account'].tolist()
+
+    known = len(codec)
+    existing = df['from_account'].iloc[0]
+    batch = pd.DataFrame({'from_account': [existing, 'NEW_1'], 'to_account': ['NEW_2', existing]})
+    encoded_batch = codec.encode_frame(batch)
+    assert encoded_batch['from_account'].iloc[0] == encoded['from_account'].iloc[0]
+    assert set(encoded_batch['to_account'].iloc[:1]) | set(encoded_batch['from_account'].iloc[1:]) == {known, known + 1}
+    assert codec.decode(encoded_batch['from_account'].tolist()) == [existing, 'NEW_1']
+    assert codec.code('NEW_2') == known + 1 and codec.code('NEVER_SEEN') == -1
+    assert codec.decode_keys({known: 0.5}) == {'NEW_1': 0.5}
+
+
+def test_decoded_results_match_raw_ids():
+    """Detection results, report and ring output decode to what a run on raw IDs produces"""
+    df = make_mixed_transactions()
+    raw = MoneyMulingDetector()
+    raw.load_transactions(df)
+    raw_results = raw.run_full_detection()
+
+    codec = AccountCodec()
+    detector = MoneyMulingDetector()
+    detector.load_transactions(codec.encode_frame(df), accounts=codec)
+    results = detector.run_full_detection()
+    decoded = detector.decode_accounts(results)
+
+    assert raw_results['smurfing'] and raw_results['shell_networks']
+    assert decoded['smurfing'] == raw_results['smurfing']
+    assert decoded['shell_networks'] == raw_results['shell_networks']
+    # Cycles rotate to start at their smallest node, which differs between codes and IDs
+    assert ({canonical(c['cycle']) for c in decoded['circular_routing']} ==
+            {canonical(c['cycle']) for c in raw_results['circular_routing']})
+
+    ids = set(df['from_account']) | set(df['to_account'])
+    assert set(account_values(decoded)) <= ids
+    ring = next(ring for ring in decoded['rings'].values() if ring['type'] == 'circular_routing')
+    assert [edge[0] for edge in ring['edges']] == ring['members']
+    assert all(isinstance(edge[2], dict) and 'amount' in edge[2] for edge in ring['edges'])
+
+    scorer = SuspiciousActivityScorer()
+    report = scorer.generate_overall_report(results)
+    output = detector.decode_accounts(scorer.generate_fraud_ring_output(results, report))
+    raw_report = scorer.generate_overall_report(raw_results)
+    raw_output = scorer.generate_fraud_ring_output(raw_results, raw_report)
+    assert set(account_values(detector.decode_accounts(report))) <= ids
+    assert ({a['account_id']: round(a['suspicion_score'], 6) for a in output['suspicious_accounts']} ==
+            {a['account_id']: round(a['suspicion_score'], 6) for a in raw_output['suspicious_accounts']})
+    assert ({canonical(r['member_accounts']): round(r['risk_score'], 6) for r in output['fraud_rings']} ==
+            {canonical(r['member_accounts']): round(r['risk_score'], 6) for r in raw_output['fraud_rings']})
+
+    # Appended batches are encoded with the same dictionary
+    anchor = df['from_account'].iloc[0]
+    first_hop = df['to_account'].iloc[0]
+    batch = pd.DataFrame({
+        'transaction_id': ['N1', 'N2'],
+        'from_account': [first_hop, 'NEW_1'],
+        'to_account': ['NEW_1', anchor],
+        'amount': [500.0, 450.0],
+        'timestamp': pd.to_datetime(['2026-02-16 10:00:00', '2026-02-16 11:00:00'])
+    })
+    new_cycles = detector.decode_accounts(detector.append_transactions(codec.encode_frame(batch)))
+    assert canonical([anchor, first_hop, 'NEW_1']) in {canonical(c['cycle']) for c in new_cycles}
+
+
+
+def upload_csv(client, rows):
+    """Upload (sender, receiver) rows as a CSV file through the API"""
+    lines = ['transaction_id,sender_id,receiver_id,amount,timestamp'] + [
+        f'T{i},{sender},{receiver},{1000 - i * 10}.00,2026-02-15 10:{i:02d}:00'
+        for i, (sender, receiver) in enumerate(rows)
+    ]
+    data = {'file': (io.BytesIO('\n'.join(lines).encode()), 'transactions.csv')}
+    return client.post('/api/upload-transactions', data=data, content_type='multipart/form-data')
+
+
+def test_reupload_drops_results_of_previous_codec():
+    """Results coded with a previous upload's codec are not decoded against the next one"""
+    import main
+    client = main.app.test_client()
+    assert upload_csv(client, [('ALICE', 'BOB'), ('BOB', 'CAROL'), ('CAROL', 'ALICE')]).status_code == 200
+    assert client.post('/api/run-detection').status_code == 200
+    rings = client.get('/api/fraud-rings').get_json()['data']['fraud_rings']
+    assert {account for ring in rings for account in ring['member_accounts']} == {'ALICE', 'BOB', 'CAROL'}
+
+    assert upload_csv(client, [('ZED', 'YAN'), ('YAN', 'XI'), ('XI', 'WU')]).status_code == 200
+    assert main.last_detection_results is None
+    assert client.get('/api/fraud-rings').status_code == 400
+    assert client.post('/api/run-detection').status_code == 200
+    assert client.get('/api/fraud-rings').get_json()['data']['fraud_rings'] == []
+
+if __name__ == '__main__':
+    test_codec_round_trip_and_extend()
+    test_decoded_results_match_raw_ids()
+    test_reupload_drops_results_of_previous_codec()
+    print("[PASS] Account codec tests passed")
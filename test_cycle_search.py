@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Cycle search tests: length-bounded enumeration against networkx reference
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from cycles import bounded_simple_cycles, parallel_bounded_cycles
+from detector import MoneyMulingDetector
+from accounts import AccountCodec
+from graph_rules import TransactionGraphAnalyzer
+
+
+def make_transactions(num_accounts, num_rows, seed=7):
+    """Random sparse transaction set"""
+    rng = np.random.default_rng(seed)
+    from_idx = rng.integers(0, num_accounts, num_rows)
+    to_idx = (from_idx + rng.integers(1, num_accounts, num_rows)) % num_accounts
+    return pd.DataFrame({
+        'transaction_id': [f'TX{i:05d}' for i in range(num_rows)],
+        'from_account': [f'ACC_{i:04d}' for i in from_idx],
+        'to_account': [f'ACC_{i:04d}' for i in to_idx],
+        'amount': np.round(rng.uniform(100, 5000, num_rows), 2),
+        'timestamp': pd.Timestamp('2026-02-15') + pd.to_timedelta(rng.integers(0, 86400, num_rows), unit='s')
+    })
+
+
+def canonical(cycle):
+    """Rotate a cycle to start at its smallest node"""
+    i = cycle.index(min(cycle))
+    return tuple(cycle[i:] + cycle[:i])
+
+
+def reference_cycles(graph, max_length):
+    return {canonical(c) for c in nx.simple_cycles(graph, length_bound=max_length) if len(c) >= 3}
+
+
+def test_bounded_cycles_match_networkx():
+    """Every cycle of 3..max_length nodes is found exactly once"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(40, 200))
+
+    for max_length in (3, 4, 5, 6):
+        found = [tuple(c) for c in bounded_simple_cycles(detector.graph, max_length)]
+        assert len(found) == len(set(found)), "Duplicate cycles reported"
+        assert set(found) == reference_cycles(detector.graph, max_length)
+
+
+def test_bounded_cycles_on_csr_backend():
+    """The CSR backend yields the same cycles as networkx"""
+    df = make_transactions(60, 180)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df, graph_backend='csr')
+
+    found = {canonical(detector.csr.labels[c].tolist()) for c in bounded_simple_cycles(detector.csr, 5)}
+    nx_detector = MoneyMulingDetector()
+    nx_detector.load_transactions(df)
+    assert found == reference_cycles(nx_detector.graph, 5)
+
+
+def test_graph_metrics_on_csr_backend():
+    """CSR metrics never build the networkx graph; clustering matches networkx"""
+    df = make_transactions(60, 300)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df, graph_backend='csr')
+    metrics = TransactionGraphAnalyzer(detector).analyze_graph_metrics()
+    assert detector._graph is None
+    assert 'closeness_centrality' not in metrics and 'closeness_skipped' in metrics
+
+    nx_detector = MoneyMulingDetector()
+    nx_detector.load_transactions(df)
+    assert np.isclose(metrics['clustering_coefficient'], nx.average_clustering(nx_detector.graph.to_undirected()))
+
+
+def test_cycle_cap_stops_search():
+    """max_cycles is honoured on a dense graph"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(60, 2000))
+
+    cycles = detector.detect_circular_fund_routing(max_cycles=50)
+    assert len(cycles) == 50
+    assert all(3 <= c['length'] <= 8 for c in cycles)
+
+
+def test_parallel_cycles_are_deterministic():
+    """Process-pool search returns the sequential cycles in the same order"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(40, 300))
+
+    for max_cycles in (500, 10 ** 9):
+        sequential = []
+        for cycle in bounded_simple_cycles(detector.graph, 5):
+            if len(sequential) >= max_cycles:
+                break
+            sequential.append(cycle)
+
+        assert parallel_bounded_cycles(detector.graph, 5, max_cycles, workers=3) == sequential
+        assert parallel_bounded_cycles(detector.graph, 5, max_cycles, workers=2) == sequential
+
+
+def test_dfs_cycles_are_deduplicated():
+    """Sampled DFS stores each ring once, without the repeated start node"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(30, 150))
+
+    cycles = detector.detect_circular_fund_routing(max_cycle_length=4)
+    detector._cycle_keys, detector._duplicate_cycles = set(), 0
+    sampled = detector._detect_cycles_efficiently(max_cycle_length=4, max_cycles=1000)
+
+    keys = [canonical(c['cycle']) for c in sampled]
+    assert len(keys) == len(set(keys))
+    assert all(len(set(c['cycle'])) == c['length'] <= 4 for c in sampled)
+    assert detector._duplicate_cycles > 0
+    assert set(keys) <= {canonical(c['cycle']) for c in cycles}
+
+
+def test_temporal_cycles_respect_time_order():
+    """Only cycles whose hops move forward in time inside the window are reported"""
+    df = pd.DataFrame({
+        'transaction_id': ['T1', 'T2', 'T3', 'T4', 'T5', 'T6'],
+        'from_account': ['A', 'B', 'C', 'X', 'Y', 'Z'],
+        'to_account': ['B', 'C', 'A', 'Y', 'Z', 'X'],
+        'amount': [9000.0, 8800.0, 8600.0, 5000.0, 4900.0, 4800.0],
+        'timestamp': pd.to_datetime([
+            '2026-02-15 10:00:00', '2026-02-15 11:00:00', '2026-02-15 12:00:00',  # forward in time
+            '2026-02-15 12:00:00', '2026-02-15 11:00:00', '2026-02-15 10:00:00'   # backwards
+        ])
+    })
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+
+    cycles = detector.detect_temporal_cycles(window_hours=6)
+    assert [canonical(c['cycle']) for c in cycles] == [('A', 'B', 'C')]
+    assert cycles[0]['time_span_seconds'] == 7200
+    assert detector.detect_temporal_cycles(window_hours=1) == []
+
+
+def test_append_finds_only_new_cycles():
+    """Appending a batch adds exactly the cycles a full rerun would add"""
+    df = make_transactions(50, 220)
+    base, batch = df.iloc[:180], df.iloc[180:]
+
+    for graph_backend in ('networkx', 'csr'):
+        accounts = AccountCodec()
+        detector = MoneyMulingDetector()
+        detector.load_transactions(accounts.encode_frame(base), graph_backend=graph_backend, accounts=accounts)
+        before = {canonical(c['cycle']) for c in detector.detect_circular_fund_routing(max_cycle_length=5, max_cycles=10 ** 6)}
+        version = detector.graph_version
+
+        appended = detector.append_transactions(accounts.encode_frame(batch), max_cycle_length=5, max_cycles=10 ** 6)
+        assert detector.graph_version > version
+        assert len(detector.rings) == len(before) + len(appended)
+
+        full = MoneyMulingDetector()
+        full.load_transactions(df)
+        expected = reference_cycles(full.graph, 5) - {canonical(accounts.decode(list(c))) for c in before}
+        found = [canonical(accounts.decode(c['cycle'])) for c in appended]
+        assert len(found) == len(set(found))
+        assert set(found) == expected
+
+
+if __name__ == '__main__':
+    test_bounded_cycles_match_networkx()
+    test_bounded_cycles_on_csr_backend()
+    test_graph_metrics_on_csr_backend()
+    test_cycle_cap_stops_search()
+    test_parallel_cycles_are_deterministic()
+    test_dfs_cycles_are_deduplicated()
+    test_temporal_cycles_respect_time_order()
+    test_append_finds_only_new_cycles()
+    print("[PASS] Cycle search tests passed")
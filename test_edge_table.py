@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Edge table tests: per-edge aggregates of parallel transactions
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from accounts import AccountCodec
+from detector import MoneyMulingDetector
+from edge_table import EdgeTable
+
+
+def make_parallel_transactions(num_accounts=12, num_rows=400, seed=3):
+    """Few accounts and many rows, so most edges have parallel transactions, shuffled in time"""
+    rng = np.random.default_rng(seed)
+    from_idx = rng.integers(0, num_accounts, num_rows)
+    to_idx = (from_idx + rng.integers(1, num_accounts, num_rows)) % num_accounts
+    return pd.DataFrame({
+        'transaction_id': [f'TX{i:05d}' for i in range(num_rows)],
+        'from_account': [f'ACC_{i:02d}' for i in from_idx],
+        'to_account': [f'ACC_{i:02d}' for i in to_idx],
+        'amount': np.round(rng.uniform(100, 5000, num_rows), 2),
+        'timestamp': pd.Timestamp('2026-02-15') + pd.to_timedelta(rng.permutation(num_rows) * 60, unit='s')
+    })
+
+
+def expected_edges(df):
+    """Reference aggregates per (from, to) pair from a pandas groupby"""
+    ordered = df.sort_values('timestamp', kind='stable')
+    grouped = ordered.groupby(['from_account', 'to_account'], sort=False)
+    return grouped.agg(
+        count=('amount', 'size'),
+        total=('amount', 'sum'),
+        first=('timestamp', 'min'),
+        last=('timestamp', 'max'),
+        last_transaction_id=('transaction_id', 'last')
+    ), {key: group for key, group in grouped}
+
+
+def test_edge_table_matches_groupby():
+    """Counts, totals, first / last times, last transaction and sorted history per edge"""
+    df = make_parallel_transactions()
+    table = EdgeTable.from_transactions(df)
+    expected, groups = expected_edges(df)
+    assert len(table) == len(expected) and (table.count > 1).any()
+
+    for edge_id, (src, dst) in enumerate(zip(table.src, table.dst)):
+        row = expected.loc[(src, dst)]
+        assert table.count[edge_id] == row['count']
+        assert np.isclose(table.total_amount[edge_id], row['total'])
+        assert table.first_time[edge_id] == row['first'].value
+        assert table.last_time[edge_id] == row['last'].value
+        assert table.last_transaction_id[edge_id] == row['last_transaction_id']
+
+        records = table.transactions(edge_id)
+        group = groups[(src, dst)]
+        assert np.array_equal(records['timestamp'], group['timestamp'].to_numpy(dtype='datetime64[ns]'))
+        assert np.array_equal(records['amount'], group['amount'].to_numpy())
+        assert np.all(np.diff(table.times(edge_id)) >= 0)
+
+
+def test_edge_record_same_on_both_backends():
+    """edge_record returns the groupby aggregates on the networkx and CSR backends"""
+    df = make_parallel_transactions()
+    expected, groups = expected_edges(df)
+
+    for backend in MoneyMulingDetector.GRAPH_BACKENDS:
+        detector = MoneyMulingDetector(graph_backend=backend)
+        detector.load_transactions(df)
+        for (src, dst), row in expected.iterrows():
+            record = detector.edge_record(src, dst)
+            assert record['transaction_count'] == row['count']
+            assert np.isclose(record['amount'], row['total'])
+            assert pd.Timestamp(record['first_timestamp']) == row['first']
+            assert pd.Timestamp(record['last_timestamp']) == row['last']
+            assert record['transaction_id'] == row['last_transaction_id']
+            assert np.array_equal(record['transactions']['amount'], groups[(src, dst)]['amount'].to_numpy())
+        assert detector.edge_record('ACC_00', 'NOT_AN_ACCOUNT') is None
+
+
+def assert_same_edges(detector, reference, pairs):
+    """Edge records and adjacency of detector match a detector built from all rows at once"""
+    assert detector.num_accounts() == reference.num_accounts()
+    assert detector.num_edges() == reference.num_edges()
+    for src, dst in pairs:
+        record, expected = detector.edge_record(src, dst), reference.edge_record(src, dst)
+        for key in ('amount', 'transaction_count', 'first_timestamp', 'last_timestamp', 'transaction_id'):
+            assert np.isclose(record[key], expected[key]) if key == 'amount' else record[key] == expected[key]
+        assert np.array_equal(record['transactions'], expected['transactions'])
+
+    if detector.csr is not None:
+        csr = detector.csr
+        for node in range(csr.number_of_nodes()):
+            successors = csr.successors(node)
+            assert np.all(np.diff(successors) > 0)
+            assert (set(csr.labels[successors].tolist()) ==
+                    set(reference.csr.labels[reference.csr.successors(reference.csr.code(csr.labels[node]))].tolist()))
+            assert (set(csr.labels[csr.predecessors(node)].tolist()) ==
+                    set(reference.csr.labels[reference.csr.predecessors(reference.csr.code(csr.labels[node]))].tolist()))
+
+
+def test_append_matches_full_rebuild():
+    """Merging batches into the edge table and graph gives the same edges as loading everything at once"""
+    df = make_parallel_transactions(num_rows=300)
+    batches = [
+        # Existing edges (some earlier than their stored rows, one timestamp tie), new edges and new accounts
+        pd.DataFrame({
+            'transaction_id': ['B0', 'B1', 'B2', 'B3', 'B4', 'B5'],
+            'from_account': [df['from_account'].iloc[0], df['from_account'].iloc[1], 'ACC_00', 'NEW_1', 'NEW_1',
+                             df['from_account'].iloc[2]],
+            'to_account': [df['to_account'].iloc[0], df['to_account'].iloc[1], 'NEW_1', 'ACC_03', 'NEW_2',
+                           df['to_account'].iloc[2]],
+            'amount': [111.0, 222.0, 333.0, 444.0, 555.0, 666.0],
+            'timestamp': [pd.Timestamp('2026-02-14'), df['timestamp'].max(), pd.Timestamp('2026-02-16'),
+                          pd.Timestamp('2026-02-16 01:00'), pd.Timestamp('2026-02-16 02:00'),
+                          df['timestamp'].iloc[2]]
+        }),
+        make_parallel_transactions(num_accounts=15, num_rows=100, seed=5).assign(
+            transaction_id=lambda batch: 'C' + batch['transaction_id'])
+    ]
+    full = pd.concat([df] + batches, ignore_index=True)
+    pairs = list(full[['from_account', 'to_account']].drop_duplicates().itertuples(index=False, name=None))
+
+    for backend in MoneyMulingDetector.GRAPH_BACKENDS:
+        for encoded in (False, True):
+            codec = AccountCodec() if encoded else None
+            encode = codec.encode_frame if encoded else (lambda frame: frame)
+            detector = MoneyMulingDetector(graph_backend=backend)
+            detector.load_transactions(encode(df), accounts=codec)
+            graph = detector.csr if backend == 'csr' else detector.graph
+            for batch in batches:
+                detector.append_transactions(encode(batch))
+            assert (detector.csr if backend == 'csr' else detector.graph) is graph  # extended, not rebuilt
+
+            reference = MoneyMulingDetector(graph_backend=backend)
+            reference.load_transactions(encode(full), accounts=codec)
+            coded_pairs = [tuple(codec.encode([u, v])) if encoded else (u, v) for u, v in pairs]
+            assert_same_edges(detector, reference, coded_pairs)
+            assert detector.num_transactions() == len(detector.transactions) == len(full)
+
+
+if __name__ == '__main__':
+    test_edge_table_matches_groupby()
+    test_edge_record_same_on_both_backends()
+    test_append_matches_full_rebuild()
+    print("[PASS] Edge table tests passed")
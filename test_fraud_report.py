@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+"""
+Fraud report tests: account aggregation and report generation
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from detector import MoneyMulingDetector
+from scoring import SuspiciousActivityScorer
+from test_cycle_search import make_transactions
+
+
+def make_detection_results():
+    """One finding of each pattern type sharing account 2"""
+    return {
+        'circular_routing': [{'cycle': [1, 2, 3], 'length': 3, 'total_amount': 90000.0,
+                              'time_span_seconds': 600.0, 'ring_id': 'RING_000'}],
+        'smurfing': [{'source_account': 2, 'recipients': [4, 5, 6], 'total_amount': 12000.0,
+                      'num_transactions': 3, 'suspicious_score': 0.9, 'ring_id': 'RING_001'}],
+        'shell_networks': [{'accounts': [2, 7, 8], 'size': 3, 'total_volume': 9000.0,
+                            'avg_centrality': 0.1, 'ring_id': 'RING_002'}]
+    }
+
+
+def reference_risk_level(score):
+    """Risk band of the original per-finding scorer"""
+    for level, floor in (('CRITICAL', 0.8), ('HIGH', 0.6), ('MEDIUM', 0.4), ('LOW', 0.2)):
+        if score >= floor:
+            return level
+    return 'MINIMAL'
+
+
+def reference_circular_routing_score(cycle):
+    """Original per-cycle formula with the default weights"""
+    length_score = min(cycle['length'] / 10, 1.0)
+    amount_score = min(cycle['total_amount'] / 100000, 1.0)
+    time_score = 1 - min(cycle['time_span_seconds'] / 3600 / 24, 1.0)
+    return length_score * 0.3 + amount_score * 0.4 + time_score * 0.3
+
+
+def reference_smurfing_pattern_score(group):
+    """Original per-group formula with the default weights"""
+    amount_ratio = min(group['total_amount'] / 50000, 1.0)
+    frequency_score = min(group['num_transactions'] / 20, 1.0)
+    return amount_ratio * 0.4 + frequency_score * 0.3 + group.get('suspicious_score', 0.5) * 0.3
+
+
+def reference_shell_network_score(network):
+    """Original per-network formula with the default weights"""
+    size_score = min(network['size'] / 15, 1.0)
+    volume_score = 1 - min(network['total_volume'] / 10000, 1.0)
+    return size_score * 0.4 + network.get('avg_centrality', 0.5) * 0.3 + volume_score * 0.3
+
+
+def test_batch_pattern_scores_match_per_finding():
+    """score_all agrees with the original per-finding formulas and risk bands"""
+    rng = np.random.default_rng(11)
+    detection_results = {
+        'circular_routing': [{'cycle': ['A', 'B', 'C'], 'length': int(n), 'total_amount': float(a),
+                              'time_span_seconds': float(t)}
+                             for n, a, t in zip(rng.integers(3, 12, 50), rng.uniform(0, 2e5, 50), rng.uniform(0, 2e5, 50))],
+        'smurfing': [{'source_account': 'S', 'total_amount': float(a), 'num_transactions': int(n)}
+                     for a, n in zip(rng.uniform(1e4, 8e4, 50), rng.integers(3, 30, 50))],
+        'shell_networks': [{'accounts': ['X', 'Y'], 'size': int(n), 'total_volume': float(v),
+                            'avg_centrality': float(c)}
+                           for n, v, c in zip(rng.integers(3, 20, 50), rng.uniform(0, 2e4, 50), rng.uniform(0, 1, 50))]
+    }
+    detection_results['smurfing'][0]['suspicious_score'] = 0.9
+    scorer = SuspiciousActivityScorer()
+    scores = scorer.score_all(detection_results)
+
+    for pattern_type, reference in (('circular_routing', reference_circular_routing_score),
+                                    ('smurfing', reference_smurfing_pattern_score),
+                                    ('shell_network', reference_shell_network_score)):
+        expected = [reference(f) for f in detection_results[scorer.RESULT_KEYS[pattern_type]]]
+        assert np.allclose(scores[pattern_type]['score'], expected)
+        assert list(scores[pattern_type]['risk_level']) == [reference_risk_level(score) for score in expected]
+
+    report = scorer.generate_overall_report(detection_results)
+    assert len(report['detailed_scores']) == 150
+    assert scorer.generate_overall_report(detection_results, detailed=False)['overall_risk'] == report['overall_risk']
+
+
+def test_account_index_merges_memberships():
+    """Each account appears once with its max score, every pattern and every ring"""
+    detection_results = make_detection_results()
+    scorer = SuspiciousActivityScorer()
+    scores = scorer.score_all(detection_results)
+    index = scorer.account_index(detection_results)
+
+    assert len(index) == 8
+    assert index.rings_of(2) == ['RING_000', 'RING_001', 'RING_002']
+    assert index.num_core_accounts == 5  # smurfing recipients are flagged but not counted
+
+    output = scorer.generate_fraud_ring_output(detection_results, scorer.generate_overall_report(detection_results))
+    assert scorer.account_index(detection_results) is index
+    accounts = {a['account_id']: a for a in output['suspicious_accounts']}
+    assert accounts[2]['detected_patterns'] == ['circular_routing', 'smurfing', 'shell_network']
+    assert accounts[2]['ring_id'] == 'RING_000'
+    assert accounts[2]['suspicion_score'] == max(batch['score'][0] * 100 for batch in scores.values())
+    assert [a['suspicion_score'] for a in output['suspicious_accounts']] == sorted(
+        [a['suspicion_score'] for a in output['suspicious_accounts']], reverse=True)
+    assert [r['ring_id'] for r in output['fraud_rings']] == ['RING_000', 'RING_001', 'RING_002']
+    assert output['fraud_rings'][1]['member_accounts'] == [2, 4, 5, 6]
+
+
+def test_profile_rescoring_reuses_finding_table():
+    """A weight profile re-ranks cached findings; each profile is scored once"""
+    detection_results = make_detection_results()
+    scorer = SuspiciousActivityScorer()
+    report = scorer.generate_overall_report(detection_results, detailed=False)
+    baseline = scorer.generate_fraud_ring_output(detection_results, report)
+    table = scorer.finding_table(detection_results)
+
+    profile = scorer.register_profile('shell_heavy', weights={
+        'smurfing': {'uniformity': 0.0},
+        'shell_network': {'network_size': 1.0, 'volume_anomaly': 2.0}
+    }, min_score=30)
+    report = scorer.generate_overall_report(detection_results, detailed=False, profile=profile)
+    output = scorer.generate_fraud_ring_output(detection_results, report, profile=profile)
+    assert scorer.finding_table(detection_results) is table
+    assert len(table.scored) == 2
+    assert [r['ring_id'] for r in output['fraud_rings']] == ['RING_000', 'RING_002']
+    assert output['fraud_rings'][1]['risk_score'] > baseline['fraud_rings'][2]['risk_score']
+    assert all(a['suspicion_score'] >= 30 for a in output['suspicious_accounts'])
+    assert scorer.weights['shell_network']['volume_anomaly'] == 0.3  # defaults untouched
+
+    scorer.generate_fraud_ring_output(detection_results, report, profile=scorer.profiles['shell_heavy'])
+    assert len(table.scored) == 2
+
+    # Inline (unnamed) profiles are scored but not cached
+    for volume_weight in (1.0, 2.0, 3.0):
+        inline = scorer.make_profile(weights={'shell_network': {'volume_anomaly': volume_weight}})
+        scorer.generate_overall_report(detection_results, detailed=False, profile=inline)
+    assert len(table.scored) == 2
+    assert scorer.account_index(detection_results, inline).risk_scores[2] > scorer.account_index(
+        detection_results).risk_scores[2]
+
+    for bad in ({'weights': {'shell_network': {'size': 1.0}}}, {'risk_thresholds': [0.8, 0.6, 0.4, 0.2]}):
+        try:
+            scorer.make_profile(**bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_cached_output_follows_findings_and_is_not_shared():
+    """Findings edited in place are rescored after invalidate(); mutating one response leaves later ones intact"""
+    detection_results = make_detection_results()
+    scorer = SuspiciousActivityScorer()
+    output = scorer.generate_fraud_ring_output(detection_results, {})
+    before = output['fraud_rings'][0]['risk_score']
+
+    output['suspicious_accounts'][0]['detected_patterns'].append('tampered')
+    output['suspicious_accounts'][0]['suspicion_score'] = -1
+    output['fraud_rings'][0]['member_accounts'].append(99)
+    again = scorer.generate_fraud_ring_output(detection_results, {})
+    assert again['suspicious_accounts'][0]['suspicion_score'] >= 0
+    assert 'tampered' not in again['suspicious_accounts'][0]['detected_patterns']
+    assert again['fraud_rings'][0]['member_accounts'] == [1, 2, 3]
+
+    # In-place edits keep the cached table until it is invalidated
+    detection_results['circular_routing'][0]['total_amount'] = 10.0
+    assert scorer.generate_fraud_ring_output(detection_results, {})['fraud_rings'][0]['risk_score'] == before
+    scorer.invalidate()
+    rescored = scorer.generate_fraud_ring_output(detection_results, {})
+    assert rescored['fraud_rings'][0]['risk_score'] < before
+
+    detection_results['shell_networks'][0]['accounts'].append(9)
+    scorer.invalidate()
+    assert 9 in {a['account_id'] for a in scorer.generate_fraud_ring_output(detection_results, {})['suspicious_accounts']}
+
+
+def test_risk_propagation_matches_linear_solve():
+    """Power iteration converges to the fixed point r = (1 - d) s + d P r"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(80, 320))
+    flow = detector.risk_flow()
+    assert detector.risk_flow() is flow
+
+    seeds = list(flow.nodes[:5])
+    scores = [90.0, 70.0, 50.0, 30.0, 10.0]
+    risk, info = flow.propagate(seeds, scores, damping=0.5, tolerance=1e-10, max_iterations=200)
+    assert info['converged']
+
+    seed = np.zeros(len(flow))
+    seed[flow.positions(seeds)] = scores
+    expected = np.linalg.solve(np.eye(len(flow)) - 0.5 * flow.matrix.toarray(), 0.5 * seed)
+    assert np.allclose(risk, expected, atol=1e-8)
+    assert risk.max() <= 90.0
+    assert (risk[flow.positions(seeds)] > 0).all() and (risk > 0).sum() > len(seeds)  # counterparties get risk
+
+    detection_results = {'shell_networks': [{'accounts': seeds, 'size': 5, 'total_volume': 100.0, 'ring_id': 'RING_000'}]}
+    scorer = SuspiciousActivityScorer()
+    output = scorer.generate_fraud_ring_output(detection_results, {}, risk_flow=flow)
+    assert all(0 < a['propagated_risk'] <= a['suspicion_score'] for a in output['suspicious_accounts'])
+
+
+def test_fraud_ring_output_flags_propagated_counterparties():
+    """A counterparty outside every ring is reported once its propagated risk reaches the floor"""
+    df = pd.DataFrame({
+        'transaction_id': ['T1', 'T2', 'T3', 'T4', 'T5'],
+        'from_account': ['A', 'B', 'C', 'C', 'X'],
+        'to_account': ['B', 'C', 'A', 'Z', 'Y'],
+        'amount': [50000.0, 49000.0, 48000.0, 40000.0, 100.0],
+        'timestamp': pd.to_datetime(['2026-02-15 10:00', '2026-02-15 11:00', '2026-02-15 12:00',
+                                     '2026-02-15 13:00', '2026-02-15 14:00'])
+    })
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+    results = detector.run_full_detection()
+    scorer = SuspiciousActivityScorer()
+    output = scorer.generate_fraud_ring_output(results, scorer.generate_overall_report(results),
+                                               risk_flow=detector.risk_flow())
+
+    accounts = {a['account_id']: a for a in output['suspicious_accounts']}
+    assert {'A', 'B', 'C', 'Z'} <= set(accounts) and 'X' not in accounts and 'Y' not in accounts
+    assert accounts['Z']['detected_patterns'] == ['risk_propagation'] and accounts['Z']['ring_id'] is None
+    assert 0 < accounts['Z']['propagated_risk'] < accounts['C']['propagated_risk']
+    assert output['summary']['accounts_flagged_by_propagation'] == 1
+    assert all(set(ring['member_accounts']) <= {'A', 'B', 'C'} for ring in output['fraud_rings'])
+
+    floor = accounts['Z']['propagated_risk'] + 1
+    index = scorer.account_index(results)
+    assert 'Z' not in {a['account_id'] for a in index.suspicious_accounts(risk_flow=detector.risk_flow(),
+                                                                          propagation_floor=floor)}
+
+
+def test_personalized_pagerank_push_matches_power_iteration():
+    """Local push ranks the same neighbourhood as a full personalized PageRank"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(150, 600))
+    flow = detector.risk_flow()
+    seeds = flow.nodes[:3]
+
+    rows, scores, info = flow.personalized_pagerank(flow.positions(seeds), alpha=0.15, epsilon=1e-9)
+    assert info['converged']
+
+    # Exact: p = alpha * s + (1 - alpha) * P^T p
+    restart = np.zeros(len(flow))
+    restart[flow.positions(seeds)] = 1.0 / len(seeds)
+    exact = np.linalg.solve(np.eye(len(flow)) - 0.85 * flow.matrix.T.toarray(), 0.15 * restart)
+    estimate = np.zeros(len(flow))
+    estimate[rows] = scores
+    assert np.all(estimate <= exact + 1e-12)
+    assert np.abs(estimate - exact).max() < 1e-6
+
+    ranked, _ = detector.personalized_pagerank(seeds, top_k=5, epsilon=1e-9)
+    assert len(ranked) == 5 and not any(r['is_seed'] for r in ranked)
+    expected = [flow.nodes[i] for i in np.argsort(-exact, kind='stable') if flow.nodes[i] not in seeds][:5]
+    assert [r['account_id'] for r in ranked] == expected
+
+
+if __name__ == '__main__':
+    test_batch_pattern_scores_match_per_finding()
+    test_account_index_merges_memberships()
+    test_profile_rescoring_reuses_finding_table()
+    test_cached_output_follows_findings_and_is_not_shared()
+    test_risk_propagation_matches_linear_solve()
+    test_fraud_ring_output_flags_propagated_counterparties()
+    test_personalized_pagerank_push_matches_power_iteration()
+    print("[PASS] Fraud report tests passed")
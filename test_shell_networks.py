@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Shell network tests: betweenness centrality and layering detection
+"""
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from centrality import betweenness_centrality
+from detector import MoneyMulingDetector
+from test_cycle_search import make_transactions
+
+
+def test_exact_betweenness_matches_networkx():
+    """Exact mode agrees with networkx on both graph backends"""
+    df = make_transactions(120, 480)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+    reference = nx.betweenness_centrality(detector.graph)
+
+    csr_detector = MoneyMulingDetector()
+    csr_detector.load_transactions(df, graph_backend='csr')
+
+    for graph in (detector.graph, csr_detector.csr):
+        nodes, scores, info = betweenness_centrality(graph, mode='exact', batch_entries=500)
+        assert info['mode'] == 'exact'
+        assert np.allclose(scores, [reference[node] for node in nodes])
+
+
+def test_sampled_betweenness_within_error_bound():
+    """Approximate mode samples sources and stays within the reported epsilon"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(400, 1600))
+    reference = nx.betweenness_centrality(detector.graph)
+
+    nodes, scores, info = betweenness_centrality(detector.graph, mode='approximate', max_samples=100)
+    assert info['mode'] == 'approximate'
+    assert info['samples'] == 100
+    assert np.abs(scores - [reference[node] for node in nodes]).max() <= info['epsilon']
+
+    detector.detect_layered_shell_networks(centrality_mode='approximate', centrality_max_samples=100)
+    assert detector.detection_stats['shell_networks']['centrality']['mode'] == 'approximate'
+
+
+def make_layered_transactions():
+    """Two account clusters bridged only by low-value relay chains through shell accounts"""
+    left = make_transactions(60, 240, seed=11)
+    right = make_transactions(60, 240, seed=12).replace(regex={r'^ACC_': 'BCC_'})
+    rng = np.random.default_rng(5)
+    rows = []
+    for layer in range(6):
+        ends = rng.choice(60, 2)
+        path = [f'ACC_{ends[0]:04d}'] + [f'SHELL_{layer}_{i}' for i in range(4)] + [f'BCC_{ends[1]:04d}']
+        path = path[::-1] if layer % 2 else path
+        rows.extend((f'S{layer}_{i}', sender, receiver, 20.0, pd.Timestamp('2026-02-16') + pd.Timedelta(hours=i))
+                    for i, (sender, receiver) in enumerate(zip(path[:-1], path[1:])))
+    shells = pd.DataFrame(rows, columns=['transaction_id', 'from_account', 'to_account', 'amount', 'timestamp'])
+    return pd.concat([left, right, shells], ignore_index=True)
+
+
+def reference_shell_networks(df, min_layer_depth=3):
+    """Per-node percentile rules of the original shell-network detector"""
+    graph = nx.DiGraph()
+    graph.add_edges_from(zip(df['from_account'], df['to_account']))
+    betweenness = nx.betweenness_centrality(graph)
+    volumes = defaultdict(float)
+    for row in df.itertuples():
+        volumes[row.from_account] += row.amount
+        volumes[row.to_account] += row.amount
+
+    shells = [account for account in graph.nodes()
+              if betweenness[account] > np.percentile(list(betweenness.values()), 75)
+              and volumes[account] < np.percentile(list(volumes.values()), 25)]
+    components = [component for component in nx.connected_components(graph.subgraph(shells).to_undirected())
+                  if len(component) >= min_layer_depth]
+    return components, betweenness, volumes
+
+
+def test_shell_networks_match_per_node_rules():
+    """Vectorized components, volumes and centralities match the per-node logic on both backends"""
+    df = make_layered_transactions()
+    components, betweenness, volumes = reference_shell_networks(df)
+    assert len(components) > 1
+
+    for backend in MoneyMulingDetector.GRAPH_BACKENDS:
+        detector = MoneyMulingDetector(graph_backend=backend)
+        detector.load_transactions(df)
+        nodes = detector.csr.labels.tolist() if detector.csr is not None else list(detector.graph.nodes())
+        assert np.allclose(detector._account_volumes(nodes), [volumes[node] for node in nodes])
+
+        networks = detector.detect_layered_shell_networks(centrality_mode='exact')
+        assert {frozenset(network['accounts']) for network in networks} == {frozenset(c) for c in components}
+        for network in networks:
+            assert network['size'] == len(network['accounts'])
+            assert np.isclose(network['total_volume'], sum(volumes[a] for a in network['accounts']))
+            assert np.isclose(network['avg_centrality'], np.mean([betweenness[a] for a in network['accounts']]))
+
+
+def test_pass_through_chain_is_extracted():
+    """Funds relayed hop by hop through low-degree accounts form one chain"""
+    hops = ['ORIGIN', 'P1', 'P2', 'P3', 'P4', 'DEST']
+    chain = pd.DataFrame({
+        'transaction_id': [f'C{i}' for i in range(5)],
+        'from_account': hops[:-1],
+        'to_account': hops[1:],
+        'amount': [10000.0, 9900.0, 9800.0, 9700.0, 9600.0],
+        'timestamp': pd.Timestamp('2026-02-15 08:00:00') + pd.to_timedelta(np.arange(5) * 2, unit='h')
+    })
+    # Unrelated background activity
+    background = make_transactions(50, 200)
+    df = pd.concat([chain, background], ignore_index=True)
+
+    for graph_backend in ('networkx', 'csr'):
+        detector = MoneyMulingDetector()
+        detector.load_transactions(df, graph_backend=graph_backend)
+        chains = detector.detect_pass_through_chains()
+        assert detector.cached_betweenness() is None  # chains never start the O(k E) betweenness pass
+
+        found = [c for c in chains if 'P1' in c['accounts']]
+        assert len(found) == 1
+        assert found[0]['accounts'] == ['P1', 'P2', 'P3', 'P4']
+        assert found[0]['size'] == 4
+        assert found[0]['max_delay_hours'] == 2.0
+        # Same fields as betweenness-based shell networks; the chain's own paths give its exact betweenness
+        assert {'accounts', 'size', 'total_volume', 'avg_centrality', 'ring_id'} <= set(found[0])
+        nodes, scores, _ = detector.betweenness()
+        members = pd.Index(nodes).get_indexer(found[0]['accounts'])
+        assert (members >= 0).all() and np.isclose(found[0]['avg_centrality'], scores[members].mean())
+
+        # Once the shell detector has computed betweenness, chains reuse it
+        scores[members] += 1.0
+        rerun = [c for c in detector.detect_pass_through_chains() if 'P1' in c['accounts']]
+        assert np.isclose(rerun[0]['avg_centrality'], scores[members].mean())
+        assert detector.rings[found[0]['ring_id']]['type'] == 'shell_network'
+
+
+def test_centrality_cached_until_graph_changes():
+    """Detection runs and graph metrics share one betweenness computation per graph version"""
+    from graph_rules import TransactionGraphAnalyzer
+
+    df = make_transactions(60, 240)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df.iloc[:200])
+    analyzer = TransactionGraphAnalyzer(detector)
+
+    detector.detect_layered_shell_networks()
+    assert detector.detection_stats['shell_networks']['centrality']['cached'] is False
+    misses = detector.centrality_cache.misses
+
+    detector.detect_layered_shell_networks()
+    metrics = analyzer.analyze_graph_metrics()
+    analyzer.analyze_graph_metrics()
+    assert detector.detection_stats['shell_networks']['centrality']['cached'] is True
+    assert detector.centrality_cache.misses == misses + 2  # closeness and clustering, once each
+    assert metrics['betweenness_mode'] == 'exact'
+
+    detector.append_transactions(df.iloc[200:])
+    detector.detect_layered_shell_networks()
+    assert detector.detection_stats['shell_networks']['centrality']['cached'] is False
+
+
+if __name__ == '__main__':
+    test_exact_betweenness_matches_networkx()
+    test_sampled_betweenness_within_error_bound()
+    test_shell_networks_match_per_node_rules()
+    test_pass_through_chain_is_extracted()
+    test_centrality_cached_until_graph_changes()
+    print("[PASS] Shell network tests passed")
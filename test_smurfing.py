@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Smurfing tests: sliding-window structuring detection
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from detector import MoneyMulingDetector
+from smurfing import SlidingWindowScanner
+from scoring import SuspiciousActivityScorer
+
+
+def make_split_transactions(source, start, num_splits, minutes_apart, amount=900.0):
+    """One source splitting a large sum into small transfers"""
+    return pd.DataFrame({
+        'transaction_id': [f'{source}_{i:03d}' for i in range(num_splits)],
+        'from_account': [source] * num_splits,
+        'to_account': [f'DEST_{i:03d}' for i in range(num_splits)],
+        'amount': [amount] * num_splits,
+        'timestamp': pd.Timestamp(start) + pd.to_timedelta(np.arange(num_splits) * minutes_apart, unit='m')
+    })
+
+
+def test_splits_across_hour_boundary_are_detected():
+    """A burst straddling a clock-hour boundary is one finding"""
+    df = make_split_transactions('SRC', '2026-02-15 10:40:00', num_splits=12, minutes_apart=4)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+
+    groups = detector.detect_smurfing_patterns()
+    assert len(groups) == 1
+    assert groups[0]['source_account'] == 'SRC'
+    assert groups[0]['num_transactions'] == 12
+    assert groups[0]['total_amount'] == 10800.0
+    assert len(groups[0]['recipients']) == 12
+    assert detector.rings[groups[0]['ring_id']]['type'] == 'smurfing'
+
+
+def test_paced_splits_tagged_with_matching_window():
+    """Splits paced past the 1h window are found by a wider window in the same scan"""
+    df = pd.concat([
+        make_split_transactions('FAST', '2026-02-15 10:00:00', num_splits=12, minutes_apart=4),
+        make_split_transactions('SLOW', '2026-02-15 10:00:00', num_splits=12, minutes_apart=20)
+    ], ignore_index=True)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+
+    findings = detector.detect_smurfing_patterns(window_hours=[1, 6, 24])
+    assert len(findings) == 2  # the FAST burst is not repeated for wider windows
+    groups = {g['source_account']: g for g in findings}
+    assert groups['FAST']['window_hours'] == 1
+    assert groups['SLOW']['window_hours'] == 6
+    assert detector.detection_stats['smurfing']['patterns_per_window'] == {1: 1, 6: 1, 24: 0}
+
+
+def test_burst_not_repeated_by_wider_overlapping_window():
+    """A wider window that also sweeps in an earlier transfer is merged into the same burst"""
+    df = pd.concat([
+        pd.DataFrame({
+            'transaction_id': ['EARLY'], 'from_account': ['SRC'], 'to_account': ['OTHER'],
+            'amount': [50.0], 'timestamp': [pd.Timestamp('2026-02-15 07:00:00')]
+        }),
+        make_split_transactions('SRC', '2026-02-15 10:00:00', num_splits=15, minutes_apart=3)
+    ], ignore_index=True)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+
+    findings = detector.detect_smurfing_patterns()
+    assert len(findings) == 1 and len(detector.rings) == 1
+    assert findings[0]['window_hours'] == 1 and findings[0]['num_transactions'] == 16
+    assert findings[0]['matched_windows_hours'] == [1, 6, 24, 72]
+    assert detector.detection_stats['smurfing']['patterns_per_window'] == {1: 1, 6: 0, 24: 0, 72: 0}
+
+
+def test_wider_window_extends_overlapping_burst():
+    """Paced splits after a quick burst are merged into its finding rather than dropped"""
+    df = pd.concat([
+        make_split_transactions('SRC', '2026-02-15 10:00:00', num_splits=12, minutes_apart=4),
+        make_split_transactions('SRC', '2026-02-15 11:00:00', num_splits=30, minutes_apart=120).assign(
+            transaction_id=lambda paced: 'PACED_' + paced['transaction_id'],
+            to_account=lambda paced: 'PACED_' + paced['to_account'])
+    ], ignore_index=True)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+
+    wide = detector.detect_smurfing_patterns(window_hours=72)
+    findings = detector.detect_smurfing_patterns()
+    assert len(wide) == 1 and wide[0]['num_transactions'] == 42
+    assert len(findings) == 1
+    assert findings[0]['window_hours'] == 1 and findings[0]['matched_windows_hours'] == [1, 6, 24, 72]
+    assert findings[0]['num_transactions'] == 42 and findings[0]['total_amount'] == 37800.0
+    assert len(findings[0]['recipients']) == 42
+
+
+def test_fan_in_collection_is_detected():
+    """Many senders depositing small amounts into one account within a window"""
+    df = make_split_transactions('COLLECT', '2026-02-15 10:00:00', num_splits=12, minutes_apart=4)
+    df = df.rename(columns={'from_account': 'to_account', 'to_account': 'from_account'})
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+
+    assert detector.detect_smurfing_patterns() == []
+    findings = detector.detect_fan_in_patterns()
+    assert len(findings) == 1
+    assert findings[0]['direction'] == 'fan_in'
+    assert findings[0]['target_account'] == 'COLLECT'
+    assert len(findings[0]['senders']) == 12
+
+    scorer = SuspiciousActivityScorer()
+    assert scorer.smurfing_members(findings[0])[0] == 'COLLECT'
+    assert scorer.score_smurfing(findings[0])['score'] > 0
+
+
+def reference_smurfing_score(amounts, threshold):
+    """Per-group score: uniformity of the splits and share below 10% of the threshold"""
+    mean = np.mean(amounts)
+    uniformity_ratio = np.std(amounts) / mean if mean > 0 else 0
+    threshold_avoidance_score = sum(1 for amt in amounts if amt < threshold * 0.1) / len(amounts)
+    return (1 - uniformity_ratio) * 0.6 + threshold_avoidance_score * 0.4
+
+
+def test_batch_smurfing_scores_match_per_group():
+    """One vectorized call scores every group like the per-group formula"""
+    rng = np.random.default_rng(5)
+    groups = [rng.uniform(100, 2000, size) for size in rng.integers(1, 40, 200)]
+    amounts = np.concatenate(groups)
+    offsets = np.concatenate([[0], np.cumsum([len(g) for g in groups])])
+
+    scores = MoneyMulingDetector()._calculate_smurfing_scores(amounts, offsets, 10000)
+    assert len(scores) == len(groups)
+    assert np.allclose(scores, [reference_smurfing_score(g, 10000) for g in groups])
+
+
+def test_window_starts_match_brute_force():
+    """Trailing window starts agree with a direct scan per row"""
+    rng = np.random.default_rng(3)
+    num_rows = 2000
+    df = pd.DataFrame({
+        'from_account': rng.integers(0, 20, num_rows),
+        'to_account': rng.integers(0, 100, num_rows),
+        'amount': rng.uniform(20, 250, num_rows),
+        'timestamp': pd.Timestamp('2026-02-15') + pd.to_timedelta(rng.integers(0, 86400, num_rows) // 60 * 60, unit='s')
+    })
+    scanner = SlidingWindowScanner(df).grouped('from_account')
+    windows_ns = [3600 * 10 ** 9, 6 * 3600 * 10 ** 9]
+    all_starts = scanner.window_starts(windows_ns)
+
+    for window_ns, starts in zip(windows_ns, all_starts):
+        for row in range(0, num_rows, 11):
+            same_window = (scanner.group == scanner.group[row]) & (scanner.times >= scanner.times[row] - window_ns)
+            assert starts[row] == np.flatnonzero(same_window).min()
+
+
+if __name__ == '__main__':
+    test_splits_across_hour_boundary_are_detected()
+    test_paced_splits_tagged_with_matching_window()
+    test_burst_not_repeated_by_wider_overlapping_window()
+    test_wider_window_extends_overlapping_burst()
+    test_fan_in_collection_is_detected()
+    test_batch_smurfing_scores_match_per_group()
+    test_window_starts_match_brute_force()
+    print("[PASS] Smurfing tests passed")
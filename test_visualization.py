@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Visualization tests: network layout and figure construction
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from detector import MoneyMulingDetector
+from graph_rules import TransactionGraphAnalyzer
+from scoring import SuspiciousActivityScorer
+from test_cycle_search import make_transactions
+
+
+def test_layout_cached_and_extended_incrementally():
+    """Positions are computed once per graph and only new nodes are placed on append"""
+    df = make_transactions(60, 240)
+    detector = MoneyMulingDetector()
+    detector.load_transactions(df)
+    analyzer = TransactionGraphAnalyzer(detector)
+    scorer = SuspiciousActivityScorer()
+
+    analyzer.create_enhanced_network_visualization({}, scorer)
+    analyzer.create_enhanced_network_visualization({}, scorer)
+    cache = detector.layout_cache
+    assert cache.stats == {'full_layouts': 1, 'incremental_updates': 0, 'hits': 1}
+    before = {node: position.copy() for node, position in cache.positions.items()}
+
+    # Two new accounts hanging off an existing one
+    anchor = df['from_account'].iloc[0]
+    detector.append_transactions(pd.DataFrame({
+        'transaction_id': ['N1', 'N2'],
+        'from_account': [anchor, 'NEW_1'],
+        'to_account': ['NEW_1', 'NEW_2'],
+        'amount': [500.0, 450.0],
+        'timestamp': pd.to_datetime(['2026-02-16 10:00:00', '2026-02-16 11:00:00'])
+    }))
+    TransactionGraphAnalyzer(detector).create_enhanced_network_visualization({}, scorer)
+    assert cache.stats['full_layouts'] == 1 and cache.stats['incremental_updates'] == 1
+    assert all(np.array_equal(cache.positions[node], position) for node, position in before.items())
+
+    coordinates = np.array(list(before.values()))
+    extent = (coordinates.max(axis=0) - coordinates.min(axis=0)).max()
+    assert np.linalg.norm(cache.positions['NEW_1'] - before[anchor]) < 0.5 * extent
+    assert 'NEW_2' in cache.positions
+
+    detector.load_transactions(df.iloc[:100])
+    assert cache.positions == {}
+
+
+def test_edges_batched_into_few_traces():
+    """One None-separated trace per ring colour plus one for normal edges, covering every edge once"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(40, 200))
+    edges = list(detector.graph.edges())
+    rings = {'RING_000': {'members': list(edges[0])}, 'RING_001': {'members': list(edges[5])}}
+
+    fig = TransactionGraphAnalyzer(detector).create_enhanced_network_visualization({}, SuspiciousActivityScorer(),
+                                                                                   rings=rings)
+    edge_traces = [trace for trace in fig.data if trace.mode == 'lines']
+    assert len(edge_traces) == 3
+    assert edge_traces[0].line.color == '#888' and edge_traces[0].line.width == 1
+
+    drawn = 0
+    for trace in edge_traces:
+        assert len(trace.x) % 3 == 0 and all(value is None for value in trace.x[2::3])
+        drawn += len(trace.x) // 3
+    assert drawn == len(edges)
+    assert [len(trace.x) // 3 for trace in edge_traces[1:]] == [1, 1]
+
+
+def test_reduced_graph_bounded_and_keeps_rings():
+    """A node budget keeps ring members and neighbours, collapsing every other account into super-nodes"""
+    detector = MoneyMulingDetector()
+    detector.load_transactions(make_transactions(300, 600))
+    edges = list(detector.graph.edges())
+    rings = {'RING_000': {'members': list(edges[0])}, 'RING_001': {'members': list(edges[50])}}
+    members = set(edges[0]) | set(edges[50])
+
+    reduced = detector.reduced_graph(rings, node_budget=40, hops=1)
+    graph, super_nodes = reduced.graph, reduced.super_nodes
+    assert graph.number_of_nodes() <= 40 and graph.number_of_edges() <= 4 * 40
+    assert members <= set(graph.nodes())
+    neighbours = set()
+    for member in members:
+        neighbours.update(detector.graph.successors(member), detector.graph.predecessors(member))
+    accounts = set(graph.nodes()) - set(super_nodes)
+    assert accounts <= members | neighbours
+    assert len(accounts) + sum(info['accounts'] for info in super_nodes.values()) == detector.num_accounts()
+
+    # Kept account pairs keep their edge; every other link ends on a super-node
+    for u, v in graph.edges():
+        assert u in super_nodes or v in super_nodes or detector.graph.has_edge(u, v)
+    assert detector.reduced_graph(rings, node_budget=40, hops=1) is reduced
+
+    fig = TransactionGraphAnalyzer(detector).create_enhanced_network_visualization({}, SuspiciousActivityScorer(),
+                                                                                   rings=rings, node_budget=40)
+    assert len(fig.data[-1].x) == graph.number_of_nodes()
+    assert sum(len(trace.x) // 3 for trace in fig.data if trace.mode == 'lines') == graph.number_of_edges()
+
+
+
+def test_reduced_graph_keeps_hub_next_to_many_ring_members():
+    """A neighbour shared by hundreds of ring members is kept, however many members it touches"""
+    for num_members in (127, 128, 256, 300):
+        members = [f'M{i:03d}' for i in range(num_members)]
+        # Ring members all pay one hub; unrelated pairs fill the rest of the graph
+        df = pd.concat([make_transactions(1000, 600), pd.DataFrame({
+            'transaction_id': [f'H{i}' for i in range(num_members)],
+            'from_account': members,
+            'to_account': ['HUB'] * num_members,
+            'amount': [100.0] * num_members,
+            'timestamp': pd.Timestamp('2026-02-15') + pd.to_timedelta(np.arange(num_members), unit='m')
+        })], ignore_index=True)
+        for backend in MoneyMulingDetector.GRAPH_BACKENDS:
+            detector = MoneyMulingDetector(graph_backend=backend)
+            detector.load_transactions(df)
+            reduced = detector.reduced_graph({'RING_000': {'members': members}}, node_budget=2 * num_members)
+            assert 'HUB' in reduced.graph and set(members) <= set(reduced.graph.nodes())
+
+if __name__ == '__main__':
+    test_layout_cached_and_extended_incrementally()
+    test_edges_batched_into_few_traces()
+    test_reduced_graph_bounded_and_keeps_rings()
+    test_reduced_graph_keeps_hub_next_to_many_ring_members()
+    print("[PASS] Visualization tests passed")